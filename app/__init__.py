@@ -1,18 +1,19 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_admin import Admin
 from flask_migrate import Migrate
 from flask_login import LoginManager
 
+from app.database import Database
+
 app = Flask(__name__)
 app.config.from_object('config')
 
 # Database
-db = SQLAlchemy(app)
+db = Database(app)
 migrate = Migrate(app, db, render_as_batch=True)
 
-from app.models import User
-from app import views, models
+from app import views, models, commands, api
+from app.identity import load_principal
 
 # Login manager
 login_manager = LoginManager()
@@ -23,4 +24,4 @@ login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_principal(int(user_id))
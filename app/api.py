@@ -0,0 +1,317 @@
+import calendar
+import hashlib
+import json
+from functools import wraps
+
+from app import app, db
+from app.catalogue import CARD_TAXONOMIES, taxonomy_names
+from app.facets import facet_index, parse_filters, facet_summary
+from app.library import feed_page
+from app.models import Game, Developer, Publisher, Genre, Model, Platform
+from app.versions import table_versions
+from flask import Blueprint, request
+from flask_login import current_user
+from flask_restful import Api, Resource, abort
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api_blueprint = Blueprint('api', __name__, url_prefix='/api/v1')
+api = Api(api_blueprint)
+
+# Columns of a game that a client can ask for by name
+GAME_COLUMNS = {'title': Game.title, 'description': Game.description,
+                'release_date': Game.release_date,
+                'image_url': Game.image_url}
+
+# Relationships of a game that a client can ask for by name
+GAME_TAXONOMIES = [taxonomy[0] for taxonomy in CARD_TAXONOMIES]
+
+GAME_FIELDS = ['game_id'] + list(GAME_COLUMNS) + GAME_TAXONOMIES
+
+# Tables read to build a game
+GAME_TABLES = ['game', 'developer', 'publisher', 'genre', 'model',
+               'platform', 'game_developer', 'game_publisher', 'game_genre',
+               'game_model', 'game_platform']
+
+# Taxonomies listed by the API as path to (table, key, name)
+TAXONOMIES = {
+    'developers': ('developer', Developer.developer_id, Developer.name),
+    'publishers': ('publisher', Publisher.publisher_id, Publisher.name),
+    'genres': ('genre', Genre.genre_id, Genre.genre_type),
+    'models': ('model', Model.model_id, Model.model_type),
+    'platforms': ('platform', Platform.platform_id, Platform.platform_name),
+}
+
+
+def dumps(data):
+    """
+    :param data: JSON serialisable data
+    :return: Compact JSON of the data, with orjson if it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'))
+
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """
+    Serialise the responses of the API resources.
+    """
+    response = app.response_class(dumps(data), status=code,
+                                  mimetype='application/json')
+    response.headers.extend(headers or {})
+    return response
+
+
+def conditional(*tables, private=False, state=None):
+    """
+    Decorator answering a GET with 304 Not Modified when the client
+    already has the current representation. The ETag is made from the
+    URL, the user for private resources and the versions of the tables
+    the resource reads, which triggers bump on every write, so checking
+    it costs one lookup of the version table.
+
+    :param tables: Names of the tables the resource reads
+    :param private: True if the resource depends on the current user
+    :param state: Function returning the state of anything else the
+                  resource is read from, e.g. an in-memory index that
+                  lags behind the tables. It is added to the ETag and
+                  Last-Modified is left out, as the tables no longer date
+                  the representation.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            versions, updated_at = table_versions(tables)
+            user_id = current_user.get_id() if private else None
+            extra = state() if state is not None else None
+            etag = hashlib.sha1(repr((request.full_path, user_id, versions,
+                                      extra)).encode()).hexdigest()
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            if state is None:
+                response.last_modified = updated_at
+            response.cache_control.no_cache = True
+            if private:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif state is not None:
+                not_modified = False
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and \
+                    calendar.timegm(since.utctimetuple()) >= updated_at
+            if not_modified:
+                return response
+            data = method(*args, **kwargs)
+            return data, 200, dict(response.headers)
+        return wrapper
+    return decorator
+
+
+def requested_fields(allowed):
+    """
+    :param allowed: Names of the fields of the resource
+    :return: Names of the fields asked for with ?fields=, all the fields
+             if none are asked for
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return list(allowed)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        abort(400, message='Unknown fields: %s' % ', '.join(unknown))
+    return fields
+
+
+def page_limit():
+    """
+    :return: Number of items asked for with ?limit=, API_PAGE_SIZE by
+             default and at most API_MAX_PAGE_SIZE
+    """
+    try:
+        limit = int(request.args.get('limit', app.config['API_PAGE_SIZE']))
+    except ValueError:
+        abort(400, message='The limit must be a number')
+    return max(1, min(limit, app.config['API_MAX_PAGE_SIZE']))
+
+
+def id_cursor():
+    """
+    :return: ID after which the page starts, given with ?cursor=, 0 for
+             the first page
+    """
+    try:
+        return int(request.args.get('cursor', 0))
+    except ValueError:
+        abort(400, message='Invalid cursor')
+
+
+def game_records(game_ids, fields):
+    """
+    :param game_ids: List of game IDs
+    :param fields: Names of the fields to include
+    :return: List of dictionaries of the fields of the games, in the order
+             of the IDs, with one query for the columns and one per
+             relationship asked for
+    """
+    columns = [GAME_COLUMNS[field] for field in fields
+               if field in GAME_COLUMNS]
+    query = select([Game.game_id] + columns).where(Game.game_id.in_(game_ids))
+    records = {}
+    for row in db.session.execute(query):
+        record = records[row[0]] = {'game_id': row[0]}
+        for column, value in zip(columns, row[1:]):
+            if column is Game.release_date:
+                value = value.isoformat()
+            record[column.key] = value
+    names = taxonomy_names(list(records), [field for field in fields
+                                           if field in GAME_TAXONOMIES])
+    for attribute, games in names.items():
+        for game_id, record in records.items():
+            record[attribute] = games.get(game_id, [])
+    return [records[game_id] for game_id in game_ids if game_id in records]
+
+
+class GameList(Resource):
+    """
+    The catalogue, in pages ordered by game ID.
+    """
+
+    @conditional(*GAME_TABLES)
+    def get(self):
+        """
+        :return: The games after the cursor and the cursor of the next
+                 page, None if it is the last page
+        """
+        fields = requested_fields(GAME_FIELDS)
+        limit = page_limit()
+        game_ids = [row[0] for row in db.session.execute(
+            select([Game.game_id]).where(Game.game_id > id_cursor())
+            .order_by(Game.game_id).limit(limit + 1))]
+        next_cursor = str(game_ids[limit - 1]) \
+            if len(game_ids) > limit else None
+        return {'data': game_records(game_ids[:limit], fields),
+                'next_cursor': next_cursor}
+
+
+class GameDetail(Resource):
+    """
+    One game of the catalogue.
+    """
+
+    @conditional(*GAME_TABLES)
+    def get(self, game_id):
+        """
+        :param game_id: ID of the game
+        :return: The game
+        """
+        records = game_records([game_id], requested_fields(GAME_FIELDS))
+        if not records:
+            abort(404, message='Game %d not found' % game_id)
+        return {'data': records[0]}
+
+
+class TaxonomyList(Resource):
+    """
+    The developers, publishers, genres, models or platforms, in pages
+    ordered by ID.
+    """
+
+    def get(self, taxonomy):
+        """
+        :param taxonomy: Path of the taxonomy in TAXONOMIES
+        :return: The names after the cursor and the cursor of the next
+                 page, None if it is the last page
+        """
+        table, key, name = TAXONOMIES[taxonomy]
+
+        @conditional(table)
+        def page():
+            limit = page_limit()
+            rows = db.session.execute(
+                select([key, name]).where(key > id_cursor())
+                .order_by(key).limit(limit + 1)).fetchall()
+            next_cursor = str(rows[limit - 1][0]) \
+                if len(rows) > limit else None
+            return {'data': [{'id': row[0], 'name': row[1]}
+                             for row in rows[:limit]],
+                    'next_cursor': next_cursor}
+        return page()
+
+
+class LibraryList(Resource):
+    """
+    The current user's list, most recently added first.
+    """
+
+    def get(self):
+        """
+        :return: The games after the cursor and the cursor of the next
+                 page, None if it is the last page
+        """
+        if not current_user.is_authenticated:
+            abort(401, message='Log in to see your list')
+        return self.page()
+
+    @conditional('user_game', *GAME_TABLES, private=True)
+    def page(self):
+        """
+        :return: The page of the user's list
+        """
+        fields = requested_fields(GAME_FIELDS)
+        try:
+            cards, next_cursor = feed_page(request.args.get('cursor'),
+                                           page_limit())
+        except ValueError:
+            abort(400, message='Invalid cursor')
+        return {'data': game_records([card.game_id for card in cards],
+                                     fields),
+                'next_cursor': next_cursor}
+
+
+class Browse(Resource):
+    """
+    The games matching a combination of facet values, newest first, with
+    the number of games of each facet value.
+    """
+
+    @conditional(*GAME_TABLES, state=facet_index.state)
+    def get(self):
+        """
+        :return: The games after the cursor, the cursor of the next page,
+                 the number of matching games and the facet values
+        """
+        fields = requested_fields(GAME_FIELDS)
+        try:
+            filters = parse_filters(request.args)
+        except ValueError:
+            abort(400, message='Facet values must be numbers')
+        game_ids, next_cursor, total, counts = facet_index.browse(
+            filters, request.args.get('cursor', type=int), page_limit())
+        return {'data': game_records(game_ids, fields),
+                'next_cursor': str(next_cursor) if next_cursor else None,
+                'total': total,
+                'facets': {facet: [{'id': value, 'name': name,
+                                    'count': count, 'selected': selected}
+                                   for value, name, count, selected
+                                   in values]
+                           for facet, values in
+                           facet_summary(counts, filters)}}
+
+
+api.add_resource(GameList, '/games')
+api.add_resource(GameDetail, '/games/<int:game_id>')
+api.add_resource(TaxonomyList, '/<any(%s):taxonomy>' % ', '.join(TAXONOMIES))
+api.add_resource(LibraryList, '/me/games')
+api.add_resource(Browse, '/browse')
+app.register_blueprint(api_blueprint)
@@ -0,0 +1,475 @@
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import urllib.request
+
+from app import app
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Folder of the fingerprinted copies inside the static folder
+ASSET_FOLDER = 'dist'
+
+MANIFEST = 'manifest.json'
+
+# Extensions of the files worth compressing
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.txt'}
+
+# Fingerprinted files never change, so browsers can keep them for a year
+# without asking again
+ASSET_MAX_AGE = 31536000
+
+
+# Third-party files as (path in the static folder, URL, subresource
+# integrity). They are downloaded once by `flask assets`.
+VENDOR = [
+    ('vendor/bootstrap.min.css',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.0.0-beta1/dist/css/'
+     'bootstrap.min.css',
+     'sha384-giJF6kkoqNQ00vy+HMDP7azOuL0xtbfIcaT9wjKHr8RbDVddVHyTfAAsrekwKmP1'),
+    ('vendor/bootstrap.bundle.min.js',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.0.0-beta1/dist/js/'
+     'bootstrap.bundle.min.js',
+     'sha384-ygbV9kiqUc6oa4msXn9868pTtWMgiQaeYH7/t7LECLbyPA2x65Kgf80OJFdroafW'),
+    ('vendor/cookieconsent.min.css',
+     'https://cdnjs.cloudflare.com/ajax/libs/cookieconsent/3.1.1/'
+     'cookieconsent.min.css',
+     'sha512-LQ97camar/lOliT/MqjcQs5kWgy6Qz/cCRzzRzUCfv0fotsCTC9ZHXaPQmJV8Xu'
+     '/PVALfJZ7BDezl5lW3/qBxg=='),
+    ('vendor/cookieconsent.min.js',
+     'https://cdnjs.cloudflare.com/ajax/libs/cookieconsent/3.1.1/'
+     'cookieconsent.min.js',
+     'sha512-yXXqOFjdjHNH1GND+1EO0jbvvebABpzGKD66djnUfiKlYME5HGMUJHoCaeE4D5P'
+     'TG2YsSJf6dwqyUUvQvS0vaA=='),
+]
+
+# Bundles as (bundle, files joined into it). Files with '.min.' in their
+# name are already minified.
+BUNDLES = [
+    ('bundle.css', ['vendor/bootstrap.min.css',
+                    'vendor/cookieconsent.min.css']),
+    ('bundle.js', ['jquery.min.js', 'vendor/bootstrap.bundle.min.js',
+                   'vendor/cookieconsent.min.js', 'cookie_consent.js',
+                   'ajax_js.js']),
+]
+
+# Stylesheets whose rules are dropped unless the pages can use them
+PURGED = {'vendor/bootstrap.min.css'}
+
+# Files searched for the class names the pages use, relative to the app
+CONTENT = ['templates/**/*.html', 'static/*.js',
+           'static/vendor/bootstrap.bundle.min.js']
+
+
+def _write(path, data):
+    """
+    Write a file atomically, so a concurrent request never serves a
+    half-written file.
+
+    :param path: Path of the file
+    :param data: Bytes to write
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def fetch_vendor(static_folder):
+    """
+    Download the third-party files that are missing and check them
+    against their subresource integrity.
+
+    :param static_folder: Path of the static folder
+    :return: Number of files downloaded
+    :raise ValueError: If a file does not match its integrity
+    """
+    count = 0
+    for filename, url, integrity in VENDOR:
+        path = os.path.join(static_folder, filename)
+        if os.path.isfile(path):
+            continue
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        algorithm, expected = integrity.split('-', 1)
+        digest = base64.b64encode(hashlib.new(algorithm, data).digest())
+        if digest.decode() != expected:
+            raise ValueError('%s does not match its integrity' % url)
+        _write(path, data)
+        count += 1
+    return count
+
+
+def _blocks(css):
+    """
+    Split a stylesheet into its top level statements.
+
+    :param css: Text of the stylesheet, without comments
+    :return: List of (prelude, body) pairs, the body is None for
+             statements such as @charset
+    """
+    blocks = []
+    start = 0
+    while start < len(css):
+        brace = css.find('{', start)
+        semicolon = css.find(';', start)
+        if brace < 0:
+            break
+        if 0 <= semicolon < brace and css[start:semicolon].strip() \
+                .startswith('@'):
+            blocks.append((css[start:semicolon].strip(), None))
+            start = semicolon + 1
+            continue
+        depth = 0
+        for end in range(brace, len(css)):
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+        blocks.append((css[start:brace].strip(), css[brace + 1:end]))
+        start = end + 1
+    return blocks
+
+
+def purge_css(css, used):
+    """
+    Keep the rules of a stylesheet whose selectors can match the pages.
+    A selector can match if the pages use every class in it. @charset is
+    dropped, since it is only valid at the start of the bundle.
+
+    :param css: Text of the stylesheet
+    :param used: Set of the class names the pages use
+    :return: Text of the purged stylesheet, starting with its license
+    """
+    notice = re.match(r'\s*(@charset[^;]*;)?\s*(/\*!.*?\*/)', css, re.S)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    output = [notice.group(2) + '\n'] if notice else []
+    for prelude, body in _blocks(css):
+        if body is None:
+            if not prelude.startswith('@charset'):
+                output.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports')):
+            body = purge_css(body, used)
+            if body:
+                output.append('%s{%s}' % (prelude, body))
+        elif prelude.startswith('@') or any(
+                set(re.findall(r'\.(-?[_a-zA-Z][\w-]*)', selector)) <= used
+                for selector in prelude.split(',')):
+            output.append('%s{%s}' % (prelude, body))
+    return ''.join(output)
+
+
+def used_class_names(root):
+    """
+    :param root: Path of the application package
+    :return: Set of every word in the templates and scripts, which
+             includes the class names they use
+    """
+    words = set()
+    for pattern in CONTENT:
+        for path in glob.glob(os.path.join(root, pattern), recursive=True):
+            with open(path, encoding='utf-8') as file:
+                words.update(re.findall(r'[\w-]+', file.read()))
+    return words
+
+
+def build_bundles(static_folder, root):
+    """
+    Join the scripts and the stylesheets into bundles, minifying the
+    scripts that are not and purging the unused Bootstrap rules.
+
+    :param static_folder: Path of the static folder
+    :param root: Path of the application package
+    :return: Dictionary of bundle to its size in bytes
+    """
+    used = used_class_names(root)
+    sizes = {}
+    for bundle, filenames in BUNDLES:
+        parts = []
+        for filename in filenames:
+            with open(os.path.join(static_folder, filename),
+                      encoding='utf-8') as file:
+                text = file.read()
+            if filename in PURGED:
+                text = purge_css(text, used)
+            elif filename.endswith('.js') and '.min.' not in filename and \
+                    rjsmin is not None:
+                text = rjsmin.jsmin(text)
+            parts.append(text.strip())
+        if bundle.endswith('.js'):
+            data = ';\n'.join(parts)
+        else:
+            data = '@charset "UTF-8";\n' + '\n'.join(parts)
+        data = data.encode('utf-8')
+        _write(os.path.join(static_folder, bundle), data)
+        sizes[bundle] = len(data)
+    return sizes
+
+
+def bundles_built():
+    """
+    :return: True if `flask assets` built and fingerprinted the bundles,
+             read from the manifest without touching the disk
+    """
+    return all(bundle in manifest.hashes for bundle, filenames in BUNDLES)
+
+
+class AssetManifest(object):
+    """
+    Maps the static files to copies named after a hash of their content.
+    `flask assets` makes the copies, gzip and brotli variants of the text
+    files, and a manifest that is loaded when the application starts.
+    Files missing from the manifest, e.g. game images uploaded since, are
+    served under their own name.
+
+    Every worker reloads the manifest when the file changes, so a build
+    or a forgotten file made by one process is seen by all of them.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.folder = os.path.join(static_folder, ASSET_FOLDER)
+        self.path = os.path.join(self.folder, MANIFEST)
+        self.hashes = {}
+        self.fingerprinted = {}
+        self.stamp = None
+        self.load()
+
+    @staticmethod
+    def fingerprint(filename, digest):
+        """
+        :param filename: Path of a file relative to the static folder
+        :param digest: Hash of the file's content
+        :return: Path of the fingerprinted copy relative to the static
+                 folder
+        """
+        stem, extension = os.path.splitext(filename)
+        return '%s/%s.%s%s' % (ASSET_FOLDER, stem, digest, extension)
+
+    def _set(self, hashes):
+        """
+        :param hashes: Dictionary of file name to hash of its content
+        """
+        self.hashes = hashes
+        self.fingerprinted = {self.fingerprint(filename, digest): filename
+                              for filename, digest in hashes.items()}
+
+    def _stamp(self):
+        """
+        :return: Inode, size and modification time of the manifest file,
+                 None if it was not built
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def load(self):
+        """
+        Read the manifest, if it was built.
+        """
+        self.stamp = self._stamp()
+        try:
+            with open(self.path) as file:
+                self._set(json.load(file))
+        except FileNotFoundError:
+            self._set({})
+
+    def refresh(self):
+        """
+        Read the manifest again if another process rewrote it.
+        """
+        if self._stamp() != self.stamp:
+            self.load()
+
+    def _save(self, hashes):
+        """
+        Write the manifest and use it.
+
+        :param hashes: Dictionary of file name to hash of its content
+        """
+        _write(self.path, json.dumps(hashes, indent=2, sort_keys=True)
+               .encode())
+        self.stamp = self._stamp()
+        self._set(hashes)
+
+    def get(self, filename):
+        """
+        :param filename: Path of a file relative to the static folder
+        :return: Path of the fingerprinted copy, the file name if there is
+                 none
+        """
+        digest = self.hashes.get(filename)
+        return self.fingerprint(filename, digest) if digest else filename
+
+    def version(self, filename):
+        """
+        :param filename: Path of a file relative to the static folder
+        :return: Hash of the file's content, None if it is not in the
+                 manifest
+        """
+        return self.hashes.get(filename)
+
+    def forget(self, filename):
+        """
+        Stop fingerprinting a file, e.g. after it was deleted, in every
+        worker.
+
+        :param filename: Path of a file relative to the static folder
+        """
+        self.refresh()
+        if filename in self.hashes:
+            hashes = dict(self.hashes)
+            del hashes[filename]
+            self._save(hashes)
+
+    def build(self, clean=False):
+        """
+        Fingerprint every static file and write the manifest.
+
+        :param clean: True to delete the copies of older builds
+        :return: Number of files fingerprinted
+        """
+        hashes = {}
+        written = {self.path}
+        for directory, folders, files in os.walk(self.static_folder):
+            if os.path.abspath(directory) == os.path.abspath(self.folder):
+                folders[:] = []
+                continue
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                filename = os.path.relpath(path, self.static_folder) \
+                    .replace(os.sep, '/')
+                with open(path, 'rb') as file:
+                    data = file.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                hashes[filename] = digest
+                copy = os.path.join(self.static_folder,
+                                    self.fingerprint(filename, digest))
+                variants = [(copy, lambda: data)]
+                if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                    variants.append((copy + '.gz', lambda: gzip.compress(
+                        data, 9, mtime=0)))
+                    if brotli is not None:
+                        variants.append((copy + '.br',
+                                         lambda: brotli.compress(data)))
+                for variant, compress in variants:
+                    written.add(variant)
+                    # A copy with the same hash has the same content
+                    if not os.path.isfile(variant):
+                        _write(variant, compress())
+        self._save(hashes)
+        if clean:
+            for directory, folders, files in os.walk(self.folder):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    if path not in written:
+                        os.remove(path)
+        return len(hashes)
+
+
+manifest = AssetManifest(app.static_folder)
+
+
+@app.before_request
+def refresh_manifest():
+    """
+    Pick up the manifest written by `flask assets` or by another worker,
+    with one stat of the file per request.
+    """
+    manifest.refresh()
+
+
+def asset_url(filename):
+    """
+    :param filename: Path of a file relative to the static folder
+    :return: URL of the file, fingerprinted if it is in the manifest
+    """
+    return '/static/' + manifest.get(filename)
+
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """
+    Make url_for('static', filename=...) point to the fingerprinted copy
+    of the file.
+    """
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = manifest.get(values['filename'])
+
+
+def send_static_file(filename):
+    """
+    Serve a static file. Fingerprinted copies are cached by browsers for
+    good and sent precompressed to the browsers that accept it.
+
+    :param filename: Path of a file relative to the static folder
+    :return: The file
+    """
+    if filename not in manifest.fingerprinted:
+        return app.send_static_file(filename)
+    mimetype = mimetypes.guess_type(filename)[0]
+    path = os.path.join(app.static_folder, filename)
+    for encoding, extension in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in request.accept_encodings and \
+                os.path.isfile(path + extension):
+            response = send_from_directory(app.static_folder,
+                                           filename + extension,
+                                           mimetype=mimetype)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(app.static_folder, filename)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+app.view_functions['static'] = send_static_file
+
+
+@app.before_first_request
+def check_bundles():
+    """
+    Warn that the pages load Bootstrap and cookieconsent from their CDN
+    when `flask assets` has not built the bundles.
+
+    :return: Whether the bundles are built
+    """
+    built = bundles_built()
+    if not built:
+        app.logger.warning('The bundles are missing, the pages load the '
+                           'files from their CDN until `flask assets` '
+                           'builds them')
+    return built
+
+
+@app.context_processor
+def inject_bundles_built():
+    """
+    Let the templates choose between the bundles and the CDN.
+    """
+    return dict(bundles_built=bundles_built())
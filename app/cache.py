@@ -0,0 +1,253 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from app import app, db
+from app.database import apply_pragmas
+from app.models import Game, Developer, Publisher, Genre, Model, Platform
+from flask import request, make_response
+from flask_login import current_user
+from flask_sqlalchemy import models_committed
+from sqlalchemy import event
+
+
+class LRUCache(object):
+    """
+    A bounded in-memory cache local to the process. The least recently
+    used entry is evicted when the cache is full and entries expire
+    after their time to live.
+    """
+
+    def __init__(self, maxsize=512, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        :param key: Key of the entry
+        :return: The cached value, None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        :param key: Key of the entry
+        :param value: Value to cache
+        :param ttl: Seconds before the entry expires, defaults to the
+                    cache's time to live
+        """
+        ttl = ttl or self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        :param key: Key of the entry to remove
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(object):
+    """
+    A cache stored in an SQLite file so that every worker on the host
+    shares the same entries and sees the same invalidations. Values are
+    pickled.
+    """
+    # Expired entries are purged once every this many writes
+    purge_interval = 100
+
+    def __init__(self, path, maxsize=512, ttl=None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._connect().execute('CREATE TABLE IF NOT EXISTS cache '
+                                '(key TEXT PRIMARY KEY, value BLOB, '
+                                'expires REAL)')
+
+    def _connect(self):
+        """
+        :return: The connection of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            apply_pragmas(connection, {'journal_mode': 'WAL',
+                                       'synchronous': 'NORMAL',
+                                       'busy_timeout': 5000})
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """
+        :param key: Key of the entry
+        :return: The cached value, None if it is missing or expired
+        """
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE key = ? AND '
+            '(expires IS NULL OR expires >= ?)',
+            (key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        """
+        :param key: Key of the entry
+        :param value: Value to cache
+        :param ttl: Seconds before the entry expires, defaults to the
+                    cache's time to live
+        """
+        ttl = ttl or self.ttl
+        connection = self._connect()
+        connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                           (key, pickle.dumps(value),
+                            time.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % self.purge_interval == 0:
+            connection.execute('DELETE FROM cache WHERE expires < ?',
+                               (time.time(),))
+            connection.execute('DELETE FROM cache WHERE key NOT IN '
+                               '(SELECT key FROM cache ORDER BY rowid DESC '
+                               'LIMIT ?)', (self.maxsize,))
+
+    def delete(self, key):
+        """
+        :param key: Key of the entry to remove
+        """
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        self._connect().execute('DELETE FROM cache')
+
+
+class ResponseCache(object):
+    """
+    Caches the rendered pages of anonymous visitors, which are the same
+    for everyone. Pages are cached per route, arguments and login state,
+    and the whole cache is cleared when the catalogue changes.
+
+    RESPONSE_CACHE_BACKEND selects 'memory' for a cache per process,
+    'sqlite' for a cache shared by the workers through
+    RESPONSE_CACHE_PATH, or None to turn caching off.
+    """
+
+    def __init__(self, app):
+        backend = app.config.get('RESPONSE_CACHE_BACKEND')
+        size = app.config.get('RESPONSE_CACHE_SIZE', 512)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL')
+        if backend == 'memory':
+            self.backend = LRUCache(size, self.ttl)
+        elif backend == 'sqlite':
+            self.backend = SQLiteCache(app.config['RESPONSE_CACHE_PATH'],
+                                       size, self.ttl)
+        elif backend is None:
+            self.backend = None
+        else:
+            raise ValueError("Unknown response cache backend %r" % backend)
+
+    @staticmethod
+    def make_key():
+        """
+        :return: Key of the current request
+        """
+        state = 'user' if current_user.is_authenticated else 'anonymous'
+        arguments = ','.join('%s=%s' % item for item in
+                             sorted(request.view_args.items()))
+        return 'response:%s:%s:%s:%s' % (
+            state, request.endpoint, arguments,
+            request.query_string.decode('latin-1'))
+
+    def cached(self, ttl=None):
+        """
+        Decorator caching the GET responses of a view for anonymous
+        visitors. Responses that are not 200 or that set a cookie are
+        not cached.
+
+        :param ttl: Seconds before a page expires, defaults to
+                    RESPONSE_CACHE_TTL
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method != 'GET' or \
+                        current_user.is_authenticated:
+                    return view(*args, **kwargs)
+                key = self.make_key()
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    return app.response_class(body, status=status,
+                                              mimetype=mimetype)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and \
+                        not response.direct_passthrough and \
+                        'Set-Cookie' not in response.headers:
+                    self.backend.set(key, (response.get_data(),
+                                           response.status_code,
+                                           response.mimetype), ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def clear(self):
+        """
+        Remove every cached page, e.g. after the catalogue changed
+        outside of the ORM.
+        """
+        if self.backend is not None:
+            self.backend.clear()
+
+
+response_cache = ResponseCache(app)
+
+# Models shown on the cached pages
+CATALOGUE_MODELS = (Game, Developer, Publisher, Genre, Model, Platform)
+
+
+@models_committed.connect_via(app)
+def _invalidate_responses(sender, changes):
+    """
+    Clear the cached pages when a game, its relationships or a taxonomy
+    is committed, including edits made in the admin pages.
+    """
+    if any(isinstance(model, CATALOGUE_MODELS) for model, operation
+           in changes):
+        response_cache.clear()
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+@event.listens_for(db.Model.metadata, 'after_drop')
+def _reset_responses(target, connection, **kw):
+    """
+    Clear the cached pages when the tables are created or dropped.
+    """
+    response_cache.clear()
@@ -0,0 +1,146 @@
+from app import db
+from app.models import Game, Developer, Publisher, Genre, Model, \
+    Platform, game_developer, game_publisher, game_genre, game_model, \
+    game_platform
+from sqlalchemy import select
+
+# Columns of a game shown on the listing pages
+CARD_COLUMNS = (Game.game_id, Game.title, Game.image_url, Game.description)
+
+# Relationships of a game that a card can show as (attribute,
+# association table, taxonomy key, taxonomy name)
+CARD_TAXONOMIES = [
+    ('developer', game_developer, Developer.developer_id, Developer.name),
+    ('publisher', game_publisher, Publisher.publisher_id, Publisher.name),
+    ('genre', game_genre, Genre.genre_id, Genre.genre_type),
+    ('model', game_model, Model.model_id, Model.model_type),
+    ('platform', game_platform, Platform.platform_id,
+     Platform.platform_name),
+]
+
+
+class GameCard(object):
+    """
+    A read-only projection of a game for the listing pages. It is built
+    from column-only queries, so listing games does not create ORM
+    instances or track them in the session. It has the same attributes
+    and methods as Game that the listing templates use.
+
+    Attributes
+        game_id:        Stores the Game ID
+        title:          Stores the game's title
+        image_url:      Stores the game's image file name
+        description:    Stores the game's description
+        developer:      Stores the names of the game's developers
+        publisher:      Stores the names of the game's publishers
+        genre:          Stores the game's genre types
+        model:          Stores the game's model types
+        platform:       Stores the game's platform names
+    """
+    __slots__ = ['game_id', 'title', 'image_url', 'description',
+                 'developer', 'publisher', 'genre', 'model', 'platform']
+
+    def __init__(self, game_id, title, image_url, description):
+        self.game_id = game_id
+        self.title = title
+        self.image_url = image_url
+        self.description = description
+        self.developer = self.publisher = self.genre = self.model = \
+            self.platform = ()
+
+    def __repr__(self):
+        """
+        :return: title
+        """
+        return self.title
+
+    game_url = Game.game_url
+    image_url_to_string = Game.image_url_to_string
+    image_srcset = Game.image_srcset
+
+    def developer_to_string(self):
+        """
+        :return: developer list to string
+        """
+        return ', '.join(self.developer)
+
+    def publisher_to_string(self):
+        """
+        :return: publisher list to string
+        """
+        return ', '.join(self.publisher)
+
+    def genre_to_string(self):
+        """
+        :return: genre list to string
+        """
+        return ', '.join(self.genre)
+
+    def model_to_string(self):
+        """
+        :return: model list to string
+        """
+        return ', '.join(self.model)
+
+    def platform_to_string(self):
+        """
+        :return: platform list to string
+        """
+        return ', '.join(self.platform)
+
+
+def taxonomy_names(game_ids, attributes=None):
+    """
+    :param game_ids: List of game IDs
+    :param attributes: Relationships to load, all of them by default
+    :return: Dictionary of relationship to dictionary of game ID to list
+             of names, with one query per relationship for all the games
+    """
+    names = {}
+    for attribute, link, key, name in CARD_TAXONOMIES:
+        if attributes is not None and attribute not in attributes:
+            continue
+        games = names[attribute] = {}
+        if not game_ids:
+            continue
+        query = select([link.c.game_id, name]) \
+            .select_from(link.join(key.class_,
+                                   key == link.c[key.key])) \
+            .where(link.c.game_id.in_(game_ids))
+        for game_id, value in db.session.execute(query):
+            games.setdefault(game_id, []).append(value)
+    return names
+
+
+def add_taxonomy(cards):
+    """
+    Fill in the relationships of the cards with one query per
+    relationship for all the cards.
+
+    :param cards: List of cards
+    """
+    by_id = {card.game_id: card for card in cards}
+    if not by_id:
+        return
+    for attribute, games in taxonomy_names(list(by_id)).items():
+        for game_id, values in games.items():
+            setattr(by_id[game_id], attribute, tuple(values))
+
+
+def game_cards(game_ids, taxonomy=False):
+    """
+    Cards of the games, in the order of the IDs. Games that do not
+    exist are left out.
+
+    :param game_ids: List of game IDs
+    :param taxonomy: True to fill in the relationships of the games
+    :return: List of cards
+    """
+    if not game_ids:
+        return []
+    query = select(list(CARD_COLUMNS)).where(Game.game_id.in_(game_ids))
+    cards = {row[0]: GameCard(*row) for row in db.session.execute(query)}
+    cards = [cards[game_id] for game_id in game_ids if game_id in cards]
+    if taxonomy:
+        add_taxonomy(cards)
+    return cards
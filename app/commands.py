@@ -0,0 +1,115 @@
+import os
+
+import click
+
+from app import app
+from app.assets import manifest, fetch_vendor, build_bundles
+from app.exporter import export_games, export_library
+from app.importer import import_games
+from app.models import User
+from app.recommend import enqueue_all_users, refresh_queued
+
+
+@app.cli.command('recommend')
+@click.option('--all', 'everyone', is_flag=True,
+              help='Recompute the recommendations of every user.')
+@click.option('--batch-size', type=int, default=None,
+              help='Number of users recomputed per transaction.')
+def recommend(everyone, batch_size):
+    """
+    Recompute the outdated recommendations of the users, one batch of
+    users at a time, until none are left.
+    """
+    if everyone:
+        enqueue_all_users()
+    total = 0
+    while True:
+        count = refresh_queued(batch_size)
+        if not count:
+            break
+        total += count
+    click.echo('Recomputed the recommendations of %d users' % total)
+
+
+@app.cli.command('assets')
+@click.option('--clean', is_flag=True,
+              help='Delete the copies made by older builds.')
+def assets(clean):
+    """
+    Download the third-party files, build the bundles, then fingerprint
+    the static files and the game images by their content and write the
+    asset manifest.
+    """
+    try:
+        fetch_vendor(app.static_folder)
+        sizes = build_bundles(app.static_folder, app.root_path)
+    except (OSError, ValueError) as error:
+        click.echo('Bundles not built, the pages load the files from '
+                   'their CDN: %s' % error)
+    else:
+        for bundle, size in sorted(sizes.items()):
+            click.echo('Built %s (%d bytes)' % (bundle, size))
+    count = manifest.build(clean)
+    click.echo('Fingerprinted %d static files' % count)
+
+
+@app.cli.command('import-games')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              default=None, help='Format of the file, by default guessed '
+                                 'from its extension.')
+@click.option('--chunk-size', type=int, default=None,
+              help='Number of games written per transaction.')
+def import_games_command(path, file_format, chunk_size):
+    """
+    Import the games of a CSV file with a header row, or of a file with
+    one JSON object per line. Each game has a title, a release_date
+    (YYYY-MM-DD) and optionally a description, an image_url and the
+    developer, publisher, genre, model and platform names, as lists or
+    separated by ';'.
+    """
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = 'csv' if extension == '.csv' else 'jsonl'
+    with open(path, newline='', encoding='utf-8') as file:
+        try:
+            count = import_games(file, file_format, chunk_size,
+                                 lambda games: click.echo(
+                                     'Imported %d games' % games))
+        except ValueError as error:
+            raise click.ClickException(
+                'Import stopped, the chunks written before it are kept: %s'
+                % error)
+    click.echo('Imported %d games in total' % count)
+
+
+@app.cli.command('export-games')
+@click.argument('output', type=click.File('w', encoding='utf-8'),
+                default='-')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              default='jsonl', help='Format of the export.')
+def export_games_command(output, file_format):
+    """
+    Write the whole catalogue to OUTPUT, by default the standard output,
+    in the format read by import-games.
+    """
+    for chunk in export_games(file_format):
+        output.write(chunk)
+
+
+@app.cli.command('export-library')
+@click.argument('username')
+@click.argument('output', type=click.File('w', encoding='utf-8'),
+                default='-')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              default='jsonl', help='Format of the export.')
+def export_library_command(username, output, file_format):
+    """
+    Write the game list of a user to OUTPUT, by default the standard
+    output.
+    """
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException('No user named %s' % username)
+    for chunk in export_library(user.user_id, file_format):
+        output.write(chunk)
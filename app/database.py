@@ -0,0 +1,65 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+def apply_pragmas(connection, pragmas):
+    """
+    Set the pragmas on a new SQLite connection.
+
+    :param connection: DBAPI connection to SQLite
+    :param pragmas: Dictionary of pragma name to value
+    """
+    cursor = connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute('PRAGMA %s = %s' % (name, value))
+    cursor.close()
+
+
+class Database(SQLAlchemy):
+    """
+    A Flask-SQLAlchemy extension that tunes SQLite file databases for
+    concurrent workers when SQLITE_TUNING is set. Every new connection
+    gets the SQLITE_PRAGMAS, e.g. WAL journaling so readers do not wait
+    for writers, and connections are kept in a pool so the pragmas and
+    the page cache are not thrown away after every request.
+    """
+
+    @staticmethod
+    def _is_tuned(app, sa_url):
+        """
+        :return: True if the database is a tuned SQLite file
+        """
+        return app.config.get('SQLITE_TUNING') and \
+            sa_url.drivername == 'sqlite' and \
+            sa_url.database not in (None, '', ':memory:')
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        """
+        Pool the connections of a tuned SQLite file database. The busy
+        timeout is given to the driver, which otherwise gives up on a
+        locked database after 5 seconds regardless of the pragma.
+        """
+        super(Database, self).apply_driver_hacks(app, sa_url, options)
+        if self._is_tuned(app, sa_url):
+            options['poolclass'] = QueuePool
+            options['pool_size'] = app.config['SQLITE_POOL_SIZE']
+            options['max_overflow'] = app.config['SQLITE_POOL_OVERFLOW']
+            connect_args = options.setdefault('connect_args', {})
+            connect_args['check_same_thread'] = False
+            connect_args['timeout'] = \
+                app.config['SQLITE_PRAGMAS'].get('busy_timeout', 5000) / 1000
+
+    def create_engine(self, sa_url, engine_opts):
+        """
+        Set the pragmas on every connection of a tuned SQLite file
+        database.
+        """
+        engine = super(Database, self).create_engine(sa_url, engine_opts)
+        if self._is_tuned(self.get_app(), sa_url):
+            pragmas = dict(self.get_app().config['SQLITE_PRAGMAS'])
+
+            @event.listens_for(engine, 'connect')
+            def connect(connection, connection_record):
+                apply_pragmas(connection, pragmas)
+        return engine
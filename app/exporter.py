@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+
+from app import app, db
+from app.catalogue import CARD_TAXONOMIES, taxonomy_names
+from app.importer import CSV_SEPARATOR
+from app.models import Game, user_game
+
+# Fields of a game in the catalogue export, the format read by
+# `flask import-games`
+GAME_FIELDS = ['game_id', 'title', 'release_date', 'description',
+               'image_url'] + [taxonomy[0] for taxonomy in CARD_TAXONOMIES]
+
+# Fields of a game in a library export
+LIBRARY_FIELDS = ['game_id', 'title', 'added_at']
+
+# Mimetype of each export format
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def _batches(query):
+    """
+    Read the rows of a query from a server-side cursor, EXPORT_BATCH_SIZE
+    rows at a time.
+
+    :param query: Query of the rows
+    :return: Iterator of lists of rows
+    """
+    batch = []
+    for row in query.yield_per(app.config['EXPORT_BATCH_SIZE']):
+        batch.append(row)
+        if len(batch) == app.config['EXPORT_BATCH_SIZE']:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _encode(records, fields, file_format):
+    """
+    :param records: List of dictionaries of the fields
+    :param fields: Names of the fields, in order
+    :param file_format: 'csv' or 'jsonl'
+    :return: Text of the records
+    """
+    if file_format == 'jsonl':
+        return ''.join(json.dumps(record) + '\n' for record in records)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([CSV_SEPARATOR.join(record[field])
+                         if isinstance(record[field], list)
+                         else record[field] for field in fields])
+    return buffer.getvalue()
+
+
+def _header(fields, file_format):
+    """
+    :return: Header row of a CSV export, nothing for JSON lines
+    """
+    if file_format != 'csv':
+        return ''
+    return _encode([dict(zip(fields, fields))], fields, file_format)
+
+
+def export_games(file_format):
+    """
+    Stream the whole catalogue with the names of each game's taxonomies,
+    in the format read by `flask import-games`. The games are read in
+    batches from one cursor and the taxonomies of each batch are loaded
+    with one query per taxonomy, so memory stays flat however large the
+    catalogue is.
+
+    :param file_format: 'csv' or 'jsonl'
+    :return: Iterator of text chunks, one per batch of games
+    """
+    yield _header(GAME_FIELDS, file_format)
+    query = db.session.query(Game.game_id, Game.title, Game.release_date,
+                             Game.description, Game.image_url) \
+        .order_by(Game.game_id)
+    for batch in _batches(query):
+        names = taxonomy_names([row.game_id for row in batch])
+        records = []
+        for row in batch:
+            record = {'game_id': row.game_id, 'title': row.title,
+                      'release_date': row.release_date.isoformat(),
+                      'description': row.description,
+                      'image_url': row.image_url}
+            for attribute, games in names.items():
+                record[attribute] = games.get(row.game_id, [])
+            records.append(record)
+        yield _encode(records, GAME_FIELDS, file_format)
+
+
+def export_library(user_id, file_format):
+    """
+    Stream the games of a user's list, oldest first. The export can be
+    posted back to /batch to add the same games to a list.
+
+    :param user_id: ID of the user
+    :param file_format: 'csv' or 'jsonl'
+    :return: Iterator of text chunks
+    """
+    yield _header(LIBRARY_FIELDS, file_format)
+    query = db.session.query(Game.game_id, Game.title, user_game.c.added_at) \
+        .join(user_game, user_game.c.game_id == Game.game_id) \
+        .filter(user_game.c.user_id == user_id) \
+        .order_by(user_game.c.added_at, user_game.c.game_id)
+    for batch in _batches(query):
+        yield _encode([{'game_id': row.game_id, 'title': row.title,
+                        'added_at': row.added_at.isoformat()}
+                       for row in batch], LIBRARY_FIELDS, file_format)
+
+
+def read_game_ids(text, file_format):
+    """
+    :param text: Text of a library export
+    :param file_format: 'csv' or 'jsonl'
+    :return: List of the game IDs of the export
+    :raise ValueError: If a game has no valid ID
+    """
+    if file_format == 'csv':
+        records = csv.DictReader(io.StringIO(text))
+    else:
+        records = (json.loads(line) for line in text.splitlines()
+                   if line.strip())
+    return [int(record['game_id']) for record in records]
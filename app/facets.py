@@ -0,0 +1,494 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from app import app, db
+from app.catalogue import CARD_TAXONOMIES
+from app.models import Game
+from sqlalchemy import event, inspect, select
+
+# Taxonomy facets as (facet, association table, taxonomy key, taxonomy
+# name), then the release year
+TAXONOMY_FACETS = CARD_TAXONOMIES
+FACETS = [facet[0] for facet in TAXONOMY_FACETS] + ['year']
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+
+def _bitmap(ids, size):
+    """
+    :param ids: Iterable of game IDs below size
+    :param size: Number of bits of the bitmap
+    :return: Bitmap of the IDs as an integer with the bit of each ID set
+    """
+    buffer = bytearray((size >> 3) + 1)
+    for game_id in ids:
+        buffer[game_id >> 3] |= 1 << (game_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class Posting(object):
+    """
+    The games of one facet value. Rare values keep a sorted array of
+    game IDs, and values with more than one game in 64 keep a bitmap,
+    which is then smaller and is intersected with other bitmaps in one
+    operation.
+    """
+    __slots__ = ['ids', 'bits', 'count']
+
+    def __init__(self, ids=None):
+        self.ids = array('l', sorted(ids or ()))
+        self.bits = None
+        self.count = len(self.ids)
+
+    def __len__(self):
+        return self.count
+
+    def compact(self, size):
+        """
+        Switch to a bitmap once it is smaller than the array.
+
+        :param size: Number of bits of the bitmaps
+        """
+        if self.bits is None and self.count * 64 > size:
+            self.bits = _bitmap(self.ids, size)
+            self.ids = None
+
+    def add(self, game_id, size):
+        """
+        :param game_id: ID of the game
+        :param size: Number of bits of the bitmaps
+        """
+        if self.bits is not None:
+            if not self.bits >> game_id & 1:
+                self.bits |= 1 << game_id
+                self.count += 1
+            return
+        index = bisect_left(self.ids, game_id)
+        if index == len(self.ids) or self.ids[index] != game_id:
+            self.ids.insert(index, game_id)
+            self.count += 1
+            self.compact(size)
+
+    def discard(self, game_id):
+        """
+        :param game_id: ID of the game
+        """
+        if self.bits is not None:
+            if self.bits >> game_id & 1:
+                self.bits ^= 1 << game_id
+                self.count -= 1
+            return
+        index = bisect_left(self.ids, game_id)
+        if index < len(self.ids) and self.ids[index] == game_id:
+            del self.ids[index]
+            self.count -= 1
+
+    def to_bits(self, size):
+        """
+        :param size: Number of bits of the bitmaps
+        :return: Bitmap of the games
+        """
+        if self.bits is not None:
+            return self.bits
+        return _bitmap(self.ids, size)
+
+    def count_in(self, bits, members):
+        """
+        :param bits: Bitmap of the candidate games
+        :param members: The same bitmap as little-endian bytes
+        :return: Number of the value's games among the candidates
+        """
+        if self.bits is not None:
+            return _popcount(self.bits & bits)
+        limit = len(members) << 3
+        return sum(1 for game_id in self.ids if game_id < limit and
+                   members[game_id >> 3] >> (game_id & 7) & 1)
+
+
+class FacetIndex(object):
+    """
+    An in-memory index of the games of every developer, publisher, genre,
+    model, platform and release year. Filters are bitmap intersections
+    and the count of every facet value is taken against the games
+    matching the other facets' filters, so browsing never groups the
+    association tables in the database.
+
+    The index is loaded on first use and kept up to date from committed
+    sessions. Changes committed by other processes are picked up by
+    reloading it once it is older than the refresh interval.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._postings = None
+        self._all = 0
+        self._size = 0
+        self._loaded_at = 0
+        # When the index was loaded and the changes applied since, which
+        # identify what browse returns
+        self._generation = None
+        self._changes = 0
+
+    def invalidate(self):
+        """
+        Drop the index so it is reloaded on the next use.
+        """
+        with self._lock:
+            self._postings = None
+
+    def load(self, games, links):
+        """
+        Replace the index.
+
+        :param games: Iterable of (game_id, release_date) pairs
+        :param links: Dictionary of taxonomy facet to iterable of
+                      (game_id, value) pairs
+        """
+        values = {facet: {} for facet in FACETS}
+        game_ids = []
+        for game_id, release_date in games:
+            game_ids.append(game_id)
+            values['year'].setdefault(release_date.year, []).append(game_id)
+        for facet, rows in links.items():
+            for game_id, value in rows:
+                values[facet].setdefault(value, []).append(game_id)
+        # Leave room for the games added before the next reload
+        size = (max(game_ids) if game_ids else 0) * 5 // 4 + 1024
+        postings = {}
+        for facet, ids in values.items():
+            postings[facet] = {}
+            for value, value_ids in ids.items():
+                posting = postings[facet][value] = Posting(value_ids)
+                posting.compact(size)
+        with self._lock:
+            self._postings = postings
+            self._all = _bitmap(game_ids, size)
+            self._size = size
+            self._loaded_at = time.monotonic()
+            self._generation = time.time()
+            self._changes = 0
+
+    def _ensure_loaded(self):
+        """
+        Load the index from the database if it is missing or stale.
+        """
+        stale = self.refresh_interval is not None and \
+            time.monotonic() - self._loaded_at > self.refresh_interval
+        if self._postings is None or stale:
+            links = {}
+            for facet, link, key, name in TAXONOMY_FACETS:
+                links[facet] = db.session.execute(
+                    select([link.c.game_id, link.c[key.key]]))
+            self.load(db.session.query(Game.game_id, Game.release_date)
+                      .yield_per(10000), links)
+
+    def _grow(self, game_id):
+        """
+        Make room in the bitmaps for a game ID past their size.
+
+        :param game_id: ID of a new game
+        """
+        if game_id >= self._size:
+            self._size = game_id * 5 // 4 + 1024
+
+    def add(self, facet, value, game_id):
+        """
+        :param facet: Name of the facet
+        :param value: ID of the taxonomy or the release year
+        :param game_id: ID of the game
+        """
+        with self._lock:
+            if self._postings is None:
+                return
+            self._grow(game_id)
+            posting = self._postings[facet].get(value)
+            if posting is None:
+                posting = self._postings[facet][value] = Posting()
+            posting.add(game_id, self._size)
+            self._changes += 1
+
+    def discard(self, facet, value, game_id):
+        """
+        :param facet: Name of the facet
+        :param value: ID of the taxonomy or the release year
+        :param game_id: ID of the game
+        """
+        with self._lock:
+            if self._postings is None:
+                return
+            posting = self._postings[facet].get(value)
+            if posting is not None:
+                posting.discard(game_id)
+            self._changes += 1
+
+    def add_game(self, game_id):
+        """
+        :param game_id: ID of a new game
+        """
+        with self._lock:
+            if self._postings is not None:
+                self._grow(game_id)
+                self._all |= 1 << game_id
+                self._changes += 1
+
+    def discard_game(self, game_id):
+        """
+        :param game_id: ID of a deleted game
+        """
+        with self._lock:
+            if self._postings is None:
+                return
+            self._all &= ~(1 << game_id)
+            for values in self._postings.values():
+                for posting in values.values():
+                    posting.discard(game_id)
+            self._changes += 1
+
+    def discard_value(self, facet, value):
+        """
+        :param facet: Name of the facet
+        :param value: ID of a deleted taxonomy
+        """
+        with self._lock:
+            if self._postings is not None:
+                self._postings[facet].pop(value, None)
+                self._changes += 1
+
+    def state(self):
+        """
+        :return: When the index was loaded and the number of changes
+                 applied to it since, which change whenever what browse
+                 returns may change
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._generation, self._changes
+
+    def _selection(self, facet, values):
+        """
+        :return: Bitmap of the games with any of the values of the facet
+        """
+        bits = 0
+        for value in values:
+            posting = self._postings[facet].get(value)
+            if posting is not None:
+                bits |= posting.to_bits(self._size)
+        return bits
+
+    def browse(self, filters, cursor=None, n=20):
+        """
+        Find the games matching any of the selected values of every
+        filtered facet, newest first, and count the games of each facet
+        value among the games matching the filters of the other facets.
+
+        :param filters: Dictionary of facet to set of selected values
+        :param cursor: Game ID the page starts below, None for the first
+                       page
+        :param n: Number of games per page
+        :return: List of the game IDs on the page, the cursor of the next
+                 page or None, the number of matching games and a
+                 dictionary of facet to dictionary of value to count
+        """
+        with self._lock:
+            self._ensure_loaded()
+            selections = {facet: self._selection(facet, values)
+                          for facet, values in filters.items() if values}
+            matches = self._all
+            for bits in selections.values():
+                matches &= bits
+            counts = {}
+            for facet in FACETS:
+                postings = self._postings[facet]
+                base = self._all
+                for other, bits in selections.items():
+                    if other != facet:
+                        base &= bits
+                if base == self._all:
+                    counts[facet] = {value: len(posting) for value, posting
+                                     in postings.items() if len(posting)}
+                    continue
+                members = base.to_bytes((base.bit_length() + 7) >> 3,
+                                        'little')
+                counts[facet] = {}
+                for value, posting in postings.items():
+                    count = posting.count_in(base, members)
+                    if count:
+                        counts[facet][value] = count
+
+        total = _popcount(matches)
+        if cursor is not None:
+            matches &= (1 << max(cursor, 0)) - 1
+        game_ids = []
+        while matches and len(game_ids) <= n:
+            game_id = matches.bit_length() - 1
+            game_ids.append(game_id)
+            matches ^= 1 << game_id
+        next_cursor = game_ids[n - 1] if len(game_ids) > n else None
+        return game_ids[:n], next_cursor, total, counts
+
+
+facet_index = FacetIndex(app.config.get('FACET_REFRESH_INTERVAL'))
+
+
+def facet_names(facet, values):
+    """
+    :param facet: Name of the facet
+    :param values: IDs of the taxonomy, or release years
+    :return: Dictionary of value to its name
+    """
+    values = list(values)
+    if facet == 'year' or not values:
+        return {value: str(value) for value in values}
+    for name_facet, link, key, name in TAXONOMY_FACETS:
+        if name_facet == facet:
+            names = {}
+            for start in range(0, len(values), 500):
+                query = select([key, name]).where(
+                    key.in_(values[start:start + 500]))
+                names.update((row[0], row[1])
+                             for row in db.session.execute(query))
+            return names
+    raise ValueError("Unknown facet %r" % facet)
+
+
+def parse_filters(args):
+    """
+    :param args: Query string arguments, each facet repeated for every
+                 selected value
+    :return: Dictionary of facet to set of selected values
+    :raise ValueError: If a value is not a number
+    """
+    return {facet: {int(value) for value in args.getlist(facet)}
+            for facet in FACETS if args.getlist(facet)}
+
+
+def facet_summary(counts, filters, limit=None):
+    """
+    The values of each facet to show, the years newest first and the
+    taxonomies with the most games first. Selected values are always
+    shown.
+
+    :param counts: Dictionary of facet to dictionary of value to count
+    :param filters: Dictionary of facet to set of selected values
+    :param limit: Most values shown per facet, FACET_VALUES_SHOWN by
+                  default
+    :return: List of (facet, list of (value, name, count, selected))
+    """
+    limit = limit or app.config['FACET_VALUES_SHOWN']
+    summary = []
+    for facet in FACETS:
+        selected = filters.get(facet, set())
+        if facet == 'year':
+            order = sorted(counts[facet], reverse=True)
+        else:
+            order = sorted(counts[facet],
+                           key=lambda value: (-counts[facet][value], value))
+        shown = order[:limit]
+        shown += [value for value in selected if value not in shown]
+        names = facet_names(facet, shown)
+        values = [(value, names[value], counts[facet].get(value, 0),
+                   value in selected) for value in shown if value in names]
+        if values:
+            summary.append((facet, values))
+    return summary
+
+
+def _record_collection(changes, facet, history, value_of, game_of):
+    """
+    Remember the associations added to and removed from one side of a
+    relationship. Collections that were not loaded have no history.
+
+    :param changes: List of changes of the transaction
+    :param facet: Name of the facet
+    :param history: History of the relationship
+    :param value_of: Function giving the taxonomy ID of an item
+    :param game_of: Function giving the game ID of an item
+    """
+    for operation, items in (('add', history.added),
+                             ('discard', history.deleted)):
+        for item in items or ():
+            changes.append((operation, facet, value_of(item), game_of(item)))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_facet_changes(session, flush_context):
+    """
+    Remember the games and associations added, changed or removed by the
+    flush until the transaction is committed, from either side of the
+    relationships.
+    """
+    changes = session.info.setdefault('facet_changes', [])
+    for instance in list(session.new) + list(session.dirty):
+        state = inspect(instance)
+        if isinstance(instance, Game):
+            game_id = instance.game_id
+            if instance in session.new:
+                changes.append(('add_game', None, None, game_id))
+            history = state.attrs.release_date.history
+            for operation, values in (('discard', history.deleted),
+                                      ('add', history.added)):
+                for release_date in values or ():
+                    if release_date is not None:
+                        changes.append((operation, 'year',
+                                        release_date.year, game_id))
+            for facet, link, key, name in TAXONOMY_FACETS:
+                _record_collection(
+                    changes, facet, state.attrs[facet].history,
+                    lambda taxonomy: getattr(taxonomy, key.key),
+                    lambda taxonomy: game_id)
+            continue
+        # The backref of a taxonomy, e.g. Genre.game_genre
+        for facet, link, key, name in TAXONOMY_FACETS:
+            if isinstance(instance, key.class_):
+                value = getattr(instance, key.key)
+                _record_collection(
+                    changes, facet, state.attrs['game_' + facet].history,
+                    lambda game: value, lambda game: game.game_id)
+    for instance in session.deleted:
+        if isinstance(instance, Game):
+            changes.append(('discard_game', None, None, instance.game_id))
+        for facet, link, key, name in TAXONOMY_FACETS:
+            if isinstance(instance, key.class_):
+                changes.append(('discard_value', facet,
+                                getattr(instance, key.key), None))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_facet_changes(session):
+    """
+    Apply the committed changes to the facet index.
+    """
+    for operation, facet, value, game_id in \
+            session.info.pop('facet_changes', []):
+        if operation == 'add_game':
+            facet_index.add_game(game_id)
+        elif operation == 'discard_game':
+            facet_index.discard_game(game_id)
+        elif operation == 'discard_value':
+            facet_index.discard_value(facet, value)
+        else:
+            getattr(facet_index, operation)(facet, value, game_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_facet_changes(session):
+    """
+    Forget the changes of a transaction that was rolled back.
+    """
+    session.info.pop('facet_changes', None)
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+@event.listens_for(db.Model.metadata, 'after_drop')
+def _reset_facets(target, connection, **kw):
+    """
+    Reload the facet index after the tables are created or dropped.
+    """
+    facet_index.invalidate()
@@ -0,0 +1,99 @@
+from app import app, db
+from app.cache import LRUCache
+from app.models import User
+from flask_login import UserMixin
+from flask_sqlalchemy import models_committed
+from sqlalchemy import event, inspect
+
+
+class Principal(UserMixin):
+    """
+    A light copy of the logged in user kept for the session. It only
+    holds the columns the pages need, so it can be cached between
+    requests without holding on to an ORM instance and its lazy loads.
+    Views that change the user load the User themselves.
+
+    Attributes
+        user_id:    Stores the User ID
+        username:   Stores the user's username
+        email:      Stores the user's email address
+        admin:      Stores the user's account type
+    """
+    __slots__ = ['user_id', 'username', 'email', 'admin']
+
+    def __init__(self, user_id, username, email, admin):
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.admin = admin
+
+    def __repr__(self):
+        """
+        :return: username
+        """
+        return self.username
+
+    def get_id(self):
+        """
+        :return: user_id
+        """
+        return self.user_id
+
+    def is_admin(self):
+        """
+        :return: admin
+        """
+        return self.admin
+
+
+user_cache = LRUCache(app.config['USER_CACHE_SIZE'],
+                      app.config['USER_CACHE_TTL'])
+
+
+def load_principal(user_id):
+    """
+    Find the logged in user, from the cache if it was loaded recently.
+
+    :param user_id: ID of the user
+    :return: Principal of the user, None if the user does not exist
+    """
+    principal = user_cache.get(user_id)
+    if principal is None:
+        row = db.session.query(User.user_id, User.username, User.email,
+                               User.admin) \
+            .filter(User.user_id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        user_cache.set(user_id, principal)
+    return principal
+
+
+def forget_user(user_id):
+    """
+    Remove a user from the cache, e.g. after their details changed.
+
+    :param user_id: ID of the user
+    """
+    user_cache.delete(user_id)
+
+
+@models_committed.connect_via(app)
+def _forget_changed_users(sender, changes):
+    """
+    Remove users changed by a commit from the cache, including edits made
+    in the admin pages.
+    """
+    for model, operation in changes:
+        # The identity is read without reloading the expired instance
+        if isinstance(model, User) and inspect(model).identity:
+            forget_user(inspect(model).identity[0])
+
+
+@event.listens_for(User.__table__, 'after_create')
+@event.listens_for(User.__table__, 'after_drop')
+def _reset_users(target, connection, **kw):
+    """
+    Empty the cache when the user table is created or dropped.
+    """
+    user_cache.clear()
@@ -0,0 +1,177 @@
+import os
+import tempfile
+
+from app import app
+from app.assets import manifest
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+# Folder of the original game images
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), 'static', 'game image')
+
+# Pillow formats of the variants by file extension
+FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+
+# Encoder options of each format
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 6},
+}
+
+
+def thumbnails_enabled():
+    """
+    :return: True if thumbnails are turned on and Pillow is installed
+    """
+    return Image is not None and app.config['THUMBNAILS']
+
+
+def thumbnail_url(filename, size, webp=False):
+    """
+    :param filename: File name of the original image
+    :param size: Name of the size in IMAGE_SIZES
+    :param webp: True for the WebP variant, otherwise the variant has the
+                 format of the original
+    :return: URL of the thumbnail, versioned by the content of the
+             original if it is in the asset manifest
+    """
+    url = '/thumbnails/%s/%s%s' % (size, filename, '.webp' if webp else '')
+    version = image_version(filename)
+    return url + '?v=' + version if version else url
+
+
+def image_version(filename):
+    """
+    :param filename: File name of the original image
+    :return: Hash of the original's content, None if it is not in the
+             asset manifest
+    """
+    return manifest.version('game image/' + filename)
+
+
+def thumbnail_srcset(filename, webp=False):
+    """
+    :param filename: File name of the original image
+    :param webp: True for the WebP variants
+    :return: srcset attribute listing the thumbnail of every size
+    """
+    sizes = sorted(app.config['IMAGE_SIZES'].items(),
+                   key=lambda item: item[1])
+    return ', '.join('%s %dw' % (thumbnail_url(filename, size, webp), width)
+                     for size, (width, height) in sizes)
+
+
+def _source(name):
+    """
+    :param name: File name of a variant, the original's file name with
+                 '.webp' appended for the WebP variant
+    :return: Path of the original image and the Pillow format of the
+             variant, None if the name is not valid
+    """
+    source = name[:-len('.webp')] if name.endswith('.webp') else name
+    extension = os.path.splitext(name)[1].lower()
+    path = os.path.normpath(os.path.join(IMAGE_PATH, source))
+    if extension not in FORMATS or \
+            os.path.dirname(path) != os.path.normpath(IMAGE_PATH):
+        return None
+    return path, FORMATS[extension]
+
+
+def _save_variant(image, path, dimensions, image_format):
+    """
+    Crop and resize an image to the dimensions and write it atomically,
+    so a concurrent request never serves a half-written file.
+
+    :param image: Pillow image of the original
+    :param path: Path of the variant
+    :param dimensions: (width, height) of the variant
+    :param image_format: Pillow format of the variant
+    """
+    variant = ImageOps.fit(image, dimensions, Image.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA', 'L'):
+        variant = variant.convert('RGBA')
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=folder)
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            variant.save(file, image_format, **SAVE_OPTIONS[image_format])
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def thumbnail_path(size, name):
+    """
+    Find a thumbnail in the on-disk cache, making it first if it is
+    missing or older than the original.
+
+    :param size: Name of the size in IMAGE_SIZES
+    :param name: File name of the variant
+    :return: Path of the thumbnail relative to THUMBNAIL_PATH, None if
+             the size, the name or the original image is not valid
+    """
+    source = _source(name)
+    if size not in app.config['IMAGE_SIZES'] or source is None or \
+            not os.path.isfile(source[0]):
+        return None
+    source, image_format = source
+    relative = os.path.join(size, name)
+    path = os.path.join(app.config['THUMBNAIL_PATH'], relative)
+    if not os.path.isfile(path) or \
+            os.path.getmtime(path) < os.path.getmtime(source):
+        try:
+            with Image.open(source) as image:
+                _save_variant(image, path, app.config['IMAGE_SIZES'][size],
+                              image_format)
+        except (OSError, Image.DecompressionBombError):
+            return None
+    return relative
+
+
+def process_upload(path):
+    """
+    Shrink an uploaded image that is larger than IMAGE_MAX_SIZE and make
+    all of its thumbnails.
+
+    :param path: Path of the uploaded image
+    :return: True if the file is an image, False otherwise
+    """
+    filename = os.path.basename(path)
+    try:
+        with Image.open(path) as image:
+            image.load()
+            image_format = image.format
+            if image.width > app.config['IMAGE_MAX_SIZE'][0] or \
+                    image.height > app.config['IMAGE_MAX_SIZE'][1]:
+                image.thumbnail(app.config['IMAGE_MAX_SIZE'], Image.LANCZOS)
+                image.save(path, image_format,
+                           **SAVE_OPTIONS.get(image_format, {}))
+    except (OSError, Image.DecompressionBombError):
+        return False
+    for size in app.config['IMAGE_SIZES']:
+        for name in (filename, filename + '.webp'):
+            thumbnail_path(size, name)
+    return True
+
+
+def remove_thumbnails(filename):
+    """
+    Remove the thumbnails of an image, and its fingerprint as it no longer
+    matches the file.
+
+    :param filename: File name of an original image that was deleted
+    """
+    manifest.forget('game image/' + filename)
+    for size in app.config['IMAGE_SIZES']:
+        for name in (filename, filename + '.webp'):
+            path = os.path.join(app.config['THUMBNAIL_PATH'], size, name)
+            if os.path.isfile(path):
+                os.remove(path)
@@ -0,0 +1,235 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+
+from app import app, db
+from app.cache import response_cache
+from app.facets import facet_index
+from app.models import Game, Developer, Publisher, Genre, Model, Platform, \
+    game_developer, game_publisher, game_genre, game_model, game_platform
+from app.recommend import enqueue_all_users
+from app.sampling import sampler
+from app.search import create_search_triggers, drop_search_triggers, \
+    index_games
+from app.versions import create_version_triggers, drop_version_triggers, \
+    bump_versions
+from sqlalchemy import select, func
+
+# Taxonomies of a game as (field of the file, taxonomy table, taxonomy
+# key, taxonomy name, association table)
+TAXONOMIES = [
+    ('developer', Developer.__table__, 'developer_id', 'name',
+     game_developer),
+    ('publisher', Publisher.__table__, 'publisher_id', 'name',
+     game_publisher),
+    ('genre', Genre.__table__, 'genre_id', 'genre_type', game_genre),
+    ('model', Model.__table__, 'model_id', 'model_type', game_model),
+    ('platform', Platform.__table__, 'platform_id', 'platform_name',
+     game_platform),
+]
+
+# Separator of the names in a taxonomy field of a CSV file
+CSV_SEPARATOR = ';'
+
+# Most names looked up in one IN query
+LOOKUP_SIZE = 500
+
+
+def read_records(file, file_format):
+    """
+    Read the games of a file one at a time.
+
+    :param file: Text file of games
+    :param file_format: 'csv' for a CSV file with a header row, 'jsonl'
+                        for one JSON object per line
+    :return: Iterator of (line number, dictionary of the game's fields)
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise ValueError("Line %d: %s" % (line_number, error))
+            yield line_number, record
+    else:
+        raise ValueError("Unknown import format %r" % file_format)
+
+
+def _names(value):
+    """
+    :param value: Taxonomy field of a game, a list of names or a string
+                  of names separated by CSV_SEPARATOR
+    :return: List of the distinct names, in order
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(CSV_SEPARATOR)
+    names = []
+    for name in value:
+        name = str(name).strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def parse_record(record):
+    """
+    :param record: Dictionary of the fields of a game
+    :return: Row of the game table and a dictionary of taxonomy field to
+             list of names
+    """
+    title = (record.get('title') or '').strip()
+    if not title:
+        raise ValueError("The game has no title")
+    release_date = record.get('release_date')
+    if not release_date:
+        raise ValueError("The game has no release date")
+    row = {'title': title,
+           'description': record.get('description') or None,
+           'release_date': date.fromisoformat(release_date),
+           'image_url': record.get('image_url') or 'placeholder.jpg'}
+    return row, {field: _names(record.get(field))
+                 for field, table, key, name, link in TAXONOMIES}
+
+
+class CatalogueImporter(object):
+    """
+    Loads games and their taxonomies in chunks, each written with a few
+    executemany statements in one transaction. The IDs of the taxonomy
+    names are kept in memory, so a name already seen is never looked up
+    again and new names are inserted once.
+    """
+
+    def __init__(self, connection, chunk_size=None, progress=None):
+        self.connection = connection
+        self.chunk_size = chunk_size or app.config['IMPORT_CHUNK_SIZE']
+        self.progress = progress
+        self.ids = {}
+        for field, table, key, name, link in TAXONOMIES:
+            self.ids[field] = dict(
+                (row[1], row[0]) for row in connection.execute(
+                    select([table.c[key], table.c[name]])))
+        self.games = 0
+
+    def _add_names(self, field, table, key, name, names):
+        """
+        Insert the names missing from the map and add their IDs to it.
+        Names inserted meanwhile by another process are kept.
+
+        :param field: Taxonomy field
+        :param table: Taxonomy table
+        :param key: Taxonomy key
+        :param name: Taxonomy name
+        :param names: Set of names used by the chunk
+        """
+        ids = self.ids[field]
+        missing = [value for value in names if value not in ids]
+        if not missing:
+            return
+        self.connection.execute(table.insert().prefix_with('OR IGNORE'),
+                                [{name: value} for value in missing])
+        for start in range(0, len(missing), LOOKUP_SIZE):
+            part = missing[start:start + LOOKUP_SIZE]
+            ids.update((row[1], row[0]) for row in self.connection.execute(
+                select([table.c[key], table.c[name]])
+                .where(table.c[name].in_(part))))
+
+    def write_chunk(self, games):
+        """
+        Write a chunk of games, their new taxonomy names and their links
+        in one transaction.
+
+        :param games: List of parsed games
+        """
+        with self.connection.begin():
+            for field, table, key, name, link in TAXONOMIES:
+                self._add_names(field, table, key, name,
+                                {value for row, taxonomy in games
+                                 for value in taxonomy[field]})
+            self.connection.execute(Game.__table__.insert(),
+                                    [row for row, taxonomy in games])
+            # SQLite numbers the rows of one insert after the largest ID,
+            # and the transaction holds the write lock since the insert
+            last = self.connection.execute(
+                select([func.max(Game.game_id)])).scalar()
+            first = last - len(games) + 1
+            for field, table, key, name, link in TAXONOMIES:
+                ids = self.ids[field]
+                links = [{'game_id': game_id, key: ids[value]}
+                         for game_id, (row, taxonomy)
+                         in enumerate(games, first)
+                         for value in taxonomy[field]]
+                if links:
+                    self.connection.execute(link.insert(), links)
+            index_games(self.connection, first, last)
+        self.games += len(games)
+        if self.progress is not None:
+            self.progress(self.games)
+
+    def load(self, records):
+        """
+        :param records: Iterator of (line number, dictionary of fields)
+        :return: Number of games written
+        """
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return self.games
+            games = []
+            for line_number, record in chunk:
+                try:
+                    games.append(parse_record(record))
+                except (ValueError, TypeError, AttributeError) as error:
+                    raise ValueError("Line %d: %s" % (line_number, error))
+            self.write_chunk(games)
+
+
+def import_games(file, file_format, chunk_size=None, progress=None):
+    """
+    Stream games from a file into the catalogue. The search index
+    triggers would re-index a game for every link written, so they are
+    dropped during the import and each chunk indexes its own games in its
+    transaction. The index stays searchable throughout, but games edited
+    by other processes meanwhile are not re-indexed. The table version
+    triggers are dropped too, and the versions bumped once at the end.
+
+    The caches of this process are cleared and the recommendations of
+    every user are queued. Other workers see the new games once their
+    sampler, facet index and caches expire.
+
+    :param file: Text file of games
+    :param file_format: 'csv' or 'jsonl'
+    :param chunk_size: Number of games written per transaction
+    :param progress: Function called with the number of games written
+                     after each chunk
+    :return: Number of games imported
+    """
+    connection = db.engine.connect()
+    importer = CatalogueImporter(connection, chunk_size, progress)
+    drop_search_triggers(connection)
+    drop_version_triggers(connection, keep_versions=True)
+    try:
+        importer.load(read_records(file, file_format))
+    finally:
+        with connection.begin():
+            create_search_triggers(connection)
+            create_version_triggers(connection)
+            # Also counts the writes of other processes during the import
+            bump_versions(connection)
+        connection.close()
+        if importer.games:
+            enqueue_all_users()
+            db.session.commit()
+            sampler.invalidate()
+            facet_index.invalidate()
+            response_cache.clear()
+    return importer.games
@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+import time
+
+from app import app
+from flask import request, request_started, request_finished, \
+    request_tearing_down, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.instrumentation')
+
+
+class RequestRecord(object):
+    """
+    The statements and timings of the request being served by a thread.
+    """
+    __slots__ = ['started', 'queries', 'db_time', 'template_time',
+                 'statements', 'query_started', 'template_started',
+                 'status']
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # Statement to the set of its distinct parameters
+        self.statements = {}
+        self.query_started = None
+        self.template_started = None
+        self.status = None
+
+    def repeated_statements(self, threshold):
+        """
+        :param threshold: Number of runs of one statement with different
+                          parameters that counts as an N+1 pattern
+        :return: List of (statement, runs) of the N+1 patterns, most runs
+                 first
+        """
+        repeated = [(statement, len(parameters)) for statement, parameters
+                    in self.statements.items()
+                    if len(parameters) >= threshold]
+        return sorted(repeated, key=lambda item: -item[1])
+
+
+class Instrumentation(object):
+    """
+    Records the number of SQL statements, the time spent in the database
+    and in templates and the latency of every request, totalled per
+    route. Requests slower than INSTRUMENTATION_SLOW_REQUEST seconds, and
+    requests running one statement with different parameters at least
+    INSTRUMENTATION_REPEAT_THRESHOLD times, e.g. lazy loads in a loop,
+    are written to the 'app.instrumentation' log as JSON.
+
+    A request is recorded when it is torn down rather than when its
+    response is returned, so the queries of a streamed response, e.g. an
+    export, and the time taken to send it are counted.
+
+    The listeners are only attached while it is enabled, so it costs
+    nothing when INSTRUMENTATION is off.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def enable(self):
+        """
+        Attach the listeners to every engine and to the request and
+        template signals.
+        """
+        if self.enabled:
+            return
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        request_started.connect(self._request_started, self.app)
+        request_finished.connect(self._request_finished, self.app)
+        request_tearing_down.connect(self._request_tearing_down, self.app)
+        before_render_template.connect(self._before_render, self.app)
+        template_rendered.connect(self._template_rendered, self.app)
+        self.enabled = True
+
+    def disable(self):
+        """
+        Detach all the listeners.
+        """
+        if not self.enabled:
+            return
+        event.remove(Engine, 'before_cursor_execute', self._before_execute)
+        event.remove(Engine, 'after_cursor_execute', self._after_execute)
+        request_started.disconnect(self._request_started, self.app)
+        request_finished.disconnect(self._request_finished, self.app)
+        request_tearing_down.disconnect(self._request_tearing_down, self.app)
+        before_render_template.disconnect(self._before_render, self.app)
+        template_rendered.disconnect(self._template_rendered, self.app)
+        self._local.record = None
+        self.enabled = False
+
+    def _record(self):
+        """
+        :return: The record of the current thread's request, None outside
+                 of a request
+        """
+        return getattr(self._local, 'record', None)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context,
+                        executemany):
+        record = self._record()
+        if record is not None:
+            record.query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        record = self._record()
+        if record is None or record.query_started is None:
+            return
+        record.db_time += time.perf_counter() - record.query_started
+        record.query_started = None
+        record.queries += 1
+        try:
+            key = repr(parameters)
+        except Exception:
+            key = id(parameters)
+        record.statements.setdefault(statement, set()).add(key)
+
+    def _request_started(self, sender, **extra):
+        self._local.record = RequestRecord()
+
+    def _before_render(self, sender, template, context, **extra):
+        record = self._record()
+        if record is not None:
+            record.template_started = time.perf_counter()
+
+    def _template_rendered(self, sender, template, context, **extra):
+        record = self._record()
+        if record is not None and record.template_started is not None:
+            record.template_time += \
+                time.perf_counter() - record.template_started
+            record.template_started = None
+
+    def _request_finished(self, sender, response, **extra):
+        record = self._record()
+        if record is not None:
+            record.status = response.status_code
+
+    def _request_tearing_down(self, sender, exc=None, **extra):
+        record = self._record()
+        if record is None:
+            return
+        self._local.record = None
+        if record.status is None:
+            # The request failed before it had a response
+            record.status = 500
+        duration = time.perf_counter() - record.started
+        route = request.endpoint or 'unknown'
+        repeated = record.repeated_statements(
+            self.app.config['INSTRUMENTATION_REPEAT_THRESHOLD'])
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    'requests': 0, 'queries': 0, 'db_ms': 0.0,
+                    'template_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'slow': 0, 'n_plus_one': 0}
+            stats['requests'] += 1
+            stats['queries'] += record.queries
+            stats['db_ms'] += record.db_time * 1000
+            stats['template_ms'] += record.template_time * 1000
+            stats['total_ms'] += duration * 1000
+            stats['max_ms'] = max(stats['max_ms'], duration * 1000)
+            slow = duration >= self.app.config['INSTRUMENTATION_SLOW_REQUEST']
+            stats['slow'] += slow
+            stats['n_plus_one'] += bool(repeated)
+        if slow or repeated:
+            logger.warning(json.dumps({
+                'route': route, 'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status': record.status,
+                'slow': slow, 'total_ms': round(duration * 1000, 2),
+                'queries': record.queries,
+                'db_ms': round(record.db_time * 1000, 2),
+                'template_ms': round(record.template_time * 1000, 2),
+                'repeated_statements': [
+                    {'statement': statement, 'runs': runs}
+                    for statement, runs in repeated]}))
+
+    def stats(self):
+        """
+        :return: Dictionary of route to the number of requests and their
+                 totals, with the averages per request
+        """
+        with self._lock:
+            stats = {route: dict(values)
+                     for route, values in self.routes.items()}
+        for values in stats.values():
+            requests = values['requests']
+            values['avg_queries'] = values['queries'] / requests
+            values['avg_db_ms'] = values['db_ms'] / requests
+            values['avg_template_ms'] = values['template_ms'] / requests
+            values['avg_ms'] = values['total_ms'] / requests
+        return stats
+
+    def reset(self):
+        """
+        Forget the totals of every route.
+        """
+        with self._lock:
+            self.routes.clear()
+
+
+instrumentation = Instrumentation(app)
+if app.config['INSTRUMENTATION']:
+    instrumentation.enable()
@@ -0,0 +1,182 @@
+from datetime import datetime
+
+from app import app, db
+from app.catalogue import GameCard, CARD_COLUMNS
+from app.models import Game, user_game
+from app.recommend import enqueue_user
+from flask import g
+from flask_login import current_user
+from sqlalchemy import select, bindparam, and_, or_
+
+CURSOR_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def owned_game_ids():
+    """
+    The IDs of the games in the current user's list. They are loaded
+    with a single query the first time they are needed in a request and
+    kept for the rest of the request, so checking whether the user owns
+    a game does not load the user's games.
+
+    :return: Set of game IDs, empty if no user is logged in
+    """
+    if not current_user.is_authenticated:
+        return frozenset()
+    if 'owned_game_ids' not in g:
+        query = select([user_game.c.game_id]).where(
+            user_game.c.user_id == current_user.get_id())
+        g.owned_game_ids = {row[0] for row in db.session.execute(query)}
+    return g.owned_game_ids
+
+
+def existing_game_ids(game_ids):
+    """
+    :param game_ids: IDs of games that may not exist
+    :return: Set of the IDs of the games in the database
+    """
+    game_ids = list(game_ids)
+    found = set()
+    # Stay below SQLite's limit on the number of bound parameters
+    for start in range(0, len(game_ids), 500):
+        query = select([Game.game_id]).where(
+            Game.game_id.in_(game_ids[start:start + 500]))
+        found.update(row[0] for row in db.session.execute(query))
+    return found
+
+
+def apply_batch(add_ids=(), remove_ids=()):
+    """
+    Add and remove many games from the current user's list. The games
+    are validated with one query and all the changes are written with
+    one statement each in a single transaction, which also queues the
+    user's recommendations to be recomputed.
+
+    :param add_ids: IDs of the games to add
+    :param remove_ids: IDs of the games to remove
+    :return: Dictionary of game ID to 'added', 'removed', 'unchanged',
+             'not found' or 'conflict' if the game is in both lists
+    """
+    owned = owned_game_ids()
+    user_id = current_user.get_id()
+    found = existing_game_ids(set(add_ids) - owned)
+    conflicts = set(add_ids) & set(remove_ids)
+    results = {}
+    inserts = []
+    deletes = []
+    for game_id in add_ids:
+        if game_id in results:
+            continue
+        if game_id in conflicts:
+            results[game_id] = 'conflict'
+        elif game_id in owned:
+            results[game_id] = 'unchanged'
+        elif game_id not in found:
+            results[game_id] = 'not found'
+        else:
+            results[game_id] = 'added'
+            inserts.append({'user_id': user_id, 'game_id': game_id})
+    for game_id in remove_ids:
+        if game_id in results:
+            continue
+        if game_id in owned:
+            results[game_id] = 'removed'
+            deletes.append({'user': user_id, 'game': game_id})
+        else:
+            results[game_id] = 'unchanged'
+
+    if inserts:
+        # A concurrent request may have added the same game
+        db.session.execute(user_game.insert().prefix_with('OR IGNORE'),
+                           inserts)
+    if deletes:
+        db.session.execute(user_game.delete().where(
+            (user_game.c.user_id == bindparam('user')) &
+            (user_game.c.game_id == bindparam('game'))), deletes)
+    if inserts or deletes:
+        enqueue_user(user_id, [row['game_id'] for row in inserts] +
+                     [row['game'] for row in deletes])
+        db.session.commit()
+        owned.update(row['game_id'] for row in inserts)
+        owned.difference_update(row['game'] for row in deletes)
+    return results
+
+
+def add_game(game_id):
+    """
+    Add a game to the current user's list.
+
+    :param game_id: ID of the game to add
+    :return: 'added', 'unchanged' if the game was already owned or
+             'not found'
+    """
+    return apply_batch(add_ids=[game_id])[game_id]
+
+
+def remove_game(game_id):
+    """
+    Remove a game from the current user's list.
+
+    :param game_id: ID of the game to remove
+    :return: 'removed' or 'unchanged' if the game was not owned
+    """
+    return apply_batch(remove_ids=[game_id])[game_id]
+
+
+def encode_cursor(added_at, game_id):
+    """
+    :param added_at: When the last game on a page was added
+    :param game_id: ID of the last game on a page
+    :return: Cursor pointing after the game
+    """
+    return '%s_%d' % (added_at.strftime(CURSOR_FORMAT), game_id)
+
+
+def decode_cursor(cursor):
+    """
+    :param cursor: Cursor made by encode_cursor
+    :return: When the game was added and its ID
+    :raise ValueError: If the cursor is malformed
+    """
+    added_at, game_id = cursor.rsplit('_', 1)
+    return datetime.strptime(added_at, CURSOR_FORMAT), int(game_id)
+
+
+def feed_page(cursor=None, per_page=None):
+    """
+    One page of the current user's games, most recently added first.
+    Pages are found by seeking the (user_id, added_at, game_id) index
+    past the cursor, so every page costs the same however far the user
+    scrolls.
+
+    :param cursor: Cursor returned with the previous page, None for the
+                   first page
+    :param per_page: Number of games per page
+    :return: List of game cards on the page and the cursor of the next
+             page, None if it is the last page
+    :raise ValueError: If the cursor is malformed
+    """
+    per_page = per_page or app.config['FEED_PAGE_SIZE']
+    added_at = user_game.c.added_at
+    query = db.session.query(*(CARD_COLUMNS + (added_at,))) \
+        .join(user_game, user_game.c.game_id == Game.game_id) \
+        .filter(user_game.c.user_id == current_user.get_id()) \
+        .order_by(added_at.desc(), user_game.c.game_id.desc())
+    if cursor is not None:
+        last_added_at, last_game_id = decode_cursor(cursor)
+        query = query.filter(or_(added_at < last_added_at,
+                                 and_(added_at == last_added_at,
+                                      user_game.c.game_id < last_game_id)))
+    rows = query.limit(per_page + 1).all()
+    cards = [GameCard(*row[:-1]) for row in rows[:per_page]]
+    if len(rows) <= per_page:
+        return cards, None
+    return cards, encode_cursor(rows[per_page - 1][-1], cards[-1].game_id)
+
+
+@app.context_processor
+def inject_owned_game_ids():
+    """
+    Let templates check ownership with owned_game_ids(). The set is only
+    loaded if the template calls it.
+    """
+    return dict(owned_game_ids=owned_game_ids)
@@ -1,52 +1,106 @@
+from datetime import datetime
+
 from app import db
+from app.assets import asset_url
+from app.images import thumbnails_enabled, thumbnail_url, \
+    thumbnail_srcset
 from flask_login import UserMixin
+from sqlalchemy.orm import joinedload, selectinload
 
 # Many-to-Many relationships
+# Each association is stored once, keyed on both sides, and indexed in
+# reverse so it can be looked up from either side.
 user_game = db.Table('user_game', db.Model.metadata,
                      db.Column('user_id', db.Integer,
-                               db.ForeignKey('user.user_id')),
+                               db.ForeignKey('user.user_id'),
+                               primary_key=True),
                      db.Column('game_id', db.Integer,
-                               db.ForeignKey('game.game_id'))
+                               db.ForeignKey('game.game_id'),
+                               primary_key=True),
+                     db.Column('added_at', db.DateTime,
+                               default=datetime.utcnow, nullable=False),
+                     db.Index('ix_user_game_added', 'user_id',
+                              'added_at', 'game_id'),
+                     db.Index('ix_user_game_game', 'game_id', 'user_id')
                      )
 
 game_developer = db.Table('game_developer', db.Model.metadata,
                           db.Column('game_id', db.Integer,
-                                    db.ForeignKey('game.game_id')),
+                                    db.ForeignKey('game.game_id'),
+                                    primary_key=True),
                           db.Column('developer_id', db.Integer,
                                     db.ForeignKey(
-                                        'developer.developer_id'))
+                                        'developer.developer_id'),
+                                    primary_key=True),
+                          db.Index('ix_game_developer_developer',
+                                   'developer_id', 'game_id')
                           )
 
 game_publisher = db.Table('game_publisher', db.Model.metadata,
                           db.Column('game_id', db.Integer,
-                                    db.ForeignKey('game.game_id')),
+                                    db.ForeignKey('game.game_id'),
+                                    primary_key=True),
                           db.Column('publisher_id', db.Integer,
                                     db.ForeignKey(
-                                        'publisher.publisher_id'))
+                                        'publisher.publisher_id'),
+                                    primary_key=True),
+                          db.Index('ix_game_publisher_publisher',
+                                   'publisher_id', 'game_id')
                           )
 
 game_genre = db.Table('game_genre', db.Model.metadata,
                       db.Column('game_id', db.Integer,
-                                db.ForeignKey('game.game_id')),
+                                db.ForeignKey('game.game_id'),
+                                primary_key=True),
                       db.Column('genre_id', db.Integer,
-                                db.ForeignKey('genre.genre_id'))
+                                db.ForeignKey('genre.genre_id'),
+                                primary_key=True),
+                      db.Index('ix_game_genre_genre', 'genre_id',
+                               'game_id')
                       )
 
 game_model = db.Table('game_model', db.Model.metadata,
                       db.Column('game_id', db.Integer,
-                                db.ForeignKey('game.game_id')),
+                                db.ForeignKey('game.game_id'),
+                                primary_key=True),
                       db.Column('model_id', db.Integer,
-                                db.ForeignKey('model.model_id'))
+                                db.ForeignKey('model.model_id'),
+                                primary_key=True),
+                      db.Index('ix_game_model_model', 'model_id',
+                               'game_id')
                       )
 
 game_platform = db.Table('game_platform', db.Model.metadata,
                          db.Column('game_id', db.Integer,
-                                   db.ForeignKey('game.game_id')),
+                                   db.ForeignKey('game.game_id'),
+                                   primary_key=True),
                          db.Column('platform_id', db.Integer,
                                    db.ForeignKey(
-                                       'platform.platform_id'))
+                                       'platform.platform_id'),
+                                   primary_key=True),
+                         db.Index('ix_game_platform_platform',
+                                  'platform_id', 'game_id')
                          )
 
+# Recommendations
+# The top games recommended to each user, in order of rank, and the users
+# whose recommendations must be recomputed after their list changed.
+recommendation = db.Table('recommendation', db.Model.metadata,
+                          db.Column('user_id', db.Integer,
+                                    db.ForeignKey('user.user_id'),
+                                    primary_key=True),
+                          db.Column('rank', db.Integer, primary_key=True),
+                          db.Column('game_id', db.Integer,
+                                    db.ForeignKey('game.game_id'),
+                                    nullable=False)
+                          )
+
+recommendation_queue = db.Table('recommendation_queue', db.Model.metadata,
+                                db.Column('user_id', db.Integer,
+                                          db.ForeignKey('user.user_id'),
+                                          primary_key=True)
+                                )
+
 
 class User(UserMixin, db.Model):
     """
@@ -104,7 +158,7 @@ class Game(db.Model):
     game_id = db.Column(db.Integer, primary_key=True, nullable=False)
     title = db.Column(db.String, nullable=False)
     description = db.Column(db.String)
-    release_date = db.Column(db.Date, nullable=False)
+    release_date = db.Column(db.Date, nullable=False, index=True)
     developer = db.relationship('Developer', secondary=game_developer,
                                 backref='game_developer')
     publisher = db.relationship('Publisher', secondary=game_publisher,
@@ -153,11 +207,25 @@ class Game(db.Model):
         """
         return str(self.platform)[1:-1]
 
-    def image_url_to_string(self):
+    def image_url_to_string(self, size=None, webp=False):
         """
+        :param size: Name of a thumbnail size in IMAGE_SIZES, None for the
+                     original image
+        :param webp: True for the WebP variant of the thumbnail
         :return: image url to string
         """
-        return "/static/game image/" + self.image_url
+        if size is None or not thumbnails_enabled():
+            return asset_url("game image/" + self.image_url)
+        return thumbnail_url(self.image_url, size, webp)
+
+    def image_srcset(self, webp=False):
+        """
+        :param webp: True for the WebP variants
+        :return: srcset of the thumbnails, empty if there are none
+        """
+        if not thumbnails_enabled():
+            return ''
+        return thumbnail_srcset(self.image_url, webp)
     
     def game_url(self):
         """
@@ -259,3 +327,23 @@ class Platform(db.Model):
         :return: platform_name
         """
         return self.platform_name
+
+
+# Loading profiles
+# The game page shows every relationship of one game. Joining them all
+# into one query would return the product of their sizes, so only the
+# developers are joined and the other collections are loaded with one
+# IN query each.
+GAME_DETAIL_PROFILE = (joinedload(Game.developer),
+                       selectinload(Game.publisher),
+                       selectinload(Game.genre),
+                       selectinload(Game.model),
+                       selectinload(Game.platform))
+# Listing pages show the relationships of many games, so each one is
+# loaded for the whole page with a single IN query instead of joining
+# every relationship into one large result.
+GAME_LISTING_PROFILE = (selectinload(Game.developer),
+                        selectinload(Game.publisher),
+                        selectinload(Game.genre),
+                        selectinload(Game.model),
+                        selectinload(Game.platform))
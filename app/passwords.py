@@ -0,0 +1,96 @@
+import threading
+
+from app import app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def password_method():
+    """
+    :return: werkzeug method of new hashes built from PASSWORD_METHOD and
+             PASSWORD_ITERATIONS, e.g. 'pbkdf2:sha256:260000'
+    """
+    method = app.config['PASSWORD_METHOD']
+    if method.startswith('pbkdf2:'):
+        return '%s:%d' % (method, app.config['PASSWORD_ITERATIONS'])
+    return method
+
+
+def _run(function, *args):
+    """
+    Run a hashing function in the calling thread, with at most
+    PASSWORD_CONCURRENCY hashes computed at once across the process.
+    Flask 1.1 views are synchronous, so the request thread still waits
+    for its hash. This is only a cap, which keeps a burst of logins from
+    taking every core while other requests are served. With no limit the
+    hashes run unbounded.
+
+    :param function: Function to run
+    :return: The result of the function
+    """
+    global _semaphore
+    limit = app.config['PASSWORD_CONCURRENCY']
+    if not limit:
+        return function(*args)
+    with _semaphore_lock:
+        if _semaphore is None:
+            _semaphore = threading.BoundedSemaphore(limit)
+    with _semaphore:
+        return function(*args)
+
+
+def hash_password(password):
+    """
+    :param password: Password in plain text
+    :return: Salted hash of the password with the configured method
+    """
+    return _run(generate_password_hash, password, password_method())
+
+
+def verify_password(pwhash, password):
+    """
+    :param pwhash: Stored hash of the password
+    :param password: Password in plain text
+    :return: True if the password matches the hash
+    """
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """
+    Hashes made with another method, e.g. the single round 'sha256$'
+    hashes of older accounts, or with fewer iterations than configured
+    are upgraded the next time the password is known.
+
+    :param pwhash: Stored hash of the password
+    :return: True if the hash is weaker than the configured method
+    """
+    method = pwhash.split('$', 1)[0]
+    wanted = password_method()
+    if method == wanted:
+        return False
+    if not wanted.startswith('pbkdf2:'):
+        return True
+    name, iterations = wanted.rsplit(':', 1)
+    # Hashes with more iterations than configured are left as they are
+    parts = method.split(':')
+    return len(parts) != 3 or ':'.join(parts[:2]) != name or \
+        not parts[2].isdigit() or int(parts[2]) < int(iterations)
+
+
+def check_and_upgrade(user, password):
+    """
+    Verify the password of a user and replace a weak hash with one made
+    with the configured method. The session is not committed.
+
+    :param user: User logging in
+    :param password: Password in plain text
+    :return: True if the password is correct
+    """
+    if not verify_password(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+    return True
@@ -0,0 +1,236 @@
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from app import app
+from app.database import apply_pragmas
+from flask import request, session
+
+
+class MemoryBucketStore(object):
+    """
+    Token buckets kept in memory, local to the process. The least
+    recently used bucket is dropped when the store is full, which only
+    hands that key a full bucket again.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from a bucket, refilled at the rate since it was
+        last used.
+
+        :param key: Key of the bucket
+        :param capacity: Most tokens the bucket holds
+        :param rate: Tokens added per second
+        :return: Seconds until a token is available, 0 if one was taken
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def clear(self):
+        """
+        Refill every bucket.
+        """
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore(object):
+    """
+    Token buckets stored in an SQLite file, so every worker on the host
+    draws from the same buckets. Each take is one short write
+    transaction.
+    """
+    # Buckets unused for this many seconds are purged once every
+    # purge_interval takes
+    idle = 3600
+    purge_interval = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        self._connect().execute('CREATE TABLE IF NOT EXISTS bucket '
+                                '(key TEXT PRIMARY KEY, tokens REAL, '
+                                'updated REAL)')
+
+    def _connect(self):
+        """
+        :return: The connection of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            apply_pragmas(connection, {'journal_mode': 'WAL',
+                                       'synchronous': 'NORMAL',
+                                       'busy_timeout': 5000})
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from a bucket, refilled at the rate since it was
+        last used.
+
+        :param key: Key of the bucket
+        :param capacity: Most tokens the bucket holds
+        :param rate: Tokens added per second
+        :return: Seconds until a token is available, 0 if one was taken
+        """
+        connection = self._connect()
+        now = time.time()
+        # Lock the database before reading, so two workers cannot take
+        # the same token
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM bucket '
+                                     'WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row or (capacity, now)
+            tokens = min(capacity, tokens + max(0, now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            connection.execute('INSERT OR REPLACE INTO bucket '
+                               'VALUES (?, ?, ?)',
+                               (key, tokens - 1 if not wait else tokens,
+                                now))
+            self._takes += 1
+            if self._takes % self.purge_interval == 0:
+                connection.execute('DELETE FROM bucket WHERE updated < ?',
+                                   (now - self.idle,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT count(*) FROM bucket').fetchone()[0]
+
+    def clear(self):
+        """
+        Refill every bucket.
+        """
+        self._connect().execute('DELETE FROM bucket')
+
+
+class RateLimiter(object):
+    """
+    Limits the POSTs to the account routes with token buckets keyed on
+    the client's IP address and on the username, so a burst of
+    credential stuffing is turned away before it reaches the database
+    or the password hashing.
+
+    RATELIMIT_BACKEND selects 'memory' for buckets per process, 'sqlite'
+    for buckets shared by the workers through RATELIMIT_PATH, or None to
+    turn limiting off. RATELIMIT_ENABLED turns it off at run time.
+    """
+
+    def __init__(self, app):
+        backend = app.config.get('RATELIMIT_BACKEND')
+        if backend == 'memory':
+            self.store = MemoryBucketStore(app.config['RATELIMIT_SIZE'])
+        elif backend == 'sqlite':
+            self.store = SQLiteBucketStore(app.config['RATELIMIT_PATH'])
+        elif backend is None:
+            self.store = None
+        else:
+            raise ValueError("Unknown rate limit backend %r" % backend)
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    @staticmethod
+    def make_keys(scope):
+        """
+        :param scope: Name of the limited route
+        :return: List of (key, setting name of its limit) of the current
+                 request
+        """
+        keys = [('%s:ip:%s' % (scope, request.remote_addr), 'RATELIMIT_IP')]
+        # The username of the form, or the logged in user's ID, which
+        # the session holds without loading the user
+        username = request.form.get('username')
+        if username:
+            keys.append(('%s:user:%s' % (scope, username.strip().lower()),
+                         'RATELIMIT_USER'))
+        elif session.get('_user_id'):
+            keys.append(('%s:user_id:%s' % (scope, session['_user_id']),
+                         'RATELIMIT_USER'))
+        return keys
+
+    def _count(self, name):
+        """
+        :param name: Name of the counter to increment
+        """
+        with self._lock:
+            self.counters[name] += 1
+
+    def limit(self, scope):
+        """
+        Decorator limiting the POSTs to a view. A request over the limit
+        gets a plain 429 with a Retry-After header. The IP address is
+        checked first, so requests turned away by it do not use up the
+        user's tokens.
+
+        :param scope: Name of the limited route, each scope has its own
+                      buckets
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.store is None or request.method != 'POST' or \
+                        not app.config['RATELIMIT_ENABLED']:
+                    return view(*args, **kwargs)
+                for key, setting in self.make_keys(scope):
+                    capacity, per_minute = app.config[setting]
+                    wait = self.store.take(key, capacity, per_minute / 60.0)
+                    if wait:
+                        self._count('%s.limited' % scope)
+                        return app.response_class(
+                            'Too many requests, try again later.\n',
+                            status=429, mimetype='text/plain',
+                            headers={'Retry-After': str(int(wait) + 1)})
+                self._count('%s.allowed' % scope)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """
+        :return: Dictionary of the allowed and limited requests of each
+                 scope counted by this process, and the number of buckets
+                 in the store
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        stats['buckets'] = len(self.store) if self.store is not None else 0
+        return stats
+
+    def reset(self):
+        """
+        Refill every bucket and zero the counters.
+        """
+        if self.store is not None:
+            self.store.clear()
+        with self._lock:
+            self.counters.clear()
+
+
+rate_limiter = RateLimiter(app)
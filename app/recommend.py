@@ -0,0 +1,203 @@
+import heapq
+
+from app import app, db
+from app.catalogue import game_cards
+from app.models import User, user_game, game_developer, game_genre, \
+    game_platform, recommendation, recommendation_queue
+from sqlalchemy import select, func, and_
+
+# Weight of a game for every user owning it who shares a game with the
+# user
+CO_OWNER_WEIGHT = 3.0
+
+# Associations shared with the user's games as (association table,
+# taxonomy column, weight of a game for every shared taxonomy)
+SHARED_TAXONOMIES = [
+    (game_developer, 'developer_id', 2.0),
+    (game_genre, 'genre_id', 1.0),
+    (game_platform, 'platform_id', 0.5),
+]
+
+
+def _co_owner_counts(user_id):
+    """
+    :param user_id: ID of the user
+    :return: Query of game ID and the number of times the game is owned
+             by someone sharing a game with the user
+    """
+    mine = user_game.alias('mine')
+    peer = user_game.alias('peer')
+    other = user_game.alias('other')
+    return select([other.c.game_id, func.count()]) \
+        .select_from(mine.join(peer, and_(peer.c.game_id == mine.c.game_id,
+                                          peer.c.user_id != mine.c.user_id))
+                     .join(other, other.c.user_id == peer.c.user_id)) \
+        .where(mine.c.user_id == user_id) \
+        .group_by(other.c.game_id)
+
+
+def _shared_taxonomy_counts(user_id, link, key):
+    """
+    :param user_id: ID of the user
+    :param link: Association table of the taxonomy
+    :param key: Taxonomy column of the association table
+    :return: Query of game ID and the number of times the game shares the
+             taxonomy with one of the user's games
+    """
+    mine = link.alias('mine')
+    other = link.alias('other')
+    return select([other.c.game_id, func.count()]) \
+        .select_from(user_game.join(mine,
+                                    mine.c.game_id == user_game.c.game_id)
+                     .join(other, other.c[key] == mine.c[key])) \
+        .where(user_game.c.user_id == user_id) \
+        .group_by(other.c.game_id)
+
+
+def compute_recommendations(user_id, count=None):
+    """
+    Score the games the user does not own from the other users who own
+    the same games and from the developers, genres and platforms of the
+    user's games. Every query starts from the user's games and follows
+    the indexes of the association tables. The co-owner scores depend on
+    the user's neighbourhood, but a common genre or platform is shared
+    with a large part of the catalogue, so the taxonomy scores grow with
+    it. The recommendations are therefore computed by `flask recommend`
+    and stored rather than computed per request.
+
+    :param user_id: ID of the user
+    :param count: Number of games to recommend
+    :return: List of game IDs, best first
+    """
+    count = count or app.config['RECOMMENDATION_COUNT']
+    owned = {row[0] for row in db.session.execute(
+        select([user_game.c.game_id]).where(user_game.c.user_id == user_id))}
+    if not owned:
+        return []
+    scores = {}
+    queries = [(_co_owner_counts(user_id), CO_OWNER_WEIGHT)]
+    queries.extend((_shared_taxonomy_counts(user_id, link, key), weight)
+                   for link, key, weight in SHARED_TAXONOMIES)
+    for query, weight in queries:
+        for game_id, matches in db.session.execute(query):
+            if game_id not in owned:
+                scores[game_id] = scores.get(game_id, 0) + weight * matches
+    # Ties go to the newest games
+    best = heapq.nlargest(count, scores.items(),
+                          key=lambda item: (item[1], item[0]))
+    return [game_id for game_id, score in best]
+
+
+def store_recommendations(user_id, game_ids):
+    """
+    Replace the stored recommendations of a user. The session is not
+    committed.
+
+    :param user_id: ID of the user
+    :param game_ids: List of game IDs, best first
+    """
+    db.session.execute(recommendation.delete().where(
+        recommendation.c.user_id == user_id))
+    if game_ids:
+        db.session.execute(recommendation.insert(),
+                           [{'user_id': user_id, 'rank': rank,
+                             'game_id': game_id}
+                            for rank, game_id in enumerate(game_ids)])
+
+
+def enqueue_user(user_id, game_ids=()):
+    """
+    Mark the recommendations of a user as outdated, e.g. after their list
+    changed, along with those of up to RECOMMENDATION_PEER_LIMIT users
+    owning the added or removed games. Users sharing only the user's
+    other games are left for `flask recommend --all`. The session is not
+    committed, so the users are queued in the same transaction as the
+    change.
+
+    :param user_id: ID of the user, after their list was changed
+    :param game_ids: IDs of the games added to or removed from the list
+    """
+    db.session.execute(recommendation_queue.insert().prefix_with('OR IGNORE'),
+                       {'user_id': user_id})
+    game_ids = list(game_ids)
+    limit = app.config['RECOMMENDATION_PEER_LIMIT']
+    if not game_ids or not limit:
+        return
+    peers = select([user_game.c.user_id]).distinct() \
+        .where(user_game.c.game_id.in_(game_ids) &
+               (user_game.c.user_id != user_id)) \
+        .limit(limit)
+    db.session.execute(recommendation_queue.insert().prefix_with('OR IGNORE')
+                       .from_select(['user_id'], peers))
+
+
+def enqueue_all_users():
+    """
+    Mark the recommendations of every user as outdated, e.g. after the
+    catalogue changed. The session is not committed.
+    """
+    db.session.execute(recommendation_queue.insert().prefix_with('OR IGNORE')
+                       .from_select(['user_id'], select([User.user_id])))
+
+
+def refresh_user(user_id):
+    """
+    Recompute the recommendations of one user and take them off the
+    queue.
+
+    :param user_id: ID of the user
+    """
+    db.session.execute(recommendation_queue.delete().where(
+        recommendation_queue.c.user_id == user_id))
+    store_recommendations(user_id, compute_recommendations(user_id))
+    db.session.commit()
+
+
+def refresh_queued(batch_size=None):
+    """
+    Recompute the recommendations of a batch of queued users in one
+    transaction. The users are taken off the queue before they are
+    recomputed, so a user whose list changes meanwhile is queued again.
+
+    :param batch_size: Maximum number of users to recompute
+    :return: Number of users recomputed
+    """
+    batch_size = batch_size or app.config['RECOMMENDATION_BATCH_SIZE']
+    user_ids = [row[0] for row in db.session.execute(
+        select([recommendation_queue.c.user_id]).limit(batch_size))]
+    if not user_ids:
+        return 0
+    db.session.execute(recommendation_queue.delete().where(
+        recommendation_queue.c.user_id.in_(user_ids)))
+    for user_id in user_ids:
+        store_recommendations(user_id, compute_recommendations(user_id))
+    db.session.commit()
+    return len(user_ids)
+
+
+def is_queued(user_id):
+    """
+    :param user_id: ID of the user
+    :return: True if the recommendations of the user are outdated
+    """
+    return db.session.execute(select([recommendation_queue.c.user_id]).where(
+        recommendation_queue.c.user_id == user_id)).first() is not None
+
+
+def recommended_games(user_id, n):
+    """
+    The best games recommended to a user, read from the stored
+    recommendations with one lookup of the (user_id, rank) key. Outdated
+    recommendations are recomputed first when
+    RECOMMENDATION_REFRESH_ON_READ is set.
+
+    :param user_id: ID of the user
+    :param n: Number of games
+    :return: List of game cards, best first
+    """
+    if app.config['RECOMMENDATION_REFRESH_ON_READ'] and is_queued(user_id):
+        refresh_user(user_id)
+    query = select([recommendation.c.game_id]) \
+        .where(recommendation.c.user_id == user_id) \
+        .order_by(recommendation.c.rank).limit(n)
+    return game_cards([row[0] for row in db.session.execute(query)])
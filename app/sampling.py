@@ -0,0 +1,264 @@
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+from app import app, db
+from app.catalogue import game_cards
+from app.models import Game
+from sqlalchemy import event, inspect
+
+
+class YearBucket(object):
+    """
+    A dense array of the game ids released in one year, with the position
+    of each id. Games are appended on insert and swap-removed on delete so
+    the array never has holes and any position can be picked, and any
+    game removed, in constant time.
+    """
+    __slots__ = ['ids', 'positions']
+
+    def __init__(self):
+        self.ids = array('l')
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, game_id):
+        """
+        :param game_id: ID of the game to add to the bucket
+        """
+        if game_id in self.positions:
+            return
+        self.positions[game_id] = len(self.ids)
+        self.ids.append(game_id)
+
+    def discard(self, game_id):
+        """
+        :param game_id: ID of the game to remove from the bucket
+        :return: True if the game was in the bucket
+        """
+        index = self.positions.pop(game_id, None)
+        if index is None:
+            return False
+        last = self.ids.pop()
+        if index < len(self.ids):
+            self.ids[index] = last
+            self.positions[last] = index
+        return True
+
+
+class GameSampler(object):
+    """
+    Picks random games per release year without asking the database to
+    sort the game table. The game ids are loaded once into a bucket per
+    release year and kept up to date from committed sessions, so a
+    sample only costs k random picks and a primary key lookup.
+
+    Changes committed by other processes are picked up by reloading the
+    buckets once they are older than the refresh interval.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._buckets = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        """
+        Drop the buckets so they are reloaded on the next sample.
+        """
+        with self._lock:
+            self._buckets = None
+
+    def load(self, rows):
+        """
+        Replace the buckets with the given games.
+
+        :param rows: Iterable of (game_id, release_date) pairs
+        """
+        buckets = {}
+        for game_id, release_date in rows:
+            bucket = buckets.get(release_date.year)
+            if bucket is None:
+                bucket = buckets[release_date.year] = YearBucket()
+            bucket.add(game_id)
+        with self._lock:
+            self._buckets = buckets
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        """
+        Load the buckets from the database if they are missing or stale.
+        """
+        stale = self.refresh_interval is not None and \
+            time.monotonic() - self._loaded_at > self.refresh_interval
+        if self._buckets is None or stale:
+            self.load(db.session.query(Game.game_id, Game.release_date)
+                      .yield_per(10000))
+
+    def add(self, game_id, year):
+        """
+        :param game_id: ID of the inserted game
+        :param year: Release year of the game
+        """
+        with self._lock:
+            if self._buckets is None:
+                return
+            bucket = self._buckets.get(year)
+            if bucket is None:
+                bucket = self._buckets[year] = YearBucket()
+            bucket.add(game_id)
+
+    def discard(self, game_id, year=None):
+        """
+        :param game_id: ID of the deleted game
+        :param year: Release year of the game, all buckets are searched
+                     if it is not known
+        """
+        with self._lock:
+            if self._buckets is None:
+                return
+            if year is not None and year in self._buckets:
+                self._buckets[year].discard(game_id)
+                return
+            for bucket in self._buckets.values():
+                if bucket.discard(game_id):
+                    return
+
+    def sample_ids(self, window, n):
+        """
+        Pick up to n distinct game ids uniformly from the window.
+
+        :param window: A release year, an iterable of release years or
+                       None for the whole catalogue
+        :param n: Number of game ids to pick
+        :return: List of game ids in random order
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if window is None:
+                buckets = list(self._buckets.values())
+            elif isinstance(window, int):
+                buckets = [self._buckets.get(window)]
+            else:
+                buckets = [self._buckets.get(year) for year in window]
+            buckets = [bucket for bucket in buckets if bucket]
+
+            # Cumulative sizes map a position in the window to a bucket
+            offsets = []
+            total = 0
+            for bucket in buckets:
+                total += len(bucket)
+                offsets.append(total)
+
+            ids = []
+            for position in random.sample(range(total), min(n, total)):
+                index = bisect_right(offsets, position)
+                start = offsets[index - 1] if index else 0
+                ids.append(buckets[index].ids[position - start])
+            return ids
+
+
+sampler = GameSampler(app.config.get('SAMPLER_REFRESH_INTERVAL'))
+
+
+def sample_games(window, n):
+    """
+    Pick up to n random games released in the window.
+
+    :param window: A release year, an iterable of release years or None
+                   for the whole catalogue
+    :param n: Number of games to pick
+    :return: List of game cards in random order
+    """
+    return game_cards(sampler.sample_ids(window, n))
+
+
+def sample_years(years, n):
+    """
+    Pick up to n random games released in each of the years. The games
+    are picked from the in-memory buckets and all of them are loaded
+    with a single query.
+
+    :param years: List of release years
+    :param n: Number of games to pick per year
+    :return: List of (year, list of game cards) pairs in the order of the
+             years
+    """
+    picked = [(year, sampler.sample_ids(year, n)) for year in years]
+    cards = {card.game_id: card for card in
+             game_cards([game_id for year, ids in picked for game_id in ids])}
+    return [(year, [cards[game_id] for game_id in ids if game_id in cards])
+            for year, ids in picked]
+
+
+def _release_year(game, current):
+    """
+    Find the release year of a flushed game from its attribute history
+    without loading anything from the database.
+
+    :param game: The flushed game
+    :param current: True for the new value, False for the old value
+    :return: The release year or None if it is not loaded
+    """
+    history = inspect(game).attrs.release_date.history
+    values = history.added if current else history.deleted
+    values = values or history.unchanged
+    return values[0].year if values and values[0] else None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changes(session, flush_context):
+    """
+    Remember which games were added, moved or deleted by the flush until
+    the transaction is committed.
+    """
+    changes = session.info.setdefault('sampler_changes', [])
+    for game in session.new:
+        if isinstance(game, Game):
+            changes.append((game.game_id, True, None,
+                            _release_year(game, True)))
+    for game in session.dirty:
+        if isinstance(game, Game) and \
+                inspect(game).attrs.release_date.history.has_changes():
+            changes.append((game.game_id, False,
+                            _release_year(game, False),
+                            _release_year(game, True)))
+    for game in session.deleted:
+        if isinstance(game, Game):
+            changes.append((game.game_id, False,
+                            _release_year(game, False), None))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_changes(session):
+    """
+    Apply the committed game changes to the sampler buckets.
+    """
+    changes = session.info.pop('sampler_changes', [])
+    for game_id, inserted, old_year, new_year in changes:
+        if not inserted:
+            sampler.discard(game_id, old_year)
+        if new_year is not None:
+            sampler.add(game_id, new_year)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    """
+    Forget the game changes of a transaction that was rolled back.
+    """
+    session.info.pop('sampler_changes', None)
+
+
+@event.listens_for(Game.__table__, 'after_create')
+@event.listens_for(Game.__table__, 'after_drop')
+def _reset_sampler(target, connection, **kw):
+    """
+    Reload the sampler after the game table is created or dropped.
+    """
+    sampler.invalidate()
@@ -0,0 +1,201 @@
+import re
+
+from app import app, db
+from app.catalogue import game_cards
+from sqlalchemy import event, text
+
+# Taxonomy columns of the search index as (column, association table,
+# taxonomy table, taxonomy key, taxonomy name)
+TAXONOMIES = [
+    ('developer', 'game_developer', 'developer', 'developer_id', 'name'),
+    ('publisher', 'game_publisher', 'publisher', 'publisher_id', 'name'),
+    ('genre', 'game_genre', 'genre', 'genre_id', 'genre_type'),
+    ('model', 'game_model', 'model', 'model_id', 'model_type'),
+    ('platform', 'game_platform', 'platform', 'platform_id',
+     'platform_name'),
+]
+
+# Column weights for bm25, in index column order
+WEIGHTS = [10.0, 1.0, 3.0, 3.0, 2.0, 1.0, 2.0]
+
+COLUMNS = ['title', 'description'] + [taxonomy[0] for taxonomy in TAXONOMIES]
+
+CREATE_INDEX = "CREATE VIRTUAL TABLE IF NOT EXISTS game_search USING " \
+               "fts5(%s, tokenize='unicode61 remove_diacritics 2')" \
+               % ', '.join(COLUMNS)
+
+
+def _document_sql(where):
+    """
+    :param where: Condition selecting the games to index
+    :return: SQL inserting the search documents of the selected games
+    """
+    names = ["(SELECT group_concat(t.{name}, ' ') FROM {link} l "
+             "JOIN {table} t ON t.{key} = l.{key} "
+             "WHERE l.game_id = g.game_id)".format(link=link, table=table,
+                                                   key=key, name=name)
+             for column, link, table, key, name in TAXONOMIES]
+    return "INSERT INTO game_search (rowid, %s) " \
+           "SELECT g.game_id, g.title, g.description, %s " \
+           "FROM game g WHERE %s;" % (', '.join(COLUMNS), ', '.join(names),
+                                      where)
+
+
+def _refresh_sql(game_ids):
+    """
+    :param game_ids: SQL expression of the game ids to re-index
+    :return: SQL replacing the search documents of the games
+    """
+    return "DELETE FROM game_search WHERE rowid IN (%s); %s" % (
+        game_ids, _document_sql("g.game_id IN (%s)" % game_ids))
+
+
+def _triggers():
+    """
+    Triggers keeping the search index in step with the game, taxonomy
+    and association tables, whichever process or tool writes to them.
+
+    :return: List of (name, SQL) for each trigger
+    """
+    triggers = [
+        ('game_search_insert',
+         "AFTER INSERT ON game BEGIN %s END"
+         % _document_sql("g.game_id = new.game_id")),
+        ('game_search_update',
+         "AFTER UPDATE OF title, description ON game BEGIN %s END"
+         % _refresh_sql("new.game_id")),
+        ('game_search_delete',
+         "AFTER DELETE ON game BEGIN "
+         "DELETE FROM game_search WHERE rowid = old.game_id; END"),
+    ]
+    for column, link, table, key, name in TAXONOMIES:
+        triggers += [
+            ('%s_search_insert' % link,
+             "AFTER INSERT ON %s BEGIN %s END"
+             % (link, _refresh_sql("new.game_id"))),
+            ('%s_search_delete' % link,
+             "AFTER DELETE ON %s BEGIN %s END"
+             % (link, _refresh_sql("old.game_id"))),
+            ('%s_search_update' % table,
+             "AFTER UPDATE OF %s ON %s BEGIN %s END"
+             % (name, table, _refresh_sql(
+                 "SELECT game_id FROM %s WHERE %s = new.%s"
+                 % (link, key, key)))),
+        ]
+    return triggers
+
+
+def create_search_triggers(connection):
+    """
+    Create the triggers keeping the search index up to date.
+
+    :param connection: Connection to the database
+    """
+    for name, body in _triggers():
+        connection.execute(text("DROP TRIGGER IF EXISTS %s" % name))
+        connection.execute(text("CREATE TRIGGER %s %s" % (name, body)))
+
+
+def drop_search_triggers(connection):
+    """
+    Drop the triggers of the search index, leaving the index searchable,
+    e.g. during a bulk import that indexes the games itself.
+
+    :param connection: Connection to the database
+    """
+    for name, body in _triggers():
+        connection.execute(text("DROP TRIGGER IF EXISTS %s" % name))
+
+
+def index_games(connection, first_id, last_id):
+    """
+    Index the games with IDs in a range, e.g. after writing them with the
+    triggers dropped.
+
+    :param connection: Connection to the database
+    :param first_id: ID of the first game
+    :param last_id: ID of the last game
+    """
+    connection.execute(text(
+        "DELETE FROM game_search WHERE rowid BETWEEN :first AND :last"),
+        {'first': first_id, 'last': last_id})
+    connection.execute(text(_document_sql(
+        "g.game_id BETWEEN :first AND :last")),
+        {'first': first_id, 'last': last_id})
+
+
+def create_search_index(connection):
+    """
+    Create the full-text search index and its triggers, then index every
+    game from scratch.
+
+    :param connection: Connection to the database
+    """
+    connection.execute(text(CREATE_INDEX))
+    create_search_triggers(connection)
+    connection.execute(text("DELETE FROM game_search"))
+    connection.execute(text(_document_sql("1")))
+
+
+def drop_search_index(connection):
+    """
+    Drop the full-text search index and its triggers.
+
+    :param connection: Connection to the database
+    """
+    drop_search_triggers(connection)
+    connection.execute(text("DROP TABLE IF EXISTS game_search"))
+
+
+def match_expression(query):
+    """
+    Turn a user's query into an FTS5 match expression where every word
+    must prefix-match a word of the game's document.
+
+    :param query: Query typed by the user
+    :return: FTS5 match expression, None if the query has no words
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join('"%s"*' % word for word in words)
+
+
+def search_games(query, page=1, per_page=None):
+    """
+    Find the games matching a query, best matches first.
+
+    :param query: Query typed by the user
+    :param page: Page of results, starting at 1
+    :param per_page: Number of games per page
+    :return: List of game cards on the page and whether there is a next
+             page
+    """
+    per_page = per_page or app.config['SEARCH_PAGE_SIZE']
+    expression = match_expression(query)
+    if expression is None:
+        return [], False
+    rows = db.session.execute(
+        text("SELECT rowid FROM game_search WHERE game_search MATCH :match "
+             "ORDER BY bm25(game_search, %s) LIMIT :limit OFFSET :offset"
+             % ', '.join(str(weight) for weight in WEIGHTS)),
+        {'match': expression, 'limit': per_page + 1,
+         'offset': (max(page, 1) - 1) * per_page}).fetchall()
+    ids = [row[0] for row in rows[:per_page]]
+    return game_cards(ids, taxonomy=True), len(rows) > per_page
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+def _create_index(target, connection, **kw):
+    """
+    Create the search index when the tables are created.
+    """
+    create_search_index(connection)
+
+
+@event.listens_for(db.Model.metadata, 'before_drop')
+def _drop_index(target, connection, **kw):
+    """
+    Drop the search index when the tables are dropped.
+    """
+    drop_search_index(connection)
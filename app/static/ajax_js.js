@@ -1,50 +1,139 @@
+// Clicks are queued and sent to /batch together, so rapid clicks cost
+// one request and one transaction
+var pendingChanges = { add: {}, remove: {} };
+var flushTimer = null;
+
+function gameId(element) {
+  var id = $(element).attr("id");
+  return parseInt(id.slice(id.indexOf("_") + 1), 10);
+}
+
+function queueChange(action, game_id) {
+  var other = action === "add" ? "remove" : "add";
+  delete pendingChanges[other][game_id];
+  pendingChanges[action][game_id] = true;
+  if (flushTimer === null) {
+    flushTimer = setTimeout(flushChanges, 300);
+  }
+}
+
+function takeChanges() {
+  var changes = {
+    add: $.map(Object.keys(pendingChanges.add), Number),
+    remove: $.map(Object.keys(pendingChanges.remove), Number),
+  };
+  pendingChanges = { add: {}, remove: {} };
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  return changes;
+}
+
+function flushChanges() {
+  var changes = takeChanges();
+
+  $.ajax({
+    url: "/batch",
+    type: "POST",
+    data: JSON.stringify(changes),
+    contentType: "application/json; charset=utf-8",
+    dataType: "json",
+
+    // Enable the add button again if the game could not be added
+    success: function (response) {
+      $.each(response.results, function (i, result) {
+        if (result.status === "not found" || result.status === "conflict") {
+          $("#game_" + result.game_id).text("Add to list")
+            .removeClass("disabled");
+        }
+      });
+    },
+    error: function (error) {
+      console.log(error);
+    },
+  });
+}
+
+// Send the queued clicks before leaving the page
+$(window).on("pagehide", function () {
+  if (flushTimer !== null) {
+    navigator.sendBeacon("/batch", new Blob([JSON.stringify(takeChanges())],
+      { type: "application/json" }));
+  }
+});
+
 $(document).ready(function () {
+  // Update button status to disabled
   $(".add-button").on("click", function () {
-    console.log($(this));
-    console.log($(this).attr("id"));
-
-    $.ajax({
-      url: "/add",
-      type: "POST",
-      data: JSON.stringify({ response: $(this).attr("id") }),
-      contentType: "application/json; charset=utf-8",
-      dataType: "json",
+    $(this).text("Added to list");
+    $(this).addClass("disabled");
+    queueChange("add", gameId(this));
+  });
+});
 
-      // Update button status to disabled
-      success: function (response) {
-        element_id = "#game_" + response.response;
-        $(element_id).text("Added to list");
-        $(element_id).addClass("disabled");
-      },
-      error: function (error) {
-        console.log(error);
-      },
+$(document).ready(function () {
+  // Delegated so games loaded while scrolling can be removed too
+  $(document).on("click", ".remove-button", function () {
+    var game_id = gameId(this);
+    // Remove game from list animation
+    $("#my-game_" + game_id).fadeOut("normal", function () {
+      $(this).remove();
     });
+    queueChange("remove", game_id);
   });
 });
 
+// Build a feed card for a game loaded while scrolling
+function feedCard(game) {
+  var card = $('<div class="card mb-3" style="max-width: 2000px;">')
+    .attr("id", "my-game_" + game.game_id);
+  var row = $('<div class="row">').appendTo(card);
+  $('<div class="col-md-4">').append(
+    $('<img class="img-fluid" width="320" height="200" loading="lazy">')
+      .attr("src", game.image_url).attr("srcset", game.image_srcset)
+      .attr("sizes", "320px").attr("alt", game.title)
+  ).appendTo(row);
+  var body = $('<div class="card-body">')
+    .appendTo($('<div class="col-md-8">').appendTo(row));
+  $('<h5 class="card-title">').append(
+    $('<a class="text-decoration-none">').attr("href", game.url)
+      .text(game.title)
+  ).appendTo(body);
+  $('<p class="card-text">').text(game.description || "").appendTo(body);
+  $('<a class="btn btn-danger remove-button" role="button">')
+    .attr("id", "game_" + game.game_id).text("Remove from list")
+    .appendTo(body);
+  return card;
+}
+
 $(document).ready(function () {
-  $(".remove-button").on("click", function () {
-    console.log($(this));
-    console.log($(this).attr("id"));
+  var loading = false;
 
+  // Load the next page of the feed when its end is scrolled into view
+  $(window).on("scroll", function () {
+    var more = $("#more-games");
+    if (loading || !more.length || !more.data("cursor")) {
+      return;
+    }
+    if ($(window).scrollTop() + $(window).height() < more.offset().top - 400) {
+      return;
+    }
+    loading = true;
     $.ajax({
-      url: "/remove",
-      type: "POST",
-      data: JSON.stringify({ response: $(this).attr("id") }),
-      contentType: "application/json; charset=utf-8",
+      url: more.data("url"),
+      type: "GET",
+      data: { cursor: more.data("cursor") },
       dataType: "json",
 
-      // Remove game from list animation
-      success: function (response) {
-        element_id = "#my-game_" + response.response;
-        $(element_id).fadeOut("normal", function() {
-          $(this).remove();
+      success: function (page) {
+        $.each(page.games, function (i, game) {
+          more.before(feedCard(game));
         });
+        more.data("cursor", page.next_cursor);
+        loading = false;
       },
       error: function (error) {
         console.log(error);
       },
     });
   });
-});
\ No newline at end of file
+});
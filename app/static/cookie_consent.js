@@ -0,0 +1,11 @@
+// Ask for consent to cookies once the page has loaded
+window.cookieconsent.initialise({
+  palette: {
+    popup: {
+      background: "#000",
+    },
+    button: {
+      background: "#f1d600",
+    },
+  },
+});
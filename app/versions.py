@@ -0,0 +1,111 @@
+from app import db
+from sqlalchemy import bindparam, event, text
+
+# Tables whose changes are counted. The triggers count every write,
+# whichever process, tool or raw SQL statement makes it.
+TRACKED_TABLES = ['game', 'developer', 'publisher', 'genre', 'model',
+                  'platform', 'game_developer', 'game_publisher',
+                  'game_genre', 'game_model', 'game_platform', 'user_game']
+
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS table_version (" \
+               "name VARCHAR PRIMARY KEY, " \
+               "version INTEGER NOT NULL DEFAULT 0, " \
+               "updated_at INTEGER NOT NULL DEFAULT 0)"
+
+
+def _triggers():
+    """
+    Triggers counting the writes to each tracked table and remembering
+    when it last changed, in seconds since the epoch.
+
+    :return: List of (name, SQL) for each trigger
+    """
+    triggers = []
+    for table in TRACKED_TABLES:
+        for operation in ('insert', 'update', 'delete'):
+            triggers.append((
+                '%s_version_%s' % (table, operation),
+                "AFTER %s ON %s BEGIN UPDATE table_version "
+                "SET version = version + 1, "
+                "updated_at = CAST(strftime('%%s', 'now') AS INTEGER) "
+                "WHERE name = '%s'; END" % (operation.upper(), table, table)))
+    return triggers
+
+
+def create_version_triggers(connection):
+    """
+    Create the version table with a row for each tracked table, and the
+    triggers keeping them up to date.
+
+    :param connection: Connection to the database
+    """
+    connection.execute(text(CREATE_TABLE))
+    for table in TRACKED_TABLES:
+        connection.execute(text(
+            "INSERT OR IGNORE INTO table_version (name, updated_at) "
+            "VALUES (:name, CAST(strftime('%s', 'now') AS INTEGER))"),
+            {'name': table})
+    for name, body in _triggers():
+        connection.execute(text("DROP TRIGGER IF EXISTS %s" % name))
+        connection.execute(text("CREATE TRIGGER %s %s" % (name, body)))
+
+
+def drop_version_triggers(connection, keep_versions=False):
+    """
+    Drop the version table and its triggers.
+
+    :param connection: Connection to the database
+    :param keep_versions: True to only drop the triggers, e.g. during a
+                          bulk import that bumps the versions itself
+    """
+    for name, body in _triggers():
+        connection.execute(text("DROP TRIGGER IF EXISTS %s" % name))
+    if not keep_versions:
+        connection.execute(text("DROP TABLE IF EXISTS table_version"))
+
+
+def bump_versions(connection, tables=None):
+    """
+    Count a change to tables once, e.g. after writing them with the
+    triggers dropped.
+
+    :param connection: Connection to the database
+    :param tables: Names of tracked tables, all of them by default
+    """
+    query = text("UPDATE table_version SET version = version + 1, "
+                 "updated_at = CAST(strftime('%s', 'now') AS INTEGER) "
+                 "WHERE name IN :names") \
+        .bindparams(bindparam('names', expanding=True))
+    connection.execute(query, {'names': list(tables or TRACKED_TABLES)})
+
+
+def table_versions(tables):
+    """
+    :param tables: Names of tracked tables
+    :return: Tuple of the version of each table, and when the latest of
+             them changed in seconds since the epoch
+    """
+    query = text("SELECT name, version, updated_at FROM table_version "
+                 "WHERE name IN :names") \
+        .bindparams(bindparam('names', expanding=True))
+    rows = dict((row[0], (row[1], row[2])) for row in
+                db.session.execute(query, {'names': list(tables)}))
+    versions = tuple(rows.get(table, (0, 0))[0] for table in tables)
+    updated_at = max([rows.get(table, (0, 0))[1] for table in tables])
+    return versions, updated_at
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+def _create_triggers(target, connection, **kw):
+    """
+    Create the version table and triggers when the tables are created.
+    """
+    create_version_triggers(connection)
+
+
+@event.listens_for(db.Model.metadata, 'before_drop')
+def _drop_triggers(target, connection, **kw):
+    """
+    Drop the version table and triggers when the tables are dropped.
+    """
+    drop_version_triggers(connection)
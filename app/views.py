@@ -3,18 +3,35 @@ import os.path as op
 from datetime import date
 
 from app import app, db
+from app.assets import asset_url, ASSET_MAX_AGE
+from app.cache import LRUCache, response_cache
+from app.catalogue import game_cards
+from app.exporter import export_games, export_library, read_game_ids, \
+    MIMETYPES as EXPORT_MIMETYPES
+from app.facets import facet_index, parse_filters, facet_summary
 from app.forms import RegisterForm, LoginForm, PasswordForm
+from app.identity import forget_user
+from app.images import thumbnails_enabled, thumbnail_path, \
+    image_version, process_upload, remove_thumbnails
+from app.instrumentation import instrumentation
+from app.library import add_game, remove_game, apply_batch, feed_page
 from app.models import Game, User, Developer, Publisher, Genre, Model, \
-    Platform
-from flask import render_template, request, flash, url_for, redirect
+    Platform, GAME_DETAIL_PROFILE, GAME_LISTING_PROFILE
+from app.passwords import hash_password, verify_password, check_and_upgrade
+from app.ratelimit import rate_limiter
+from app.recommend import recommended_games
+from app.sampling import sample_games, sample_years
+from app.search import search_games
+from flask import render_template, request, flash, url_for, redirect, \
+    abort, jsonify, send_from_directory, stream_with_context
 from flask_admin import Admin, AdminIndexView
 from flask_admin.contrib.fileadmin import FileAdmin
 from flask_admin.contrib.sqla import ModelView
 from flask_login import login_user, login_required, logout_user, \
     current_user
-from sqlalchemy import func
-from werkzeug.security import generate_password_hash, \
-    check_password_hash
+from flask_sqlalchemy import BaseQuery, models_committed
+from sqlalchemy import event, func, or_
+from sqlalchemy.exc import IntegrityError
 
 
 class AdminView(AdminIndexView):
@@ -32,75 +49,244 @@ class AdminView(AdminIndexView):
         return current_user.is_authenticated and current_user.is_admin()
 
 
-class AdminModelView(ModelView):
+class AdminAccess(object):
+    """
+    A mixin that limits an admin view to admin users. Anonymous users are
+    sent to the login page and other users are displayed an Error:403
+    page.
+    """
+
+    def is_accessible(self):
+        """
+        :return: True if user is a verified admin.
+        """
+        return current_user.is_authenticated and current_user.is_admin()
+
+    def inaccessible_callback(self, name, **kwargs):
+        """
+        :return: Redirects anonymous users to the login page
+        """
+        if not current_user.is_authenticated:
+            return redirect(url_for('login', next=request.full_path))
+        abort(403)
+
+
+admin_counts = LRUCache(app.config['ADMIN_COUNT_CACHE_SIZE'],
+                        app.config['ADMIN_COUNT_CACHE_TTL'])
+
+
+class CachedCountQuery(BaseQuery):
+    """
+    A count query whose result is cached by its SQL and parameters, so
+    paging through a long list does not count every row again on each
+    page. The cache is cleared when a model is committed.
+    """
+
+    def scalar(self):
+        """
+        :return: The number of rows, from the cache if it was counted
+                 recently
+        """
+        compiled = self.statement.compile()
+        key = (str(compiled), repr(sorted(compiled.params.items())))
+        count = admin_counts.get(key)
+        if count is None:
+            count = super(CachedCountQuery, self).scalar()
+            admin_counts.set(key, count)
+        return count
+
+
+class AdminModelView(AdminAccess, ModelView):
     """
     A class that limits the admin page for admin users only. The admin
-    are not able to see the password column for users.
+    are not able to see the password column for users. Lists are paged
+    with at most ADMIN_MAX_PAGE_SIZE rows and their counts are cached.
     """
     column_exclude_list = ['password']
+    page_size = app.config['ADMIN_PAGE_SIZE']
+    can_set_page_size = True
 
+    def _get_list_extra_args(self):
+        """
+        Keep the page size asked for in the URL within the bounds.
+        """
+        view_args = super(AdminModelView, self)._get_list_extra_args()
+        if view_args.page_size:
+            view_args.page_size = max(1, min(
+                view_args.page_size, app.config['ADMIN_MAX_PAGE_SIZE']))
+        return view_args
 
-class UploadImages(FileAdmin):
+    def get_count_query(self):
+        """
+        :return: Query counting the rows, cached between pages
+        """
+        return CachedCountQuery(func.count('*'), session=self.session()) \
+            .select_from(self.model)
+
+
+class UserModelView(AdminModelView):
+    """
+    Users are filtered on their unique, indexed columns and their games
+    are picked with an Ajax search instead of a list of every game.
+    """
+    column_filters = ['username', 'email']
+    form_ajax_refs = {'games': {'fields': ['title'], 'page_size': 10}}
+
+
+class GameModelView(AdminModelView):
+    """
+    Games are listed with their relationships, loaded for the whole page
+    with one query each. The relationships are picked with Ajax searches
+    and games are filtered on indexed columns.
+    """
+    column_list = ['title', 'release_date', 'developer', 'publisher',
+                   'genre', 'model', 'platform']
+    column_filters = ['release_date', 'genre.genre_type',
+                      'platform.platform_name']
+    column_default_sort = ('release_date', True)
+    # Flask-Admin would join them into the page's query instead
+    column_auto_select_related = False
+    form_ajax_refs = {
+        'developer': {'fields': ['name'], 'page_size': 10},
+        'publisher': {'fields': ['name'], 'page_size': 10},
+        'genre': {'fields': ['genre_type'], 'page_size': 10},
+        'model': {'fields': ['model_type'], 'page_size': 10},
+        'platform': {'fields': ['platform_name'], 'page_size': 10},
+    }
+
+    def get_query(self):
+        """
+        :return: Query of the games with their listed relationships
+        """
+        return super(GameModelView, self).get_query() \
+            .options(*GAME_LISTING_PROFILE)
+
+
+class TaxonomyModelView(AdminModelView):
+    """
+    The games of a developer, publisher, genre, model or platform are
+    picked with an Ajax search instead of a list of every game.
+    """
+
+    def __init__(self, model, session, backref, **kwargs):
+        """
+        :param backref: Name of the model's relationship to its games
+        """
+        self.form_ajax_refs = {backref: {'fields': ['title'],
+                                         'page_size': 10}}
+        super(TaxonomyModelView, self).__init__(model, session, **kwargs)
+
+
+class UploadImages(AdminAccess, FileAdmin):
     """
     A class that limits the admin page for admin users only. The admin
-    is able to upload image files.
+    is able to upload image files. Uploads that are not images are
+    rejected, large images are shrunk and the thumbnails are made right
+    away.
     """
     allowed_extensions = {'png', 'jpg', 'jpeg'}
+    can_mkdir = False
+
+    def on_file_upload(self, directory, path, filename):
+        """
+        Process the uploaded image, or delete it if it is not an image.
+        Thumbnails left by a deleted image of the same name are removed.
+        """
+        remove_thumbnails(op.basename(filename))
+        if thumbnails_enabled() and not process_upload(filename):
+            self.delete_file(filename)
+            raise ValueError('"%s" is not an image'
+                             % op.basename(filename))
+
+    def on_file_delete(self, full_path, filename):
+        """
+        Delete the thumbnails of a deleted image.
+        """
+        remove_thumbnails(op.basename(full_path))
+
+    def on_rename(self, full_path, dir_base, filename):
+        """
+        Delete the thumbnails of an image under its old name.
+        """
+        remove_thumbnails(op.basename(full_path))
 
 
 admin = Admin(app, template_mode='bootstrap4', index_view=AdminView())
 # Setting what database can the admin view
-admin.add_view(AdminModelView(User, db.session))
-admin.add_view(AdminModelView(Game, db.session))
-admin.add_view(AdminModelView(Developer, db.session))
-admin.add_view(AdminModelView(Publisher, db.session))
-admin.add_view(AdminModelView(Genre, db.session))
-admin.add_view(AdminModelView(Model, db.session))
-admin.add_view(AdminModelView(Platform, db.session))
+admin.add_view(UserModelView(User, db.session))
+admin.add_view(GameModelView(Game, db.session))
+admin.add_view(TaxonomyModelView(Developer, db.session, 'game_developer'))
+admin.add_view(TaxonomyModelView(Publisher, db.session, 'game_publisher'))
+admin.add_view(TaxonomyModelView(Genre, db.session, 'game_genre'))
+admin.add_view(TaxonomyModelView(Model, db.session, 'game_model'))
+admin.add_view(TaxonomyModelView(Platform, db.session, 'game_platform'))
 path = op.join(op.dirname(__file__), 'static/game image')
 admin.add_view(UploadImages(path, '/game image/', name='Game images'))
 
 
+@models_committed.connect_via(app)
+def _invalidate_admin_counts(sender, changes):
+    """
+    Clear the cached counts when any model is committed.
+    """
+    if changes:
+        admin_counts.clear()
+
+
+@event.listens_for(db.Model.metadata, 'after_create')
+@event.listens_for(db.Model.metadata, 'after_drop')
+def _reset_admin_counts(target, connection, **kw):
+    """
+    Clear the cached counts when the tables are created or dropped.
+    """
+    admin_counts.clear()
+
+
 @app.route('/', methods=['GET'])
+@response_cache.cached()
 def index():
     """
     The index page contains a list of the game made in the current year,
-    last year and year before last. Three types of games are queried,
-    this year's games, last year's games and the year before last games.
-    The games are queried and displayed in the index page
+    last year and year before last. Logged in users are redirected
+    before anything is queried. The games of the three years are picked
+    and loaded together, and displayed in the index page
 
     :return: Redirects to personalised feed if user is logged in,
              otherwise to the index page of the application
     """
-    # Setting up time frames
-    year = date.today().year
-    start_of_next_year = date(year + 1, 1, 1)
-    start_of_year = date(year, 1, 1)
-    start_of_last_year = date(year - 1, 1, 1)
-    start_of_last_last_year = date(year - 2, 1, 1)
-
-    # Query this year's games
-    games_1 = Game.query.filter(
-        Game.release_date < start_of_next_year,
-        Game.release_date >= start_of_year).order_by(
-        func.random()).limit(10)
-    # Query last year's games
-    games_2 = Game.query.filter(Game.release_date < start_of_year,
-                                Game.release_date >= start_of_last_year).order_by(
-        func.random()).limit(10)
-    # Query year before last games
-    games_3 = Game.query.filter(
-        Game.release_date < start_of_last_year,
-        Game.release_date >= start_of_last_last_year).order_by(
-        func.random()).limit(10)
     if current_user.get_id() is not None:
         return redirect(url_for('feed'))
-    return render_template('index.html', games_1=games_1,
-                           games_2=games_2, games_3=games_3, year=year,
+    year = date.today().year
+
+    # Sample this year's, last year's and year before last games
+    sections = sample_years([year, year - 1, year - 2], 10)
+    return render_template('index.html', sections=sections, year=year,
                            login=current_user.is_authenticated)
 
 
+def _signup_error(email, username):
+    """
+    :param email: Email address of the registering user
+    :param username: Username of the registering user
+    :return: Error message if the email or username belongs to a user,
+             None if both are free
+    """
+    taken = db.session.query(User.email, User.username) \
+        .filter(or_(User.email == email, User.username == username)) \
+        .limit(2).all()
+    email_taken = any(row.email == email for row in taken)
+    username_taken = any(row.username == username for row in taken)
+    if email_taken and username_taken:
+        return "Username and email has already exist."
+    elif email_taken:
+        return "Email has already exist."
+    elif username_taken:
+        return "Username has already been taken."
+    return None
+
+
 @app.route('/signup', methods=['GET', 'POST'])
+@rate_limiter.limit('signup')
 def signup():
     """
     The sign up page contains a form for the user to register
@@ -120,39 +306,32 @@ def signup():
         new_username = request.form.get('username')
         new_password = request.form.get('password')
 
-        # Find if username or email is in database
-        find_user_email = User.query.filter(
-            User.email == new_email).first()
-        find_user_username = User.query.filter(
-            User.username == new_username).first()
-
-        # Flash error if user with email and username is found
-        if find_user_email and find_user_username is not None:
-            flash("Username and email has already exist.")
-            return render_template('signup.html', form=form,
-                                   login=current_user.is_authenticated)
-        elif find_user_email is not None:
-            flash("Email has already exist.")
-            return render_template('signup.html', form=form,
-                                   login=current_user.is_authenticated)
-        elif find_user_username is not None:
-            flash("Username has already been taken.")
+        # Find if username or email is in database with one query
+        error = _signup_error(new_email, new_username)
+        if error is None:
+            # Adding user into the user database, the unique constraints
+            # catch a user registered by a concurrent request meanwhile
+            user = User(email=new_email, username=new_username,
+                        password=hash_password(new_password))
+            db.session.add(user)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                error = _signup_error(new_email, new_username) or \
+                    "Username or email has already been taken."
+        if error is not None:
+            flash(error)
             return render_template('signup.html', form=form,
                                    login=current_user.is_authenticated)
 
-        # Adding user into the user database
-        user = User(email=new_email, username=new_username,
-                    password=generate_password_hash(new_password,
-                                                    method='sha256'))
-        db.session.add(user)
-        db.session.commit()
-
         return redirect(url_for('login'))
     return render_template('signup.html', form=form,
                            login=current_user.is_authenticated)
 
 
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limiter.limit('login')
 def login():
     """
     The login page contains a form for the user to login. The form is
@@ -173,12 +352,13 @@ def login():
         remember = True if request.form.get('remember') else False
         # Find the user
         user = User.query.filter_by(username=username).first()
-        # Validate the user
-        if user is None or not check_password_hash(user.password,
-                                                   password):
+        # Validate the user, upgrading a weak password hash
+        if user is None or not check_and_upgrade(user, password):
             flash("Username or password incorrect.")
             return render_template('login.html', form=form,
                                    login=current_user.is_authenticated)
+        if user in db.session.dirty:
+            db.session.commit()
         # Create a session and redirect to feed
         login_user(user, remember=remember)
         return redirect(url_for('feed'))
@@ -191,19 +371,76 @@ def login():
 def feed():
     """
     The feed page contains a personalised list of games that the current
-    user has added to the list. It also shows other random games in the
-    checkout section. This route can only be accessed if the current
+    user has added to the list, most recently added first. Only the
+    first page of games is rendered, later pages are loaded from
+    feed_games as the user scrolls. It also shows the games recommended
+    to the user in the checkout section, or random games if there are no
+    recommendations yet. This route can only be accessed if the current
     user is logged in.
 
     :return: Personalised feed of the current user
     """
-    games = current_user.games
-    random = Game.query.filter_by().order_by(func.random()).limit(5)
+    games, next_cursor = feed_page()
+    checkout = recommended_games(current_user.get_id(), 5) or \
+        sample_games(None, 5)
     return render_template('feed.html', user=current_user, games=games,
-                           checkout=random,
+                           next_cursor=next_cursor, checkout=checkout,
                            login=current_user.is_authenticated)
 
 
+@app.route('/feed/games', methods=['GET'])
+@login_required
+def feed_games():
+    """
+    A route for AJAX to load the next page of the user's feed when the
+    user scrolls to the bottom of it. User must be logged in to access
+    this page.
+
+    :return: json list of games and the cursor of the next page.
+    """
+    try:
+        games, next_cursor = feed_page(request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+    return jsonify(games=[{'game_id': game.game_id,
+                           'title': game.title,
+                           'description': game.description,
+                           'image_url': game.image_url_to_string('small'),
+                           'image_srcset': game.image_srcset(),
+                           'url': game.game_url()} for game in games],
+                   next_cursor=next_cursor)
+
+
+@app.route('/thumbnails/<size>/<path:name>', methods=['GET'])
+def thumbnail(size, name):
+    """
+    A route serving the thumbnails of the game images. A thumbnail is
+    made the first time it is requested and then served from the disk.
+
+    :param size: Name of the thumbnail size
+    :param name: File name of the image, with '.webp' appended for the
+                 WebP variant
+    :return: The thumbnail, or the original image if thumbnails are off
+    """
+    if not thumbnails_enabled():
+        if name.endswith('.webp'):
+            abort(404)
+        return redirect(asset_url('game image/' + name))
+    path = thumbnail_path(size, name)
+    if path is None:
+        abort(404)
+    response = send_from_directory(
+        app.config['THUMBNAIL_PATH'], path,
+        cache_timeout=app.config['THUMBNAIL_MAX_AGE'])
+    # The URL of a fingerprinted image changes with its content
+    version = image_version(name[:-len('.webp')] if name.endswith('.webp')
+                            else name)
+    if version is not None and request.args.get('v') == version:
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
 @app.route('/add', methods=['POST'])
 @login_required
 def add():
@@ -218,13 +455,9 @@ def add():
     response = data.get('response')
     index_token = response.find('_')
     game_id = int(response[index_token + 1:])
-    # Find the game in the database
-    game = Game.query.get(game_id)
     # Update user's game list
-    if game not in current_user.games:
-        current_user.games.append(game)
-        db.session.add(current_user)
-        db.session.commit()
+    if add_game(game_id) == 'not found':
+        return json.dumps({'status': 'Not found', 'response': game_id}), 404
     return json.dumps({'status': 'OK', 'response': game_id})
 
 
@@ -242,44 +475,179 @@ def remove():
     response = data.get('response')
     index_token = response.find('_')
     game_id = int(response[index_token + 1:])
-    # Find game in the database
-    game = Game.query.get(game_id)
     # Update user's game list
-    if game in current_user.games:
-        current_user.games.remove(game)
-        db.session.add(current_user)
-        db.session.commit()
+    remove_game(game_id)
     return json.dumps({'status': 'OK', 'response': game_id})
 
 
+@app.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """
+    A route to handle the response from AJAX to add and remove many games
+    from the user's game list at once, e.g. when the user clicks quickly
+    or imports a library. The request contains the lists of game IDs
+    to add and to remove, or is a library export whose games are all
+    added. A library export is added LIBRARY_BATCH_LIMIT games per
+    transaction, other requests may change at most LIBRARY_BATCH_LIMIT
+    games. User must be logged in to access this page.
+
+    :return: json success code and the result for each game.
+    """
+    # Handling response from AJAX, or a library export to add
+    formats = {mimetype: file_format
+               for file_format, mimetype in EXPORT_MIMETYPES.items()}
+    limit = app.config['LIBRARY_BATCH_LIMIT']
+    try:
+        if request.mimetype in formats:
+            add_ids = read_game_ids(request.get_data(as_text=True),
+                                    formats[request.mimetype])
+            remove_ids = None
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                abort(400)
+            add_ids = data.get('add', [])
+            remove_ids = data.get('remove', [])
+            if not isinstance(add_ids, list) or \
+                    not isinstance(remove_ids, list):
+                abort(400)
+            add_ids = [int(game_id) for game_id in add_ids]
+            remove_ids = [int(game_id) for game_id in remove_ids]
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+    # Update user's game list
+    if remove_ids is None:
+        results = {}
+        for start in range(0, len(add_ids), limit):
+            for game_id, status in apply_batch(
+                    add_ids[start:start + limit]).items():
+                results.setdefault(game_id, status)
+    elif len(add_ids) + len(remove_ids) > limit:
+        abort(413)
+    else:
+        results = apply_batch(add_ids, remove_ids)
+    return jsonify(status='OK',
+                   results=[{'game_id': game_id, 'status': status}
+                            for game_id, status in results.items()])
+
+
+def _export_response(chunks, name, file_format):
+    """
+    :param chunks: Iterator of the text chunks of an export
+    :param name: File name of the export without its extension
+    :param file_format: 'csv' or 'jsonl'
+    :return: Streamed response sending each chunk as soon as it is made
+    """
+    response = app.response_class(stream_with_context(chunks),
+                                  mimetype=EXPORT_MIMETYPES[file_format])
+    response.headers['Content-Disposition'] = \
+        'attachment; filename=%s.%s' % (name, file_format)
+    return response
+
+
+@app.route('/export/library.<any(csv, jsonl):file_format>', methods=['GET'])
+@login_required
+def export_library_file(file_format):
+    """
+    A route to download the user's game list as CSV or JSON lines. The
+    file can be posted to /batch to add the same games to a list. User
+    must be logged in to access this page.
+
+    :param file_format: 'csv' or 'jsonl'
+    :return: The streamed export
+    """
+    return _export_response(export_library(current_user.get_id(),
+                                           file_format),
+                            'library', file_format)
+
+
+@app.route('/export/games.<any(csv, jsonl):file_format>', methods=['GET'])
+@login_required
+def export_games_file(file_format):
+    """
+    A route to download the whole catalogue as CSV or JSON lines, in the
+    format read by `flask import-games`. Only for admin users.
+
+    :param file_format: 'csv' or 'jsonl'
+    :return: The streamed export
+    """
+    if not current_user.is_admin():
+        abort(403)
+    return _export_response(export_games(file_format), 'games', file_format)
+
+
 @app.route('/search', methods=['GET', 'POST'])
 def search():
     """
     The website has a header that contains a search query. Any search
-    query performed by the user is posted to this route. A query is then
-    made to the game database that is similar to the query. The search
-    route is only available if the user uses the search query and not
-    using a GET request.
+    query performed by the user is posted to this route. The query is
+    matched against the full-text search index of the games' titles,
+    descriptions, developers, publishers, genres, models and platforms,
+    and the best matches are shown one page at a time. Later pages are
+    requested with GET and the query in the URL.
 
     :return: Redirect to search page with games similar to search query.
-             Otherwise, redirect to index page if accessed with GET.
-    """
-    if request.form.get("search") is not None:
-        query = request.form.get("search")
-        search_query = "%" + query + "%"
-        games = Game.query.filter(Game.title.like(search_query)).limit(
-            10).all()
-        if current_user.is_authenticated:
-            user_game = current_user.games
-        else:
-            user_game = None
+             Otherwise, redirect to index page if no query is given.
+    """
+    query = request.values.get("search")
+    if query is not None:
+        page = request.args.get("page", 1, type=int)
+        games, has_next = search_games(query, page)
         return render_template('search.html', query=query, games=games,
-                               login=current_user.is_authenticated,
-                               user_games=user_game)
+                               page=page, has_next=has_next,
+                               login=current_user.is_authenticated)
     return redirect(url_for("index"))
 
 
+@app.route('/browse', methods=['GET'])
+@response_cache.cached()
+def browse():
+    """
+    The browse page filters the games by any combination of developers,
+    publishers, genres, models, platforms and release years given in the
+    URL, newest first, next to the number of games of each facet value.
+    Games and counts come from the in-memory facet index, so only the
+    games on the page are loaded from the database.
+
+    :return: The page of matching games, 400 if a filter is not valid
+    """
+    try:
+        filters = parse_filters(request.args)
+    except ValueError:
+        abort(400)
+    cursor = request.args.get('cursor', type=int)
+    game_ids, next_cursor, total, counts = facet_index.browse(
+        filters, cursor, app.config['BROWSE_PAGE_SIZE'])
+
+    def browse_url(facet=None, value=None, cursor=None):
+        """
+        :return: URL of the page with the value of the facet toggled, or
+                 of the next page
+        """
+        args = request.args.copy()
+        args.poplist('cursor')
+        if facet is not None:
+            values = args.getlist(facet)
+            if str(value) in values:
+                values.remove(str(value))
+            else:
+                values.append(str(value))
+            args.setlist(facet, values)
+        if cursor is not None:
+            args['cursor'] = cursor
+        return url_for('browse', **args.to_dict(flat=False))
+
+    return render_template('browse.html',
+                           games=game_cards(game_ids, taxonomy=True),
+                           facets=facet_summary(counts, filters),
+                           total=total, next_cursor=next_cursor,
+                           filtered=bool(filters), browse_url=browse_url,
+                           login=current_user.is_authenticated)
+
+
 @app.route('/game/<int:game_id>', methods=['GET'])
+@response_cache.cached()
 def game(game_id):
     """
     The webpage provides each game with their own page. If the user is
@@ -287,19 +655,15 @@ def game(game_id):
     
     :return: Redirect to game page. Otherwise get page error.
     """
-    game = Game.query.get(int(game_id))
+    game = Game.query.options(*GAME_DETAIL_PROFILE).get(int(game_id))
     if game is None:
         return "Cannot find game"
-    if current_user.is_authenticated:
-        user_game = current_user.games
-    else:
-        user_game = None
     return render_template('game.html', game=game, 
-                           login=current_user.is_authenticated, 
-                           user_games=user_game)
+                           login=current_user.is_authenticated)
 
 
 @app.route('/setting', methods=['GET', 'POST'])
+@rate_limiter.limit('setting')
 @login_required
 def setting():
     """
@@ -317,12 +681,14 @@ def setting():
     form = PasswordForm()
     if form.validate_on_submit():
         old_password = request.form.get("old_password")
-        if check_password_hash(current_user.password, old_password):
+        user = User.query.get(current_user.get_id())
+        if verify_password(user.password, old_password):
             new_password = request.form.get("password")
-            current_user.password = generate_password_hash(new_password)
+            user.password = hash_password(new_password)
             # Update database
-            db.session.add(current_user)
+            db.session.add(user)
             db.session.commit()
+            forget_user(user.user_id)
             # Flash message
             flash("Password updated successfully.")
             return render_template('setting.html', form=form,
@@ -345,3 +711,31 @@ def logout():
     """
     logout_user()
     return redirect(url_for('index'))
+
+
+@app.route('/ratelimit', methods=['GET'])
+@login_required
+def ratelimit():
+    """
+    A route for monitoring the rate limiter, only for admin users.
+
+    :return: JSON of the allowed and limited requests of each route
+             counted by this worker and the number of buckets in the store
+    """
+    if not current_user.is_admin():
+        abort(403)
+    return jsonify(rate_limiter.stats())
+
+
+@app.route('/instrumentation', methods=['GET'])
+@login_required
+def instrumentation_stats():
+    """
+    A route for monitoring the requests, only for admin users.
+
+    :return: JSON of the requests, queries and timings of each route
+             counted by this worker, empty if INSTRUMENTATION is off
+    """
+    if not current_user.is_admin():
+        abort(403)
+    return jsonify(instrumentation.stats())
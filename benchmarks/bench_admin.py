@@ -0,0 +1,109 @@
+import os
+import random
+import sys
+import tempfile
+import timeit
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from app.models import User, Game, Developer, Publisher, Genre, Model, \
+    Platform, user_game, game_developer, game_publisher, game_genre, \
+    game_model, game_platform
+from app.search import drop_search_index
+from app.views import admin
+from flask_admin.contrib.sqla import ModelView
+
+GAMES = 100000
+USERS = 1000
+# Taxonomies as (model, association table, name column, number of rows,
+# rows per game)
+TAXONOMIES = [
+    (Developer, game_developer, 'name', 1000, 1),
+    (Publisher, game_publisher, 'name', 1000, 1),
+    (Genre, game_genre, 'genre_type', 20, 2),
+    (Model, game_model, 'model_type', 10, 1),
+    (Platform, game_platform, 'platform_name', 10, 2),
+]
+MODELS = [User, Game, Developer, Publisher, Genre, Model, Platform]
+REPEAT = 3
+
+
+def populate():
+    """
+    Fill the database with GAMES games, their taxonomies and USERS users
+    owning 50 games each.
+    """
+    connection = db.engine.connect()
+    # The search index is not used by the admin pages
+    drop_search_index(connection)
+    release = date(2000, 1, 1)
+    connection.execute(Game.__table__.insert(), [
+        {'game_id': game_id, 'title': 'Game %d' % game_id,
+         'description': 'Description of game %d' % game_id,
+         'release_date': release + timedelta(days=game_id % 7300),
+         'image_url': 'placeholder.jpg'}
+        for game_id in range(1, GAMES + 1)])
+    for model, link, name, count, per_game in TAXONOMIES:
+        key = link.c.keys()[1]
+        connection.execute(model.__table__.insert(), [
+            {key: row_id, name: '%s %d' % (model.__name__, row_id)}
+            for row_id in range(1, count + 1)])
+        connection.execute(link.insert(), [
+            {'game_id': game_id, key: row_id}
+            for game_id in range(1, GAMES + 1)
+            for row_id in random.sample(range(1, count + 1), per_game)])
+    connection.execute(User.__table__.insert(), [
+        {'user_id': user_id, 'email': 'user%d@mail.com' % user_id,
+         'username': 'user%d' % user_id, 'password': 'x', 'admin': False}
+        for user_id in range(1, USERS + 1)])
+    connection.execute(user_game.insert(), [
+        {'user_id': user_id, 'game_id': game_id}
+        for user_id in range(1, USERS + 1)
+        for game_id in random.sample(range(1, GAMES + 1), 50)])
+    connection.close()
+
+
+def best_time(client, url):
+    """
+    :return: Fastest seconds to render the page of the URL
+    """
+    def get():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return min(timeit.repeat(get, number=1, repeat=REPEAT))
+
+
+def main():
+    path = tempfile.mktemp(suffix='.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    # Default views for comparison, registered before the first request
+    for model in MODELS:
+        admin.add_view(ModelView(model, db.session,
+                                 name='Default ' + model.__name__,
+                                 endpoint='default_' + model.__name__.lower()))
+    try:
+        db.create_all()
+        populate()
+        client = app.test_client()
+        print('%-10s %-10s %10s %10s' % ('model', 'page', 'default',
+                                         'tuned'))
+        for model in MODELS:
+            name = model.__name__.lower()
+            for page, query in [('list', '/'), ('page 500', '/?page=500'),
+                                ('edit', '/edit/?id=1')]:
+                default = best_time(client, '/admin/default_%s%s'
+                                    % (name, query))
+                tuned = best_time(client, '/admin/%s%s' % (name, query))
+                print('%-10s %-10s %9.0fms %9.0fms'
+                      % (model.__name__, page, default * 1000,
+                         tuned * 1000))
+    finally:
+        db.session.remove()
+        db.engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
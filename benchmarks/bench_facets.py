@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from app.facets import facet_index, FACETS
+from bench_admin import populate, GAMES
+from sqlalchemy import text
+
+# Filters as (description, dictionary of facet to set of values)
+FILTERS = [
+    ('no filter', {}),
+    ('one genre', {'genre': {1}}),
+    ('genre and platform', {'genre': {1}, 'platform': {2}}),
+    ('two genres and a year', {'genre': {1, 2}, 'year': {2010}}),
+    ('one developer', {'developer': {7}}),
+]
+REPEAT = 5
+
+# Counts of one facet over the games matching the filters, as the
+# database would group them
+GROUP_SQL = "SELECT l.{key}, count(*) FROM {link} l WHERE l.game_id IN " \
+            "(SELECT g.game_id FROM game g WHERE {where}) GROUP BY l.{key}"
+LINKS = {'developer': ('game_developer', 'developer_id'),
+         'publisher': ('game_publisher', 'publisher_id'),
+         'genre': ('game_genre', 'genre_id'),
+         'model': ('game_model', 'model_id'),
+         'platform': ('game_platform', 'platform_id')}
+
+
+def where(filters):
+    """
+    :return: SQL condition on the game g matching the filters
+    """
+    conditions = ['1']
+    for facet, values in filters.items():
+        ids = ', '.join(str(value) for value in values)
+        if facet == 'year':
+            conditions.append("CAST(strftime('%%Y', g.release_date) AS "
+                              "INTEGER) IN (%s)" % ids)
+        else:
+            link, key = LINKS[facet]
+            conditions.append('g.game_id IN (SELECT game_id FROM %s WHERE '
+                              '%s IN (%s))' % (link, key, ids))
+    return ' AND '.join(conditions)
+
+
+def group_by(filters):
+    """
+    Count every facet with GROUP BY queries, as browsing would without
+    the index.
+    """
+    for facet in FACETS:
+        if facet == 'year':
+            continue
+        link, key = LINKS[facet]
+        others = {other: values for other, values in filters.items()
+                  if other != facet}
+        db.session.execute(text(GROUP_SQL.format(
+            key=key, link=link, where=where(others)))).fetchall()
+
+
+def main():
+    path = tempfile.mktemp(suffix='.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    try:
+        db.create_all()
+        populate()
+        with app.app_context():
+            load = timeit.timeit(lambda: (facet_index.invalidate(),
+                                          facet_index.browse({}, None, 20)),
+                                 number=1)
+            print('index of %d games loaded in %.0fms' % (GAMES, load * 1000))
+            print('%-24s %12s %12s' % ('filter', 'GROUP BY', 'index'))
+            for description, filters in FILTERS:
+                sql = min(timeit.repeat(lambda: group_by(filters),
+                                        number=1, repeat=REPEAT))
+                index = min(timeit.repeat(
+                    lambda: facet_index.browse(filters, None, 20),
+                    number=1, repeat=REPEAT))
+                print('%-24s %10.1fms %10.1fms'
+                      % (description, sql * 1000, index * 1000))
+    finally:
+        db.session.remove()
+        db.engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from app.importer import import_games
+
+# Number of games, or the first argument
+GAMES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+# Taxonomies as (field, number of names, names per game)
+TAXONOMIES = [
+    ('developer', 5000, 1),
+    ('publisher', 2000, 1),
+    ('genre', 20, 2),
+    ('model', 10, 1),
+    ('platform', 10, 2),
+]
+
+
+def write_games(path):
+    """
+    Write a CSV file of GAMES games with random taxonomies.
+    """
+    release = date(2000, 1, 1)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['title', 'description', 'release_date'] +
+                        [field for field, count, per_game in TAXONOMIES])
+        for game_id in range(1, GAMES + 1):
+            writer.writerow(
+                ['Game %d' % game_id, 'Description of game %d' % game_id,
+                 (release + timedelta(days=game_id % 7300)).isoformat()] +
+                [';'.join('%s %d' % (field, number) for number in
+                          random.sample(range(count), per_game))
+                 for field, count, per_game in TAXONOMIES])
+
+
+def main():
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, 'games.csv')
+    database = os.path.join(folder, 'games.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + database
+    try:
+        write_games(source)
+        for chunk_size in (1000, 5000, 20000):
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            with open(source, newline='') as file:
+                count = import_games(file, 'csv', chunk_size)
+            seconds = time.perf_counter() - start
+            print('chunks of %5d: %d games in %.1fs (%.0f games/s)'
+                  % (chunk_size, count, seconds, count / seconds))
+    finally:
+        db.session.remove()
+        db.engine.dispose()
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    main()
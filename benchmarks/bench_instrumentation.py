@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from app.instrumentation import instrumentation
+from bench_admin import populate
+
+# Routes requested, as the test client would
+PATHS = ['/api/v1/games?limit=50', '/api/v1/browse?genre=1', '/browse']
+REQUESTS = 200
+REPEAT = 3
+
+
+def requests(client):
+    """
+    Request every path REQUESTS times.
+    """
+    for i in range(REQUESTS):
+        for path in PATHS:
+            client.get(path, headers={'Cache-Control': 'no-cache'})
+
+
+def main():
+    path = tempfile.mktemp(suffix='.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    try:
+        db.create_all()
+        populate()
+        client = app.test_client()
+        requests(client)
+        # Alternate the runs so both see the same state of the caches
+        disabled = enabled = float('inf')
+        for i in range(REPEAT):
+            disabled = min(disabled, timeit.timeit(lambda: requests(client),
+                                                   number=1))
+            instrumentation.enable()
+            enabled = min(enabled, timeit.timeit(lambda: requests(client),
+                                                 number=1))
+            instrumentation.disable()
+        total = REQUESTS * len(PATHS)
+        print('disabled %8.3fms per request' % (disabled * 1000 / total))
+        print('enabled  %8.3fms per request (%+.1f%%)'
+              % (enabled * 1000 / total, (enabled / disabled - 1) * 100))
+    finally:
+        db.session.remove()
+        db.engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from app.passwords import hash_password, verify_password
+
+# Hashing settings as (PASSWORD_METHOD, PASSWORD_ITERATIONS)
+SETTINGS = [
+    ('sha256', 0),
+    ('pbkdf2:sha256', 50000),
+    ('pbkdf2:sha256', 150000),
+    ('pbkdf2:sha256', 260000),
+    ('pbkdf2:sha256', 600000),
+]
+PASSWORD = 'eSM&A@6}'
+SECONDS = 2
+
+
+def logins_per_second(pwhash, threads):
+    """
+    :param pwhash: Stored hash to verify
+    :param threads: Number of threads logging in at once
+    :return: Password checks per second over SECONDS
+    """
+    def login():
+        count = 0
+        end = time.perf_counter() + SECONDS
+        while time.perf_counter() < end:
+            assert verify_password(pwhash, PASSWORD)
+            count += 1
+        return count
+    with ThreadPoolExecutor(threads) as executor:
+        counts = [executor.submit(login) for i in range(threads)]
+        return sum(count.result() for count in counts) / SECONDS
+
+
+def main():
+    cores = os.cpu_count()
+    # Checks are not capped, so every core is used
+    app.config['PASSWORD_CONCURRENCY'] = 0
+    print('%-16s %10s %12s %14s' % ('method', 'iterations', 'per core',
+                                    'all %d cores' % cores))
+    for method, iterations in SETTINGS:
+        app.config['PASSWORD_METHOD'] = method
+        app.config['PASSWORD_ITERATIONS'] = iterations
+        pwhash = hash_password(PASSWORD)
+        print('%-16s %10s %10.0f/s %12.0f/s'
+              % (method, iterations or '-', logins_per_second(pwhash, 1),
+                 logins_per_second(pwhash, cores)))
+
+
+if __name__ == '__main__':
+    main()
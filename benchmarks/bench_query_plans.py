@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+# Association tables as they were before they got primary keys, as
+# (table, left column, right column)
+OLD_ASSOCIATIONS = [
+    ('user_game', 'user_id', 'game_id'),
+    ('game_developer', 'game_id', 'developer_id'),
+    ('game_publisher', 'game_id', 'publisher_id'),
+    ('game_genre', 'game_id', 'genre_id'),
+    ('game_model', 'game_id', 'model_id'),
+    ('game_platform', 'game_id', 'platform_id'),
+]
+
+# Queries run by the hot routes as (description, SQL)
+QUERIES = [
+    ('index: games released in a year',
+     "SELECT game_id FROM game WHERE release_date >= '2020-01-01' "
+     "AND release_date < '2021-01-01'"),
+    ('every page: games owned by the user',
+     'SELECT game_id FROM user_game WHERE user_id = 1'),
+    ('add/remove: is the game owned',
+     'SELECT 1 FROM user_game WHERE user_id = 1 AND game_id = 2'),
+    ('game: users owning the game',
+     'SELECT user_id FROM user_game WHERE game_id = 2'),
+    ('listing: genres of the cards',
+     'SELECT game_genre.game_id, genre.genre_type FROM game_genre '
+     'JOIN genre ON genre.genre_id = game_genre.genre_id '
+     'WHERE game_genre.game_id IN (1, 2, 3)'),
+    ('listing: developers of the cards',
+     'SELECT game_developer.game_id, developer.name FROM game_developer '
+     'JOIN developer ON developer.developer_id = game_developer.developer_id '
+     'WHERE game_developer.game_id IN (1, 2, 3)'),
+    ('search index: games of a renamed platform',
+     'SELECT game_id FROM game_platform WHERE platform_id = 4'),
+]
+
+
+def create_schema(old):
+    """
+    Create the schema of the models in an in-memory database, without
+    the search index.
+
+    :param old: True for the schema before the association tables had
+                primary keys and release dates were indexed
+    :return: SQLite connection
+    """
+    connection = sqlite3.connect(':memory:')
+    dialect = sqlite.dialect()
+    for table in db.Model.metadata.sorted_tables:
+        connection.execute(str(CreateTable(table).compile(dialect=dialect)))
+        for index in table.indexes:
+            connection.execute(str(CreateIndex(index).compile(
+                dialect=dialect)))
+    if old:
+        connection.execute('DROP INDEX ix_game_release_date')
+        for table, left, right in OLD_ASSOCIATIONS:
+            connection.execute('DROP TABLE %s' % table)
+            columns = '%s INTEGER, %s INTEGER' % (left, right)
+            if table == 'user_game':
+                columns += ', added_at DATETIME NOT NULL'
+            connection.execute('CREATE TABLE %s (%s)' % (table, columns))
+        connection.execute('CREATE INDEX ix_user_game_added ON user_game '
+                           '(user_id, added_at, game_id)')
+    return connection
+
+
+def query_plan(connection, query):
+    """
+    :return: The steps of the plan of a query joined with ' / '
+    """
+    rows = connection.execute('EXPLAIN QUERY PLAN ' + query).fetchall()
+    return ' / '.join(row[-1] for row in rows)
+
+
+def main():
+    old = create_schema(old=True)
+    new = create_schema(old=False)
+    for description, query in QUERIES:
+        print(description)
+        print('  before: %s' % query_plan(old, query))
+        print('  after:  %s' % query_plan(new, query))
+
+
+if __name__ == '__main__':
+    main()
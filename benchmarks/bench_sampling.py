@@ -0,0 +1,64 @@
+import os
+import random
+import sqlite3
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.sampling import GameSampler
+
+SIZES = [1000, 10000, 100000, 1000000]
+YEARS = list(range(2000, 2021))
+REPEAT = 200
+
+
+def make_rows(size):
+    """
+    :param size: Number of games in the catalogue
+    :return: List of (game_id, release_date) pairs
+    """
+    return [(game_id, date(random.choice(YEARS), 1, 1))
+            for game_id in range(1, size + 1)]
+
+
+def bench_order_by_random(rows, repeat):
+    """
+    Time the old ORDER BY RANDOM() query on an in-memory SQLite table.
+
+    :return: Mean seconds per query
+    """
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE game (game_id INTEGER PRIMARY KEY, '
+                       'release_date DATE NOT NULL)')
+    connection.executemany('INSERT INTO game VALUES (?, ?)',
+                           ((game_id, release_date.isoformat())
+                            for game_id, release_date in rows))
+    query = "SELECT game_id FROM game WHERE release_date >= '2020-01-01' " \
+            "AND release_date < '2021-01-01' ORDER BY RANDOM() LIMIT 10"
+    return timeit.timeit(lambda: connection.execute(query).fetchall(),
+                         number=repeat) / repeat
+
+
+def bench_sampler(rows, repeat):
+    """
+    Time GameSampler.sample_ids on preloaded buckets.
+
+    :return: Mean seconds per sample
+    """
+    sampler = GameSampler()
+    sampler.load(rows)
+    return timeit.timeit(lambda: sampler.sample_ids(2020, 10),
+                         number=repeat) / repeat
+
+
+if __name__ == '__main__':
+    print('%10s %20s %20s' % ('games', 'ORDER BY RANDOM (us)',
+                              'sample_ids (us)'))
+    for size in SIZES:
+        rows = make_rows(size)
+        repeat = max(REPEAT * 1000 // size, 5)
+        print('%10d %20.1f %20.1f' % (
+            size, bench_order_by_random(rows, repeat) * 1e6,
+            bench_sampler(rows, REPEAT) * 1e6))
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from app.database import apply_pragmas
+
+WORKERS = 8
+SECONDS = 3
+GAMES = 10000
+WRITE_RATIO = 0.2
+
+
+def create_database(path):
+    """
+    Create a database with games and an empty user_game table.
+
+    :param path: Path of the database file
+    """
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE game (game_id INTEGER PRIMARY KEY, '
+                       'title VARCHAR NOT NULL)')
+    connection.execute('CREATE TABLE user_game (user_id INTEGER, '
+                       'game_id INTEGER)')
+    connection.executemany('INSERT INTO game VALUES (?, ?)',
+                           ((i, 'game%d' % i) for i in range(GAMES)))
+    connection.commit()
+    connection.close()
+
+
+def worker(path, pragmas, results):
+    """
+    Mix game page reads with /add style writes until time is up, like a
+    gunicorn worker would.
+
+    :param path: Path of the database file
+    :param pragmas: Pragmas to set on the connection, None for defaults
+    :param results: Queue receiving (reads, writes, lock errors)
+    """
+    connection = sqlite3.connect(path)
+    if pragmas:
+        apply_pragmas(connection, pragmas)
+    reads = writes = errors = 0
+    deadline = time.monotonic() + SECONDS
+    while time.monotonic() < deadline:
+        try:
+            if random.random() < WRITE_RATIO:
+                connection.execute('INSERT INTO user_game VALUES (?, ?)',
+                                   (random.randrange(100),
+                                    random.randrange(GAMES)))
+                connection.commit()
+                writes += 1
+            else:
+                connection.execute('SELECT title FROM game WHERE game_id = ?',
+                                   (random.randrange(GAMES),)).fetchall()
+                connection.execute('SELECT count(*) FROM user_game WHERE '
+                                   'user_id = ?',
+                                   (random.randrange(100),)).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            connection.rollback()
+            errors += 1
+    connection.close()
+    results.put((reads, writes, errors))
+
+
+def run(pragmas):
+    """
+    :param pragmas: Pragmas to set on every connection, None for defaults
+    :return: Reads per second, writes per second and lock errors
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        create_database(path)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker,
+                                             args=(path, pragmas, results))
+                     for i in range(WORKERS)]
+        for process in processes:
+            process.start()
+        totals = [sum(values) for values in
+                  zip(*(results.get() for process in processes))]
+        for process in processes:
+            process.join()
+    return totals[0] / SECONDS, totals[1] / SECONDS, totals[2]
+
+
+if __name__ == '__main__':
+    print('%d workers, %d%% writes, %d seconds' % (WORKERS, WRITE_RATIO * 100,
+                                                   SECONDS))
+    print('%10s %12s %12s %12s' % ('settings', 'reads/s', 'writes/s',
+                                   'errors'))
+    for name, pragmas in [('default', None),
+                          ('tuned', config.SQLITE_PRAGMAS)]:
+        print('%10s %12.0f %12.0f %12d' % ((name,) + run(pragmas)))
@@ -6,3 +6,111 @@ SECRET_KEY = 'IfRJbXqxMq6GTK1B'
 basedir = os.path.abspath(os.path.dirname(__file__))
 SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'app.db')
 SQLALCHEMY_TRACK_MODIFICATIONS = True
+
+# Seconds before the random game sampler reloads changes made by other
+# processes
+SAMPLER_REFRESH_INTERVAL = 300
+
+# Number of games on each page of search results
+SEARCH_PAGE_SIZE = 10
+
+# Number of games loaded at a time on the feed
+FEED_PAGE_SIZE = 20
+
+# Maximum number of games changed by one request to /batch, and per
+# transaction when a library export posted to it is added
+LIBRARY_BATCH_LIMIT = 1000
+
+# SQLite tuning for concurrent workers, applied to every new connection
+# of a file database
+SQLITE_TUNING = True
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+}
+SQLITE_POOL_SIZE = 5
+SQLITE_POOL_OVERFLOW = 10
+
+# Cache of the pages seen by anonymous visitors: 'memory' for a cache per
+# process, 'sqlite' for a cache shared by the workers, None to disable
+RESPONSE_CACHE_BACKEND = 'memory'
+RESPONSE_CACHE_PATH = os.path.join(basedir, 'cache.db')
+RESPONSE_CACHE_TTL = 60
+RESPONSE_CACHE_SIZE = 512
+
+# Cache of the logged in users, bounded in size and seconds so changes
+# made by other workers are seen soon
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 30
+
+# Number of games recommended to each user, the number of users whose
+# recommendations are recomputed per transaction, the most users owning a
+# changed game who are queued with the user who changed it, and whether
+# the feed recomputes the current user's outdated recommendations itself
+# rather than waiting for `flask recommend`
+RECOMMENDATION_COUNT = 20
+RECOMMENDATION_BATCH_SIZE = 100
+RECOMMENDATION_PEER_LIMIT = 100
+RECOMMENDATION_REFRESH_ON_READ = False
+
+# Thumbnails of the game images by size name as (width, height), made
+# when an image is uploaded or first requested and kept in THUMBNAIL_PATH.
+# Uploads larger than IMAGE_MAX_SIZE are shrunk. Needs Pillow.
+THUMBNAILS = True
+THUMBNAIL_PATH = os.path.join(basedir, 'thumbnails')
+THUMBNAIL_MAX_AGE = 86400
+IMAGE_SIZES = {'small': (320, 200), 'large': (640, 400)}
+IMAGE_MAX_SIZE = (1920, 1200)
+
+# Rows on each page of the admin lists, the most a URL can ask for, and
+# the cache of their counts
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+ADMIN_COUNT_CACHE_SIZE = 256
+ADMIN_COUNT_CACHE_TTL = 60
+
+# Hashing of new passwords: a werkzeug method and, for pbkdf2, its number
+# of iterations. Weaker hashes are upgraded when the user logs in. At
+# most PASSWORD_CONCURRENCY hashes run at once per process, 0 for no limit
+PASSWORD_METHOD = 'pbkdf2:sha256'
+PASSWORD_ITERATIONS = 260000
+PASSWORD_CONCURRENCY = 4
+
+# Token buckets limiting the POSTs to login, sign up and settings as
+# (burst, requests per minute) for each IP address and each username.
+# RATELIMIT_BACKEND is 'memory' for buckets per process, 'sqlite' for
+# buckets shared by the workers, None to disable
+RATELIMIT_ENABLED = True
+RATELIMIT_BACKEND = 'memory'
+RATELIMIT_PATH = os.path.join(basedir, 'ratelimit.db')
+RATELIMIT_SIZE = 10000
+RATELIMIT_IP = (30, 10)
+RATELIMIT_USER = (10, 2)
+
+# Number of games written per transaction by `flask import-games`
+IMPORT_CHUNK_SIZE = 5000
+
+# Rows read from the database at a time by the exports
+EXPORT_BATCH_SIZE = 1000
+
+# Items on each page of the API, and the most a client can ask for
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Games on each page of /browse, the facet values shown next to them, and
+# the seconds before the facet index reloads changes made by other
+# processes
+BROWSE_PAGE_SIZE = 20
+FACET_VALUES_SHOWN = 15
+FACET_REFRESH_INTERVAL = 300
+
+# Per route counts of queries and timings of requests. Requests slower
+# than INSTRUMENTATION_SLOW_REQUEST seconds, or running one statement
+# with different parameters INSTRUMENTATION_REPEAT_THRESHOLD times, are
+# logged as JSON
+INSTRUMENTATION = False
+INSTRUMENTATION_SLOW_REQUEST = 0.5
+INSTRUMENTATION_REPEAT_THRESHOLD = 10
@@ -0,0 +1,40 @@
+"""Add recommendations of the users and their queue
+
+Revision ID: 37152bf062d4
+Revises: c52b7e9a4d18
+Create Date: 2026-10-17 23:52:20.753004
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '37152bf062d4'
+down_revision = 'c52b7e9a4d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['game.game_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'rank')
+    )
+    op.create_table('recommendation_queue',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Every existing user starts without recommendations
+    op.execute('INSERT INTO recommendation_queue (user_id) '
+               'SELECT user_id FROM user')
+
+
+def downgrade():
+    op.drop_table('recommendation_queue')
+    op.drop_table('recommendation')
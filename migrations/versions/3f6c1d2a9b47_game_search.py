@@ -0,0 +1,378 @@
+"""Add full-text search index of games
+
+Revision ID: 3f6c1d2a9b47
+Revises: e10b82078cfb
+Create Date: 2026-10-17 10:12:41.208314
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c1d2a9b47'
+down_revision = 'e10b82078cfb'
+branch_labels = None
+depends_on = None
+
+# The index and triggers as app.search created them at this revision
+CREATE_INDEX = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS game_search USING '
+    'fts5(title, description, developer, publisher, genre, model, '
+    "platform, tokenize='unicode61 remove_diacritics 2')")
+
+TRIGGERS = [
+    ('game_search_insert',
+     'AFTER INSERT ON game BEGIN INSERT INTO game_search (rowid, '
+     'title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id = new.game_id; END'),
+    ('game_search_update',
+     'AFTER UPDATE OF title, description ON game BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (new.game_id); INSERT INTO '
+     'game_search (rowid, title, description, developer, publisher,'
+     ' genre, model, platform) SELECT g.game_id, g.title, '
+     "g.description, (SELECT group_concat(t.name, ' ') FROM "
+     'game_developer l JOIN developer t ON t.developer_id = '
+     'l.developer_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.name, ' ') FROM game_publisher l JOIN "
+     'publisher t ON t.publisher_id = l.publisher_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.genre_type, ' "
+     "') FROM game_genre l JOIN genre t ON t.genre_id = l.genre_id "
+     'WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.model_type, ' ') FROM game_model l JOIN model "
+     't ON t.model_id = l.model_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.platform_name, ' ') FROM game_platform"
+     ' l JOIN platform t ON t.platform_id = l.platform_id WHERE '
+     'l.game_id = g.game_id) FROM game g WHERE g.game_id IN '
+     '(new.game_id); END'),
+    ('game_search_delete',
+     'AFTER DELETE ON game BEGIN DELETE FROM game_search WHERE '
+     'rowid = old.game_id; END'),
+    ('game_developer_search_insert',
+     'AFTER INSERT ON game_developer BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (new.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (new.game_id); END'),
+    ('game_developer_search_delete',
+     'AFTER DELETE ON game_developer BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (old.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (old.game_id); END'),
+    ('developer_search_update',
+     'AFTER UPDATE OF name ON developer BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (SELECT game_id FROM '
+     'game_developer WHERE developer_id = new.developer_id); INSERT'
+     ' INTO game_search (rowid, title, description, developer, '
+     'publisher, genre, model, platform) SELECT g.game_id, g.title,'
+     " g.description, (SELECT group_concat(t.name, ' ') FROM "
+     'game_developer l JOIN developer t ON t.developer_id = '
+     'l.developer_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.name, ' ') FROM game_publisher l JOIN "
+     'publisher t ON t.publisher_id = l.publisher_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.genre_type, ' "
+     "') FROM game_genre l JOIN genre t ON t.genre_id = l.genre_id "
+     'WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.model_type, ' ') FROM game_model l JOIN model "
+     't ON t.model_id = l.model_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.platform_name, ' ') FROM game_platform"
+     ' l JOIN platform t ON t.platform_id = l.platform_id WHERE '
+     'l.game_id = g.game_id) FROM game g WHERE g.game_id IN (SELECT'
+     ' game_id FROM game_developer WHERE developer_id = '
+     'new.developer_id); END'),
+    ('game_publisher_search_insert',
+     'AFTER INSERT ON game_publisher BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (new.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (new.game_id); END'),
+    ('game_publisher_search_delete',
+     'AFTER DELETE ON game_publisher BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (old.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (old.game_id); END'),
+    ('publisher_search_update',
+     'AFTER UPDATE OF name ON publisher BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (SELECT game_id FROM '
+     'game_publisher WHERE publisher_id = new.publisher_id); INSERT'
+     ' INTO game_search (rowid, title, description, developer, '
+     'publisher, genre, model, platform) SELECT g.game_id, g.title,'
+     " g.description, (SELECT group_concat(t.name, ' ') FROM "
+     'game_developer l JOIN developer t ON t.developer_id = '
+     'l.developer_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.name, ' ') FROM game_publisher l JOIN "
+     'publisher t ON t.publisher_id = l.publisher_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.genre_type, ' "
+     "') FROM game_genre l JOIN genre t ON t.genre_id = l.genre_id "
+     'WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.model_type, ' ') FROM game_model l JOIN model "
+     't ON t.model_id = l.model_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.platform_name, ' ') FROM game_platform"
+     ' l JOIN platform t ON t.platform_id = l.platform_id WHERE '
+     'l.game_id = g.game_id) FROM game g WHERE g.game_id IN (SELECT'
+     ' game_id FROM game_publisher WHERE publisher_id = '
+     'new.publisher_id); END'),
+    ('game_genre_search_insert',
+     'AFTER INSERT ON game_genre BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (new.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (new.game_id); END'),
+    ('game_genre_search_delete',
+     'AFTER DELETE ON game_genre BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (old.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (old.game_id); END'),
+    ('genre_search_update',
+     'AFTER UPDATE OF genre_type ON genre BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (SELECT game_id FROM game_genre '
+     'WHERE genre_id = new.genre_id); INSERT INTO game_search '
+     '(rowid, title, description, developer, publisher, genre, '
+     'model, platform) SELECT g.game_id, g.title, g.description, '
+     "(SELECT group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (SELECT game_id FROM game_genre WHERE genre_id ='
+     ' new.genre_id); END'),
+    ('game_model_search_insert',
+     'AFTER INSERT ON game_model BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (new.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (new.game_id); END'),
+    ('game_model_search_delete',
+     'AFTER DELETE ON game_model BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (old.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (old.game_id); END'),
+    ('model_search_update',
+     'AFTER UPDATE OF model_type ON model BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (SELECT game_id FROM game_model '
+     'WHERE model_id = new.model_id); INSERT INTO game_search '
+     '(rowid, title, description, developer, publisher, genre, '
+     'model, platform) SELECT g.game_id, g.title, g.description, '
+     "(SELECT group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (SELECT game_id FROM game_model WHERE model_id ='
+     ' new.model_id); END'),
+    ('game_platform_search_insert',
+     'AFTER INSERT ON game_platform BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (new.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (new.game_id); END'),
+    ('game_platform_search_delete',
+     'AFTER DELETE ON game_platform BEGIN DELETE FROM game_search '
+     'WHERE rowid IN (old.game_id); INSERT INTO game_search (rowid,'
+     ' title, description, developer, publisher, genre, model, '
+     'platform) SELECT g.game_id, g.title, g.description, (SELECT '
+     "group_concat(t.name, ' ') FROM game_developer l JOIN "
+     'developer t ON t.developer_id = l.developer_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.name, ' ') "
+     'FROM game_publisher l JOIN publisher t ON t.publisher_id = '
+     'l.publisher_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.genre_type, ' ') FROM game_genre l JOIN genre "
+     't ON t.genre_id = l.genre_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.model_type, ' ') FROM game_model l "
+     'JOIN model t ON t.model_id = l.model_id WHERE l.game_id = '
+     "g.game_id), (SELECT group_concat(t.platform_name, ' ') FROM "
+     'game_platform l JOIN platform t ON t.platform_id = '
+     'l.platform_id WHERE l.game_id = g.game_id) FROM game g WHERE '
+     'g.game_id IN (old.game_id); END'),
+    ('platform_search_update',
+     'AFTER UPDATE OF platform_name ON platform BEGIN DELETE FROM '
+     'game_search WHERE rowid IN (SELECT game_id FROM game_platform'
+     ' WHERE platform_id = new.platform_id); INSERT INTO '
+     'game_search (rowid, title, description, developer, publisher,'
+     ' genre, model, platform) SELECT g.game_id, g.title, '
+     "g.description, (SELECT group_concat(t.name, ' ') FROM "
+     'game_developer l JOIN developer t ON t.developer_id = '
+     'l.developer_id WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.name, ' ') FROM game_publisher l JOIN "
+     'publisher t ON t.publisher_id = l.publisher_id WHERE '
+     "l.game_id = g.game_id), (SELECT group_concat(t.genre_type, ' "
+     "') FROM game_genre l JOIN genre t ON t.genre_id = l.genre_id "
+     'WHERE l.game_id = g.game_id), (SELECT '
+     "group_concat(t.model_type, ' ') FROM game_model l JOIN model "
+     't ON t.model_id = l.model_id WHERE l.game_id = g.game_id), '
+     "(SELECT group_concat(t.platform_name, ' ') FROM game_platform"
+     ' l JOIN platform t ON t.platform_id = l.platform_id WHERE '
+     'l.game_id = g.game_id) FROM game g WHERE g.game_id IN (SELECT'
+     ' game_id FROM game_platform WHERE platform_id = '
+     'new.platform_id); END'),
+]
+
+INDEX_GAMES = (
+    'INSERT INTO game_search (rowid, title, description, developer,'
+    ' publisher, genre, model, platform) SELECT g.game_id, g.title,'
+    " g.description, (SELECT group_concat(t.name, ' ') FROM "
+    'game_developer l JOIN developer t ON t.developer_id = '
+    'l.developer_id WHERE l.game_id = g.game_id), (SELECT '
+    "group_concat(t.name, ' ') FROM game_publisher l JOIN publisher"
+    ' t ON t.publisher_id = l.publisher_id WHERE l.game_id = '
+    "g.game_id), (SELECT group_concat(t.genre_type, ' ') FROM "
+    'game_genre l JOIN genre t ON t.genre_id = l.genre_id WHERE '
+    "l.game_id = g.game_id), (SELECT group_concat(t.model_type, ' "
+    "') FROM game_model l JOIN model t ON t.model_id = l.model_id "
+    'WHERE l.game_id = g.game_id), (SELECT '
+    "group_concat(t.platform_name, ' ') FROM game_platform l JOIN "
+    'platform t ON t.platform_id = l.platform_id WHERE l.game_id = '
+    'g.game_id) FROM game g WHERE 1;')
+
+
+def upgrade():
+    op.execute(CREATE_INDEX)
+    for name, body in TRIGGERS:
+        op.execute("DROP TRIGGER IF EXISTS %s" % name)
+        op.execute("CREATE TRIGGER %s %s" % (name, body))
+    op.execute("DELETE FROM game_search")
+    op.execute(INDEX_GAMES)
+
+
+def downgrade():
+    for name, body in TRIGGERS:
+        op.execute("DROP TRIGGER IF EXISTS %s" % name)
+    op.execute("DROP TABLE IF EXISTS game_search")
@@ -0,0 +1,191 @@
+"""Add version counters of the catalogue and list tables
+
+Revision ID: 5d1e7b3c9a20
+Revises: 37152bf062d4
+Create Date: 2026-10-18 09:41:07.518230
+
+"""
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e7b3c9a20'
+down_revision = '37152bf062d4'
+branch_labels = None
+depends_on = None
+
+# The table and triggers as app.versions created them at this revision
+TRACKED_TABLES = ['game', 'developer', 'publisher', 'genre', 'model',
+                  'platform', 'game_developer', 'game_publisher',
+                  'game_genre', 'game_model', 'game_platform', 'user_game']
+
+CREATE_TABLE = (
+    'CREATE TABLE IF NOT EXISTS table_version (name VARCHAR PRIMARY'
+    ' KEY, version INTEGER NOT NULL DEFAULT 0, updated_at INTEGER '
+    'NOT NULL DEFAULT 0)')
+
+TRIGGERS = [
+    ('game_version_insert',
+     'AFTER INSERT ON game BEGIN UPDATE table_version SET version ='
+     " version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'game'; END"),
+    ('game_version_update',
+     'AFTER UPDATE ON game BEGIN UPDATE table_version SET version ='
+     " version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'game'; END"),
+    ('game_version_delete',
+     'AFTER DELETE ON game BEGIN UPDATE table_version SET version ='
+     " version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'game'; END"),
+    ('developer_version_insert',
+     'AFTER INSERT ON developer BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'developer'; END"),
+    ('developer_version_update',
+     'AFTER UPDATE ON developer BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'developer'; END"),
+    ('developer_version_delete',
+     'AFTER DELETE ON developer BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'developer'; END"),
+    ('publisher_version_insert',
+     'AFTER INSERT ON publisher BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'publisher'; END"),
+    ('publisher_version_update',
+     'AFTER UPDATE ON publisher BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'publisher'; END"),
+    ('publisher_version_delete',
+     'AFTER DELETE ON publisher BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'publisher'; END"),
+    ('genre_version_insert',
+     'AFTER INSERT ON genre BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'genre'; END"),
+    ('genre_version_update',
+     'AFTER UPDATE ON genre BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'genre'; END"),
+    ('genre_version_delete',
+     'AFTER DELETE ON genre BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'genre'; END"),
+    ('model_version_insert',
+     'AFTER INSERT ON model BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'model'; END"),
+    ('model_version_update',
+     'AFTER UPDATE ON model BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'model'; END"),
+    ('model_version_delete',
+     'AFTER DELETE ON model BEGIN UPDATE table_version SET version '
+     "= version + 1, updated_at = CAST(strftime('%s', 'now') AS "
+     "INTEGER) WHERE name = 'model'; END"),
+    ('platform_version_insert',
+     'AFTER INSERT ON platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'platform'; END"),
+    ('platform_version_update',
+     'AFTER UPDATE ON platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'platform'; END"),
+    ('platform_version_delete',
+     'AFTER DELETE ON platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'platform'; END"),
+    ('game_developer_version_insert',
+     'AFTER INSERT ON game_developer BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_developer'; END"),
+    ('game_developer_version_update',
+     'AFTER UPDATE ON game_developer BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_developer'; END"),
+    ('game_developer_version_delete',
+     'AFTER DELETE ON game_developer BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_developer'; END"),
+    ('game_publisher_version_insert',
+     'AFTER INSERT ON game_publisher BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_publisher'; END"),
+    ('game_publisher_version_update',
+     'AFTER UPDATE ON game_publisher BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_publisher'; END"),
+    ('game_publisher_version_delete',
+     'AFTER DELETE ON game_publisher BEGIN UPDATE table_version SET'
+     " version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_publisher'; END"),
+    ('game_genre_version_insert',
+     'AFTER INSERT ON game_genre BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_genre'; END"),
+    ('game_genre_version_update',
+     'AFTER UPDATE ON game_genre BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_genre'; END"),
+    ('game_genre_version_delete',
+     'AFTER DELETE ON game_genre BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_genre'; END"),
+    ('game_model_version_insert',
+     'AFTER INSERT ON game_model BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_model'; END"),
+    ('game_model_version_update',
+     'AFTER UPDATE ON game_model BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_model'; END"),
+    ('game_model_version_delete',
+     'AFTER DELETE ON game_model BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_model'; END"),
+    ('game_platform_version_insert',
+     'AFTER INSERT ON game_platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_platform'; END"),
+    ('game_platform_version_update',
+     'AFTER UPDATE ON game_platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_platform'; END"),
+    ('game_platform_version_delete',
+     'AFTER DELETE ON game_platform BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'game_platform'; END"),
+    ('user_game_version_insert',
+     'AFTER INSERT ON user_game BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'user_game'; END"),
+    ('user_game_version_update',
+     'AFTER UPDATE ON user_game BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'user_game'; END"),
+    ('user_game_version_delete',
+     'AFTER DELETE ON user_game BEGIN UPDATE table_version SET '
+     "version = version + 1, updated_at = CAST(strftime('%s', "
+     "'now') AS INTEGER) WHERE name = 'user_game'; END"),
+]
+
+
+def upgrade():
+    op.execute(CREATE_TABLE)
+    for table in TRACKED_TABLES:
+        op.execute(text(
+            "INSERT OR IGNORE INTO table_version (name, updated_at) "
+            "VALUES (:name, CAST(strftime('%s', 'now') AS INTEGER))")
+            .bindparams(name=table))
+    for name, body in TRIGGERS:
+        op.execute("DROP TRIGGER IF EXISTS %s" % name)
+        op.execute("CREATE TRIGGER %s %s" % (name, body))
+
+
+def downgrade():
+    for name, body in TRIGGERS:
+        op.execute("DROP TRIGGER IF EXISTS %s" % name)
+    op.execute("DROP TABLE IF EXISTS table_version")
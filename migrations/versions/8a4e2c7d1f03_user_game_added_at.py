@@ -0,0 +1,38 @@
+"""Record when a game was added to a user's list
+
+Revision ID: 8a4e2c7d1f03
+Revises: 3f6c1d2a9b47
+Create Date: 2026-10-17 11:03:12.870145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e2c7d1f03'
+down_revision = '3f6c1d2a9b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot add a column defaulting to the current time in place,
+    # so the table is copied. Existing rows get the current time in the
+    # format SQLAlchemy stores, so they compare correctly with new rows.
+    with op.batch_alter_table('user_game', schema=None,
+                              recreate='always') as batch_op:
+        batch_op.add_column(sa.Column('added_at', sa.DateTime(),
+                                      nullable=False,
+                                      server_default=sa.text(
+                                          "(strftime('%Y-%m-%d %H:%M:%S"
+                                          ".000000', 'now'))")))
+        batch_op.create_index('ix_user_game_added',
+                              ['user_id', 'added_at', 'game_id'],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_game', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_game_added')
+        batch_op.drop_column('added_at')
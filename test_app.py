@@ -1,10 +1,28 @@
+import gzip
+import io
+import json
 import os
+import os.path as op
+import re
+import shutil
+import tempfile
 import unittest
 from datetime import date
 
-from app import app, db
+from app import app, db, views
+from app.assets import AssetManifest, manifest, purge_css, \
+    build_bundles, check_bundles
+from app.cache import response_cache
+from app.facets import facet_index
+from app.images import Image
+from app.instrumentation import instrumentation
+from app.ratelimit import rate_limiter, SQLiteBucketStore
 from app.models import *
-from werkzeug.security import check_password_hash
+from flask import url_for, request_started, request_finished
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import check_password_hash, generate_password_hash
 
 TEST_DB = 'test.db'
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -19,6 +37,7 @@ class Test(unittest.TestCase):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
         app.config['DEBUG'] = False
+        app.config['RATELIMIT_ENABLED'] = False
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + \
                                                 os.path.join(basedir,
                                                              TEST_DB)
@@ -68,14 +87,32 @@ class Test(unittest.TestCase):
         Test included:
             Test if index route is functional
             Test if redirect to feed if user is logged in
+            Test if the games of the three years are loaded in one query
+            Test if no games are queried before the redirect
         """
         # Test if route is functional
         response = self.app.get('/', follow_redirects=True)
         self.assertEqual(response.status_code, 200,
                          "Route is not functional")
+        # Test the games of each year are shown with one query
+        year = date.today().year
+        for i in range(3):
+            db.session.add(Game(title="game" + str(i),
+                                release_date=date(year - i, 1, 1)))
+        db.session.commit()
+        response_cache.clear()
+        response, queries = self.count_queries(self.app.get, '/')
+        for i in range(3):
+            self.assertIn(b'>game%d</a>' % i, response.data,
+                          "Game not shown")
+        self.assertEqual(queries, 1, "Games not loaded in one query")
         # Test redirect if user is logged in
         self.register("adamadam@adammail.com", "adamadam", "eSM&A@6}", "eSM&A@6}")
         response = self.login("adamadam", "eSM&A@6}")
+        self.count_queries(self.app.get, '/')
+        self.assertFalse(any('FROM game' in statement
+                             for statement in self.statements),
+                         "Games queried before the redirect")
         response = self.app.get('/', follow_redirects=True)
         self.assertIn(b'<title>Feed</title>', response.data,
                       "Redirect failed")
@@ -90,6 +127,7 @@ class Test(unittest.TestCase):
             Test if details of user are stored properly in the database
             Test if error messages are displayed accordingly
             Test if user already exist
+            Test if a concurrent sign up with the same details is refused
         """
         # ~~~~~~~~~~~~~~~~ Test if route '/signup' is functional ~~~~~~~~~~~~~~~~
         response = self.app.get('/signup', follow_redirects=True)
@@ -154,6 +192,30 @@ class Test(unittest.TestCase):
                                  'eSM&A@6}', 'eSM&A@6}')
         self.assertIn(b'Username has already been taken.',
                       response.data, "Flash message failed")
+        # Test the user is looked up with one query
+        response, queries = self.count_queries(
+            self.register, 'user1@mail.com', 'newuser2', 'eSM&A@6}',
+            'eSM&A@6}')
+        self.assertEqual(len([statement for statement in self.statements
+                              if 'FROM user' in statement]), 1,
+                         "Email and username not checked in one query")
+        # Test a user registered meanwhile by another request is caught
+        # by the unique constraints
+        lookup = views._signup_error
+        calls = []
+
+        def late_lookup(email, username):
+            calls.append(email)
+            return lookup(email, username) if len(calls) > 1 else None
+        views._signup_error = late_lookup
+        try:
+            response = self.register('newuser3@mail.com', 'username1',
+                                     'eSM&A@6}', 'eSM&A@6}')
+        finally:
+            views._signup_error = lookup
+        self.assertIn(b'Username has already been taken.',
+                      response.data, "Integrity error not handled")
+        self.assertEqual(User.query.count(), 2, "Duplicate user added")
 
     def test_login(self):
         """
@@ -165,6 +227,7 @@ class Test(unittest.TestCase):
             Test if user is redirected to their feed.
             Test if for incorrect login details.
             Test if error messages are displayed.
+            Test if a legacy password hash is upgraded on login.
         """
         # ~~~~~~~~~~~~~~~~ Test if route '/login' is functional ~~~~~~~~~~~~~~~~ 
         response = self.app.get('/login', follow_redirects=True)
@@ -194,6 +257,84 @@ class Test(unittest.TestCase):
         self.assertIn(b'Username or password incorrect.', response.data,
                       "Flash message failed")
 
+        # ~~~~~~~~~~~~~~~~ Test for legacy password hash ~~~~~~~~~~~~~~~~
+        user = User.query.filter_by(username="asdfasdf").first()
+        user.password = generate_password_hash("eSM&A@6}", method='sha256')
+        db.session.commit()
+        # A wrong password leaves the hash alone
+        self.login("asdfasdf", "asdfasdf")
+        user = User.query.filter_by(username="asdfasdf").first()
+        self.assertTrue(user.password.startswith('sha256$'),
+                        "Hash changed by a failed login")
+        self.app.get('/logout')
+        response = self.login("asdfasdf", "eSM&A@6}")
+        self.assertIn(b'Feed', response.data, "Legacy user cannot login")
+        user = User.query.filter_by(username="asdfasdf").first()
+        self.assertTrue(user.password.startswith(
+            '%s:%d$' % (app.config['PASSWORD_METHOD'],
+                        app.config['PASSWORD_ITERATIONS'])),
+            "Legacy hash not upgraded")
+        self.assertTrue(check_password_hash(user.password, "eSM&A@6}"),
+                        "Upgraded hash does not match")
+
+    def test_rate_limit(self):
+        """
+        Test the rate limiter of the account routes.
+
+        Test included:
+            Test if too many logins for a username are refused.
+            Test if refused requests do not query the database.
+            Test if other usernames and GET requests are not limited.
+            Test if the counters are shown to admin users.
+            Test if the SQLite store shares its buckets.
+        """
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        app.config['RATELIMIT_ENABLED'] = True
+        app.config['RATELIMIT_USER'] = (2, 1)
+        rate_limiter.reset()
+        try:
+            for i in range(2):
+                response = self.login("asdfasdf", "wrong")
+                self.assertEqual(response.status_code, 200,
+                                 "Login limited too early")
+            response, queries = self.count_queries(
+                self.login, "ASDFASDF", "eSM&A@6}")
+            self.assertEqual(response.status_code, 429, "Login not limited")
+            self.assertIn('Retry-After', response.headers,
+                          "Retry-After missing")
+            self.assertEqual(queries, 0, "Limited login queried database")
+            response = self.app.get('/login')
+            self.assertEqual(response.status_code, 200, "GET limited")
+            response = self.register("zxcv@mail.com", "zxcvzxcv",
+                                     "eSM&A@6}", "eSM&A@6}")
+            self.assertEqual(response.status_code, 200, "Sign up limited")
+
+            # Test the counters
+            user = User.query.get(1)
+            user.admin = True
+            db.session.commit()
+            rate_limiter.reset()
+            self.login("asdfasdf", "eSM&A@6}")
+            stats = self.app.get('/ratelimit').get_json()
+            self.assertEqual(stats['login.allowed'], 1, "Not counted")
+            self.assertGreater(stats['buckets'], 0, "Buckets not counted")
+        finally:
+            app.config['RATELIMIT_ENABLED'] = False
+            app.config['RATELIMIT_USER'] = (10, 2)
+            rate_limiter.reset()
+
+        # Test the shared store
+        path = tempfile.mktemp(suffix='.db')
+        try:
+            first = SQLiteBucketStore(path)
+            second = SQLiteBucketStore(path)
+            self.assertEqual(first.take('key', 2, 1 / 60.0), 0, "Refused")
+            self.assertEqual(second.take('key', 2, 1 / 60.0), 0, "Refused")
+            self.assertGreater(first.take('key', 2, 1 / 60.0), 0,
+                               "Buckets not shared")
+        finally:
+            os.remove(path)
+
     def test_feed(self):
         """
         Test the feed page.
@@ -237,6 +378,26 @@ class Test(unittest.TestCase):
         self.assertIn(b'game4', response.data,
                       "Game is not available on feed")
 
+        # Check the feed is paged, most recently added first
+        app.config['FEED_PAGE_SIZE'] = 2
+        try:
+            response = self.app.get('/feed')
+            self.assertIn(b'my-game_5', response.data, "Wrong first page")
+            self.assertNotIn(b'my-game_3', response.data,
+                             "Page not limited")
+            page = self.app.get('/feed/games').json
+            titles = [game['title'] for game in page['games']]
+            while page['next_cursor'] is not None:
+                page = self.app.get('/feed/games', query_string={
+                    'cursor': page['next_cursor']}).json
+                titles += [game['title'] for game in page['games']]
+        finally:
+            app.config['FEED_PAGE_SIZE'] = 20
+        self.assertEqual(titles, ["game4", "game3", "game2", "game1",
+                                  "game0"], "Wrong feed pages")
+        response = self.app.get('/feed/games?cursor=bad')
+        self.assertEqual(response.status_code, 400, "Bad cursor accepted")
+
     def test_search(self):
         """
         Test the search route and functionality.
@@ -266,14 +427,85 @@ class Test(unittest.TestCase):
         self.assertNotIn(b'game1', response.data, "Wrong game in page")
         self.assertNotIn(b'game2', response.data, "Wrong game in page")
 
+        # Test if games are found by their developer
+        game = Game.query.get(2)
+        game.developer.append(Developer(name="Nintendo"))
+        db.session.commit()
+        response = self.app.post('/search', data=dict(search="ninten"),
+                                 follow_redirects=True)
+        self.assertIn(b'game1', response.data, "Developer not searched")
+        self.assertIn(b'Developer: Nintendo', response.data,
+                      "Developer not shown")
+        self.assertNotIn(b'game0', response.data, "Wrong game in page")
+        # Test if renamed and deleted games are updated in the index
+        Developer.query.get(1).name = "Sega"
+        db.session.commit()
+        response = self.app.post('/search', data=dict(search="Nintendo"),
+                                 follow_redirects=True)
+        self.assertNotIn(b'game1', response.data, "Index not updated")
+        db.session.delete(Game.query.get(1))
+        db.session.commit()
+        response = self.app.post('/search', data=dict(search="game0"),
+                                 follow_redirects=True)
+        self.assertNotIn(b'>game0</a>', response.data, "Index not updated")
+
+        # Test if results are paged
+        for i in range(12):
+            db.session.add(Game(title="page" + str(i),
+                                release_date=date(2020, 1, 1)))
+        db.session.commit()
+        response = self.app.post('/search', data=dict(search="page"),
+                                 follow_redirects=True)
+        self.assertEqual(response.data.count(b'card-title'), 10,
+                         "First page not full")
+        self.assertIn(b'Next', response.data, "No next page")
+        response = self.app.get('/search?search=page&page=2',
+                                follow_redirects=True)
+        self.assertEqual(response.data.count(b'card-title'), 2,
+                         "Second page wrong")
+
+    def count_queries(self, method, *args, **kwargs):
+        """
+        Counts the SQL statements executed while calling a method.
+        :param method: The method to call
+        :return: The result of the method and the number of statements
+        """
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, many):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.statements = statements
+        return result, len(statements)
+
     def test_game_page(self):
+        """
+        Test the game page.
+
+        Test included:
+            Test if each game has its own page.
+            Test if the relationships are loaded eagerly.
+        """
         # Create games
         for i in range(5):
             game = Game(title="game" + str(i),
                         release_date=date(2020, 1, i + 1))
             db.session.add(game)
             db.session.commit()
-        
+        game = Game.query.get(1)
+        game.developer.append(Developer(name="developer0"))
+        game.publisher.append(Publisher(name="publisher0"))
+        game.genre.append(Genre(genre_type="genre0"))
+        game.model.append(Model(model_type="model0"))
+        game.platform.append(Platform(platform_name="platform0"))
+        db.session.commit()
+        db.session.remove()
+
         response = self.app.get('/game/1', follow_redirects=True)
         self.assertIn(b'<h1>game0</h1>', response.data, "Game page failed")
         response = self.app.get('/game/2', follow_redirects=True)
@@ -281,6 +513,246 @@ class Test(unittest.TestCase):
         response = self.app.get('/game/3', follow_redirects=True)
         self.assertIn(b'<h1>game2</h1>', response.data, "Game page failed")
 
+        # Count the queries of an uncached page
+        response_cache.clear()
+        response, queries = self.count_queries(self.app.get, '/game/1')
+        self.assertIn(b'platform0', response.data, "Game page failed")
+        self.assertEqual(queries, 5, "Game page relationships lazy loaded")
+        self.assertEqual(len([statement for statement in self.statements
+                              if ' IN (' in statement]), 4,
+                         "Game page collections not loaded with IN")
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_thumbnails(self):
+        """
+        Test the thumbnails of the game images.
+
+        Test included:
+            Test if the pages use the thumbnails.
+            Test if the thumbnails are made at the right size and format.
+            Test if the thumbnails are cached on the disk.
+            Test if invalid thumbnails are not found.
+        """
+        thumbnail_path = app.config['THUMBNAIL_PATH']
+        app.config['THUMBNAIL_PATH'] = tempfile.mkdtemp()
+        try:
+            db.session.add(Game(title="game", release_date=date(2020, 1, 1),
+                                image_url="placeholder.jpg"))
+            db.session.commit()
+            response = self.app.get('/game/1')
+            self.assertIn(b'/thumbnails/large/placeholder.jpg.webp 640w',
+                          response.data, "Thumbnails not used")
+
+            response = self.app.get('/thumbnails/small/placeholder.jpg.webp')
+            self.assertEqual(response.mimetype, 'image/webp',
+                             "Wrong format")
+            image = Image.open(io.BytesIO(response.data))
+            self.assertEqual(image.size, (320, 200), "Wrong size")
+            response.close()
+            self.assertTrue(op.isfile(op.join(app.config['THUMBNAIL_PATH'],
+                                              'small',
+                                              'placeholder.jpg.webp')),
+                            "Thumbnail not cached")
+            response = self.app.get('/thumbnails/large/placeholder.jpg')
+            self.assertEqual(response.mimetype, 'image/jpeg',
+                             "Wrong format")
+            response.close()
+
+            for url in ['/thumbnails/huge/placeholder.jpg',
+                        '/thumbnails/small/missing.jpg',
+                        '/thumbnails/small/../../../config.py']:
+                self.assertEqual(self.app.get(url).status_code, 404,
+                                 "Invalid thumbnail found")
+        finally:
+            shutil.rmtree(app.config['THUMBNAIL_PATH'])
+            app.config['THUMBNAIL_PATH'] = thumbnail_path
+
+    def test_assets(self):
+        """
+        Test the fingerprinted static files.
+
+        Test included:
+            Test if the static URLs point to the fingerprinted copies.
+            Test if the copies are cached for good and sent compressed.
+            Test if files missing from the manifest are still served.
+            Test if a forgotten file is forgotten by every worker.
+        """
+        try:
+            manifest.build()
+            with app.test_request_context():
+                url = url_for('static', filename='ajax_js.js')
+            self.assertRegex(url, r'^/static/dist/ajax_js\.[0-9a-f]{12}\.js$',
+                             "URL not fingerprinted")
+            with open(op.join(app.static_folder, 'ajax_js.js'), 'rb') as file:
+                original = file.read()
+
+            response = self.app.get(url, headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip',
+                             "Not compressed")
+            self.assertIn('immutable', response.headers['Cache-Control'],
+                          "Not cached for good")
+            self.assertEqual(gzip.decompress(response.data), original,
+                             "Wrong content")
+            response.close()
+            response = self.app.get(url)
+            self.assertNotIn('Content-Encoding', response.headers,
+                             "Compressed without Accept-Encoding")
+            self.assertEqual(response.data, original, "Wrong content")
+            response.close()
+
+            db.session.add(Game(title="game", release_date=date(2020, 1, 1),
+                                image_url="placeholder.jpg"))
+            db.session.commit()
+            self.assertEqual(Game.query.get(1).image_url_to_string(),
+                             '/static/' + manifest.get(
+                                 'game image/placeholder.jpg'),
+                             "Image not fingerprinted")
+            other_worker = AssetManifest(app.static_folder)
+            manifest.forget('game image/placeholder.jpg')
+            self.assertEqual(Game.query.get(1).image_url_to_string(),
+                             '/static/game image/placeholder.jpg',
+                             "Forgotten image fingerprinted")
+            other_worker.refresh()
+            self.assertEqual(other_worker.get('game image/placeholder.jpg'),
+                             'game image/placeholder.jpg',
+                             "Image forgotten in one worker only")
+            response = self.app.get('/static/game image/placeholder.jpg')
+            self.assertEqual(response.status_code, 200, "File not served")
+            response.close()
+        finally:
+            shutil.rmtree(manifest.folder, ignore_errors=True)
+            manifest.load()
+
+    def test_bundles(self):
+        """
+        Test the local bundles of scripts and stylesheets.
+
+        Test included:
+            Test if unused Bootstrap rules are purged.
+            Test if the scripts are joined in order.
+            Test if the pages load their scripts deferred.
+            Test if the app warns when the pages load the CDN files.
+        """
+        css = '@charset "UTF-8";/*! Bootstrap */:root{--a:1}.btn{a:b}' \
+              '.unused{c:d}.btn.active,.other{e:f}' \
+              '@media (min-width:1px){.unused{g:h}.btn{i:j}}' \
+              '@keyframes k{0%{o:0}}'
+        self.assertEqual(purge_css(css, {'btn', 'active'}),
+                         '/*! Bootstrap */\n:root{--a:1}.btn{a:b}'
+                         '.btn.active,.other{e:f}'
+                         '@media (min-width:1px){.btn{i:j}}'
+                         '@keyframes k{0%{o:0}}', "Wrong rules purged")
+
+        static_folder = tempfile.mkdtemp()
+        try:
+            for name in ['jquery.min.js', 'cookie_consent.js', 'ajax_js.js']:
+                shutil.copy(op.join(app.static_folder, name), static_folder)
+            os.mkdir(op.join(static_folder, 'vendor'))
+            for name, text in [('bootstrap.min.css', css),
+                               ('bootstrap.bundle.min.js', '// bootstrap'),
+                               ('cookieconsent.min.css', '.cc-window{}'),
+                               ('cookieconsent.min.js', '// cookieconsent')]:
+                with open(op.join(static_folder, 'vendor', name), 'w') as file:
+                    file.write(text)
+            build_bundles(static_folder, app.root_path)
+            with open(op.join(static_folder, 'bundle.js')) as file:
+                script = file.read()
+            self.assertTrue(script.startswith('/*! jQuery'), "jQuery not first")
+            self.assertLess(script.index('// cookieconsent'),
+                            script.index('cookieconsent.initialise'),
+                            "Wrong order")
+            self.assertIn('/batch', script, "Handlers missing")
+            with open(op.join(static_folder, 'bundle.css')) as file:
+                stylesheet = file.read()
+            self.assertIn('.btn{a:b}', stylesheet, "Used rule purged")
+            self.assertNotIn('.unused', stylesheet, "Unused rule kept")
+            self.assertIn('.cc-window{}', stylesheet, "Stylesheet missing")
+        finally:
+            shutil.rmtree(static_folder)
+
+        with self.assertLogs(app.logger, 'WARNING'):
+            self.assertFalse(check_bundles(), "Missing bundles not found")
+
+        response = self.app.get('/login')
+        self.assertNotIn(b'ajax.googleapis.com', response.data,
+                         "jQuery loaded from a CDN")
+        for script in re.findall(rb'<script[^>]*>', response.data):
+            self.assertIn(b'defer', script, "Script blocks rendering")
+
+    def test_response_cache(self):
+        """
+        Test the cache of anonymous pages.
+
+        Test included:
+            Test if anonymous pages are served from the cache.
+            Test if the cache is cleared when a game changes.
+            Test if pages of logged in users are not cached.
+        """
+        db.session.add(Game(title="game0", release_date=date(2020, 1, 1)))
+        db.session.commit()
+        self.app.get('/game/1')
+        response, queries = self.count_queries(self.app.get, '/game/1')
+        self.assertIn(b'<h1>game0</h1>', response.data, "Cache failed")
+        self.assertEqual(queries, 0, "Page not cached")
+
+        # Changing the game or its relationships clears the cache
+        game = Game.query.get(1)
+        game.title = "renamed"
+        db.session.commit()
+        response = self.app.get('/game/1')
+        self.assertIn(b'<h1>renamed</h1>', response.data, "Cache not cleared")
+        game = Game.query.get(1)
+        game.genre.append(Genre(genre_type="genre0"))
+        db.session.commit()
+        response = self.app.get('/game/1')
+        self.assertIn(b'genre0', response.data, "Cache not cleared")
+
+        # Logged in users are not served the anonymous page
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.login("asdfasdf", "eSM&A@6}")
+        response = self.app.get('/game/1')
+        self.assertIn(b'Add to', response.data, "Anonymous page served")
+
+    def test_sample_games(self):
+        """
+        Test the random game sampler.
+
+        Test included:
+            Test if only games from the sampled year are returned.
+            Test if no more than the requested number is returned.
+            Test if committed inserts, updates and deletes are sampled.
+        """
+        from app.sampling import sample_games
+        # Create games
+        for i in range(6):
+            game = Game(title="game" + str(i),
+                        release_date=date(2018 + i % 2, 1, i + 1))
+            db.session.add(game)
+        db.session.commit()
+        db.session.expunge_all()
+
+        games = sample_games(2018, 10)
+        self.assertEqual(sorted(game.title for game in games),
+                         ["game0", "game2", "game4"], "Wrong year sampled")
+        self.assertEqual(len(db.session.identity_map), 0,
+                         "Sampled games loaded as ORM instances")
+        self.assertEqual(len(sample_games(None, 4)), 4,
+                         "Wrong number of games sampled")
+        self.assertEqual(len(sample_games([2018, 2019], 10)), 6,
+                         "Wrong number of games sampled")
+
+        # Move, delete and add games
+        game = Game.query.get(1)
+        game.release_date = date(2019, 1, 1)
+        db.session.delete(Game.query.get(3))
+        db.session.add(Game(title="game6", release_date=date(2018, 1, 1)))
+        db.session.commit()
+        games = sample_games(2018, 10)
+        self.assertEqual(sorted(game.title for game in games),
+                         ["game4", "game6"], "Changes not sampled")
+        self.assertEqual(len(sample_games(2019, 10)), 4,
+                         "Changes not sampled")
+
     def test_add(self):
         """
         Test the adding to list functionality.
@@ -314,6 +786,18 @@ class Test(unittest.TestCase):
                       "Game not added to list")
         self.assertIn(user.games[1].title, "game1",
                       "Game not added to list")
+        # Adding an owned game again does not duplicate it
+        self.app.post('/add', json={"response": "game_1"})
+        self.assertEqual(db.session.query(user_game).count(), 2,
+                         "Game added twice")
+        # Adding a missing game fails
+        response = self.app.post('/add', json={"response": "game_99"})
+        self.assertEqual(response.status_code, 404, "Missing game added")
+        # Check the owned games are marked on the game page
+        response = self.app.get('/game/1')
+        self.assertIn(b'Added to', response.data, "Owned game not marked")
+        response = self.app.get('/game/3')
+        self.assertIn(b'Add to', response.data, "Game marked as owned")
 
     def test_remove(self):
         """
@@ -354,6 +838,535 @@ class Test(unittest.TestCase):
         user = User.query.filter_by(user_id=int(1)).first()
         self.assertNotIn(user.games, ["game1"], "Game is not removed")
 
+    def test_batch(self):
+        """
+        Test adding and removing many games at once.
+
+        Test included:
+            Test if games are added and removed in one request.
+            Test if the result of each game is returned.
+            Test if invalid requests are rejected.
+            Test if a game cannot be in a list twice.
+        """
+        # Create user
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        # Create games
+        for i in range(5):
+            db.session.add(Game(title="game" + str(i),
+                                release_date=date(2020, 1, i + 1)))
+        db.session.commit()
+        self.login("asdfasdf", "eSM&A@6}")
+        self.app.post('/add', json={"response": "game_1"})
+
+        response = self.app.post('/batch', json={"add": [2, 3, 99, 4],
+                                                 "remove": [1, 4, 5]})
+        results = {result['game_id']: result['status']
+                   for result in response.json['results']}
+        self.assertEqual(results, {1: 'removed', 2: 'added', 3: 'added',
+                                   4: 'conflict', 5: 'unchanged',
+                                   99: 'not found'}, "Wrong results")
+        user = User.query.get(1)
+        self.assertEqual(sorted(game.game_id for game in user.games),
+                         [2, 3], "Games not changed")
+
+        response = self.app.post('/batch', json={"add": ["x"]})
+        self.assertEqual(response.status_code, 400, "Bad id accepted")
+        response = self.app.post('/batch', json=[1])
+        self.assertEqual(response.status_code, 400, "List body accepted")
+        response = self.app.post('/batch', json={"add": "12"})
+        self.assertEqual(response.status_code, 400, "String ids accepted")
+        self.assertEqual(sorted(game.game_id for game in user.games),
+                         [2, 3], "Games changed by a bad request")
+        response = self.app.post('/batch', json={"add": list(range(1001))})
+        self.assertEqual(response.status_code, 413, "Batch not limited")
+
+        with self.assertRaises(IntegrityError, msg="Duplicate game added"):
+            db.session.execute(user_game.insert(), {'user_id': 1,
+                                                    'game_id': 2})
+        db.session.rollback()
+
+    def test_import_games(self):
+        """
+        Test the bulk import of games.
+
+        Test included:
+            Test if games are imported from CSV and JSON lines files.
+            Test if taxonomy names are stored once and reused.
+            Test if imported games are searchable.
+            Test if an invalid line stops the import with its number.
+            Test if the index stays searchable during an import.
+        """
+        from app.importer import import_games
+        from app.search import search_games
+        db.session.add(Genre(genre_type="Action"))
+        db.session.commit()
+        folder = tempfile.mkdtemp()
+        try:
+            path = op.join(folder, 'games.csv')
+            with open(path, 'w', newline='') as file:
+                file.write('title,release_date,description,genre,platform\n'
+                           'Alpha,2020-01-01,First,Action;RPG,PC\n'
+                           'Beta,2020-02-01,,RPG,PC;PC\n'
+                           'Gamma,2019-03-01,Third,,\n')
+            result = app.test_cli_runner().invoke(
+                args=['import-games', path, '--chunk-size', '2'])
+            self.assertIn('Imported 3 games in total', result.output,
+                          "CSV not imported")
+            self.assertEqual(Game.query.count(), 3, "Games missing")
+            self.assertEqual(Genre.query.count(), 2, "Genre names repeated")
+            alpha = Game.query.filter_by(title="Alpha").first()
+            self.assertEqual(sorted(genre.genre_type for genre in alpha.genre),
+                             ['Action', 'RPG'], "Genres not linked")
+            beta = Game.query.filter_by(title="Beta").first()
+            self.assertEqual([platform.platform_name
+                              for platform in beta.platform], ['PC'],
+                             "Platforms not linked")
+            self.assertEqual(beta.image_url, 'placeholder.jpg',
+                             "Default image not set")
+
+            path = op.join(folder, 'games.jsonl')
+            with open(path, 'w') as file:
+                file.write('{"title": "Delta", "release_date": "2021-01-01", '
+                           '"developer": ["Studio"], "genre": ["RPG"]}\n'
+                           '{"title": "Epsilon"}\n')
+            result = app.test_cli_runner().invoke(
+                args=['import-games', path])
+            self.assertIn('Line 2', result.output, "Line not reported")
+            self.assertEqual(Game.query.count(), 3, "Invalid chunk kept")
+            with open(path, 'w') as file:
+                file.write('{"title": "Delta", "release_date": "2021-01-01", '
+                           '"developer": ["Studio"], "genre": ["RPG"]}\n')
+            app.test_cli_runner().invoke(args=['import-games', path])
+            delta = Game.query.filter_by(title="Delta").first()
+            self.assertEqual([genre.genre_type for genre in delta.genre],
+                             ['RPG'], "Existing genre not reused")
+            self.assertEqual(Genre.query.count(), 2, "Genre names repeated")
+            response = self.app.post('/search', data=dict(search="studio"),
+                                     follow_redirects=True)
+            self.assertIn(b'Delta', response.data, "Game not searchable")
+
+            # Each chunk is indexed as soon as it is written
+            found = []
+            import_games(io.StringIO('title,release_date\n'
+                                     'Zeta,2020-01-01\nEta,2020-01-02\n'),
+                         'csv', chunk_size=1, progress=lambda count:
+                         found.append([len(search_games(title)[0]) for title
+                                       in ('Delta', 'Zeta', 'Eta')]))
+            self.assertEqual(found, [[1, 1, 0], [1, 1, 1]],
+                             "Index not searchable during the import")
+        finally:
+            shutil.rmtree(folder)
+
+    def test_export(self):
+        """
+        Test the exports of a library and of the catalogue.
+
+        Test included:
+            Test if a library is exported as JSON lines and CSV.
+            Test if a library export can be posted to /batch.
+            Test if a library export larger than the batch limit is
+            added in chunks.
+            Test if the catalogue export is only for admin users.
+            Test if the catalogue export can be imported.
+        """
+        genre = Genre(genre_type="RPG")
+        for i in range(5):
+            game = Game(title="game" + str(i),
+                        release_date=date(2020, 1, i + 1))
+            game.genre.append(genre)
+            db.session.add(game)
+        db.session.commit()
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.register("zxcv@mail.com", "zxcvzxcv", "eSM&A@6}", "eSM&A@6}")
+        self.login("asdfasdf", "eSM&A@6}")
+        self.app.post('/batch', json={"add": [2, 4, 5]})
+        app.config['EXPORT_BATCH_SIZE'] = 2
+        try:
+            response = self.app.get('/export/library.jsonl')
+            self.assertEqual(response.mimetype, 'application/x-ndjson',
+                             "Wrong mimetype")
+            lines = response.data.decode().splitlines()
+            self.assertEqual([json.loads(line)['game_id'] for line in lines],
+                             [2, 4, 5], "Library not exported")
+            csv_export = self.app.get('/export/library.csv').data
+            self.assertEqual(csv_export.decode().splitlines()[0],
+                             'game_id,title,added_at', "CSV header missing")
+            self.assertEqual(len(csv_export.decode().splitlines()), 4,
+                             "CSV rows missing")
+
+            # Add the export to another user's list, two games at a time
+            self.app.get('/logout')
+            self.login("zxcvzxcv", "eSM&A@6}")
+            app.config['LIBRARY_BATCH_LIMIT'] = 2
+            response = self.app.post('/batch', data=csv_export,
+                                     content_type='text/csv')
+            self.assertEqual(
+                [result['status'] for result in response.get_json()['results']],
+                ['added'] * 3, "Export not added")
+            user = User.query.filter_by(username="zxcvzxcv").first()
+            self.assertEqual(sorted(game.game_id for game in user.games),
+                             [2, 4, 5], "Export chunks not saved")
+            response = self.app.post('/batch', json={"add": [1, 3, 4]})
+            self.assertEqual(response.status_code, 413, "Batch not limited")
+            response = self.app.post('/batch', data=b'{"title": "x"}',
+                                     content_type='application/x-ndjson')
+            self.assertEqual(response.status_code, 400, "Bad export added")
+
+            # Export the catalogue
+            response = self.app.get('/export/games.csv')
+            self.assertEqual(response.status_code, 403, "Export allowed")
+            user = User.query.filter_by(username="zxcvzxcv").first()
+            user.admin = True
+            db.session.commit()
+            response = self.app.get('/export/games.jsonl')
+            games = [json.loads(line)
+                     for line in response.data.decode().splitlines()]
+            self.assertEqual(len(games), 5, "Games missing")
+            self.assertEqual(games[0]['genre'], ['RPG'], "Genres missing")
+            self.assertEqual(games[0]['release_date'], '2020-01-01',
+                             "Wrong release date")
+            folder = tempfile.mkdtemp()
+            try:
+                path = op.join(folder, 'games.csv')
+                app.test_cli_runner().invoke(
+                    args=['export-games', path, '--format', 'csv'])
+                result = app.test_cli_runner().invoke(
+                    args=['import-games', path])
+                self.assertIn('Imported 5 games in total', result.output,
+                              "Export not imported")
+                self.assertEqual(Genre.query.count(), 1, "Genre repeated")
+            finally:
+                shutil.rmtree(folder)
+        finally:
+            app.config['EXPORT_BATCH_SIZE'] = 1000
+            app.config['LIBRARY_BATCH_LIMIT'] = 1000
+
+    def test_api(self):
+        """
+        Test the read API.
+
+        Test included:
+            Test if the games are paged with a cursor.
+            Test if only the fields asked for are returned.
+            Test if an unchanged resource is answered with 304.
+            Test if a change to a table gives a new ETag.
+            Test if the taxonomies and the user's list are listed.
+        """
+        genre = Genre(genre_type="RPG")
+        for i in range(3):
+            game = Game(title="game" + str(i),
+                        release_date=date(2020, 1, i + 1))
+            game.genre.append(genre)
+            db.session.add(game)
+        db.session.commit()
+
+        response = self.app.get('/api/v1/games?limit=2')
+        page = response.get_json()
+        self.assertEqual([game['title'] for game in page['data']],
+                         ['game0', 'game1'], "Wrong first page")
+        self.assertEqual(page['data'][0]['genre'], ['RPG'], "Genre missing")
+        self.assertEqual(page['data'][0]['release_date'], '2020-01-01',
+                         "Wrong release date")
+        page = self.app.get('/api/v1/games?limit=2&cursor=%s'
+                            % page['next_cursor']).get_json()
+        self.assertEqual([game['title'] for game in page['data']],
+                         ['game2'], "Wrong second page")
+        self.assertIsNone(page['next_cursor'], "Next page of the last page")
+        game = self.app.get('/api/v1/games/1?fields=title').get_json()
+        self.assertEqual(game['data'], {'game_id': 1, 'title': 'game0'},
+                         "Fields not selected")
+        response = self.app.get('/api/v1/games?fields=price')
+        self.assertEqual(response.status_code, 400, "Unknown field allowed")
+        response = self.app.get('/api/v1/games/9')
+        self.assertEqual(response.status_code, 404, "Missing game found")
+
+        # Test conditional requests
+        response = self.app.get('/api/v1/games/1')
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        response, queries = self.count_queries(
+            self.app.get, '/api/v1/games/1',
+            headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304, "Not answered with 304")
+        self.assertEqual(queries, 1, "Game loaded for a 304")
+        response = self.app.get('/api/v1/games/1', headers={
+            'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304, "Last-Modified ignored")
+        Genre.query.get(1).genre_type = "Role-playing"
+        db.session.commit()
+        response = self.app.get('/api/v1/games/1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200, "Change not seen")
+        self.assertEqual(response.get_json()['data']['genre'],
+                         ['Role-playing'], "Stale genre")
+
+        response = self.app.get('/api/v1/genres')
+        self.assertEqual(response.get_json()['data'],
+                         [{'id': 1, 'name': 'Role-playing'}],
+                         "Genres not listed")
+
+        # Test the user's list
+        response = self.app.get('/api/v1/me/games')
+        self.assertEqual(response.status_code, 401, "List shown anonymously")
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.login("asdfasdf", "eSM&A@6}")
+        self.app.post('/batch', json={"add": [1, 3]})
+        response = self.app.get('/api/v1/me/games?fields=title')
+        self.assertEqual([game['title']
+                          for game in response.get_json()['data']],
+                         ['game2', 'game0'], "List not shown")
+        self.assertIn('private', response.headers['Cache-Control'],
+                      "List cacheable by proxies")
+        etag = response.headers['ETag']
+        self.app.post('/batch', json={"remove": [1]})
+        response = self.app.get('/api/v1/me/games?fields=title',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200, "Change not seen")
+
+    def test_browse(self):
+        """
+        Test the faceted browsing of games.
+
+        Test included:
+            Test if the games are filtered by any combination of facets.
+            Test if the facet values are counted against the other facets.
+            Test if the games are paged with a cursor.
+            Test if the index follows committed changes without reloading.
+            Test if the ETag changes when the index reloads.
+        """
+        action = Genre(genre_type="Action")
+        puzzle = Genre(genre_type="Puzzle")
+        pc = Platform(platform_name="PC")
+        for i in range(4):
+            game = Game(title="game" + str(i),
+                        release_date=date(2019 + i % 2, 1, 1))
+            game.genre.append(action if i < 3 else puzzle)
+            if i % 2 == 0:
+                game.platform.append(pc)
+            db.session.add(game)
+        db.session.commit()
+
+        response = self.app.get('/browse')
+        self.assertEqual(response.status_code, 200, "Route not functional")
+        self.assertIn(b'4 games', response.data, "Games not counted")
+        response = self.app.get('/browse?genre=1&platform=1')
+        self.assertIn(b'>game2</a>', response.data, "Game not shown")
+        self.assertNotIn(b'>game1</a>', response.data, "Filter ignored")
+        response = self.app.get('/browse?genre=x')
+        self.assertEqual(response.status_code, 400, "Bad filter allowed")
+
+        data = self.app.get('/api/v1/browse?genre=1&fields=title') \
+            .get_json()
+        self.assertEqual([game['title'] for game in data['data']],
+                         ['game2', 'game1', 'game0'], "Wrong games")
+        facets = {facet: {value['name']: value['count'] for value in values}
+                  for facet, values in data['facets'].items()}
+        self.assertEqual(facets['genre'], {'Action': 3, 'Puzzle': 1},
+                         "Selected facet not counted against the others")
+        self.assertEqual(facets['platform'], {'PC': 2}, "Wrong counts")
+        self.assertEqual(facets['year'], {'2019': 2, '2020': 1},
+                         "Wrong year counts")
+        data = self.app.get('/api/v1/browse?genre=1&limit=2').get_json()
+        self.assertEqual(data['total'], 3, "Wrong total")
+        data = self.app.get('/api/v1/browse?genre=1&limit=2&cursor=%s'
+                            % data['next_cursor']).get_json()
+        self.assertEqual([game['title'] for game in data['data']],
+                         ['game0'], "Wrong second page")
+
+        # Test changes from both sides of the relationships
+        action = Genre.query.get(1)
+        puzzle_game = Game.query.get(4)
+        puzzle_game.genre.append(action)
+        action.game_genre.remove(Game.query.get(1))
+        db.session.delete(Game.query.get(2))
+        db.session.commit()
+        data, queries = self.count_queries(
+            self.app.get, '/api/v1/browse?genre=1&fields=title')
+        self.assertEqual([game['title'] for game in data.get_json()['data']],
+                         ['game3', 'game2'], "Changes not applied")
+        self.assertFalse([statement for statement in self.statements
+                          if 'FROM game_genre' in statement and
+                          'IN' not in statement],
+                         "Index reloaded")
+
+        # The ETag follows the index, which can lag behind the tables
+        response = self.app.get('/api/v1/browse?genre=1')
+        etag = response.headers['ETag']
+        self.assertNotIn('Last-Modified', response.headers,
+                         "Index dated by the tables")
+        response = self.app.get('/api/v1/browse?genre=1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304, "ETag not matched")
+        facet_index.invalidate()
+        response = self.app.get('/api/v1/browse?genre=1',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200,
+                         "Reloaded index served with the old ETag")
+
+    def test_instrumentation(self):
+        """
+        Test the per route statistics of requests.
+
+        Test included:
+            Test if no listener is attached while it is disabled.
+            Test if the queries and latency of each route are counted.
+            Test if repeated statements and slow requests are logged.
+            Test if the statistics are shown to admin users.
+            Test if the queries of a streamed response are counted.
+        """
+        self.assertFalse(event.contains(Engine, 'before_cursor_execute',
+                                        instrumentation._before_execute),
+                         "Listener attached while disabled")
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        user = User.query.get(1)
+        user.admin = True
+        db.session.commit()
+        self.login("asdfasdf", "eSM&A@6}")
+        app.config['INSTRUMENTATION_REPEAT_THRESHOLD'] = 3
+        instrumentation.enable()
+        instrumentation.reset()
+        try:
+            self.app.get('/feed')
+            stats = instrumentation.stats()
+            self.assertEqual(stats['feed']['requests'], 1,
+                             "Request not counted")
+            self.assertGreater(stats['feed']['queries'], 0,
+                               "Queries not counted")
+            self.assertGreater(stats['feed']['template_ms'], 0,
+                               "Template not timed")
+
+            # Test the detection of repeated statements
+            with self.assertLogs('app.instrumentation', 'WARNING') as logs:
+                with app.test_request_context('/feed'):
+                    request_started.send(app)
+                    for user_id in range(1, 5):
+                        User.query.filter_by(user_id=user_id).first()
+                    request_finished.send(app,
+                                          response=app.response_class())
+            entry = json.loads(logs.records[0].getMessage())
+            self.assertFalse(entry['slow'], "Fast request logged as slow")
+            self.assertEqual(entry['repeated_statements'][0]['runs'], 4,
+                             "Repeated statement not detected")
+            self.assertEqual(instrumentation.stats()['feed']['n_plus_one'],
+                             1, "Repeated statement not counted")
+
+            app.config['INSTRUMENTATION_SLOW_REQUEST'] = 0
+            with self.assertLogs('app.instrumentation', 'WARNING') as logs:
+                self.app.get('/feed')
+            entry = json.loads(logs.records[0].getMessage())
+            self.assertTrue(entry['slow'], "Slow request not logged")
+            self.assertEqual(entry['route'], 'feed', "Wrong route logged")
+            stats = self.app.get('/instrumentation').get_json()
+            self.assertEqual(stats['feed']['requests'], 3,
+                             "Statistics not shown")
+
+            # The queries of a streamed response are counted
+            app.config['INSTRUMENTATION_SLOW_REQUEST'] = 0.5
+            response = self.app.get('/export/library.csv')
+            response.get_data()
+            response.close()
+            self.assertGreater(
+                instrumentation.stats()['export_library_file']['queries'], 0,
+                "Streamed queries not counted")
+        finally:
+            instrumentation.disable()
+            app.config['INSTRUMENTATION_SLOW_REQUEST'] = 0.5
+            app.config['INSTRUMENTATION_REPEAT_THRESHOLD'] = 10
+        self.assertFalse(event.contains(Engine, 'after_cursor_execute',
+                                        instrumentation._after_execute),
+                         "Listener not detached")
+
+    def test_recommendations(self):
+        """
+        Test the games recommended in the checkout section of the feed.
+
+        Test included:
+            Test if games of users with the same games are recommended.
+            Test if games sharing a genre with the user's games are
+            recommended.
+            Test if the users owning a changed game are queued, up to
+            the limit.
+            Test if the command recomputes the queued users.
+            Test if the feed can recompute the user's recommendations.
+        """
+        # Create users
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.register("qwer@mail.com", "qwerqwer", "eSM&A@6}", "eSM&A@6}")
+        # Create games, game2 and game5 have the same genre
+        genre = Genre(genre_type="RPG")
+        for i in range(1, 6):
+            game = Game(title="game" + str(i),
+                        release_date=date(2020, 1, i))
+            if i in (2, 5):
+                game.genre.append(genre)
+            db.session.add(game)
+        db.session.commit()
+        self.login("qwerqwer", "eSM&A@6}")
+        self.app.post('/batch', json={"add": [1, 3]})
+        self.app.get('/logout')
+        self.login("asdfasdf", "eSM&A@6}")
+        self.app.post('/batch', json={"add": [1, 2]})
+        result = app.test_cli_runner().invoke(args=['recommend'])
+        self.assertIn('2 users', result.output, "Queue not processed")
+
+        checkout = self.app.get('/feed').data.split(b'Checkout</h2>')[1]
+        self.assertIn(b'>game3</a>', checkout, "Co-owned game missing")
+        self.assertIn(b'>game5</a>', checkout, "Same genre game missing")
+        self.assertLess(checkout.index(b'>game3</a>'),
+                        checkout.index(b'>game5</a>'), "Wrong order")
+        self.assertNotIn(b'>game1</a>', checkout, "Owned game recommended")
+
+        # The user sharing game1 is queued too
+        self.app.post('/batch', json={"add": [3]})
+        checkout = self.app.get('/feed').data.split(b'Checkout</h2>')[1]
+        self.assertIn(b'>game3</a>', checkout, "Recomputed on read")
+        result = app.test_cli_runner().invoke(args=['recommend'])
+        self.assertIn('2 users', result.output, "Peer not queued")
+        checkout = self.app.get('/feed').data.split(b'Checkout</h2>')[1]
+        self.assertNotIn(b'>game3</a>', checkout, "Not recomputed")
+
+        app.config['RECOMMENDATION_REFRESH_ON_READ'] = True
+        try:
+            self.app.post('/batch', json={"remove": [3]})
+            checkout = self.app.get('/feed').data.split(b'Checkout</h2>')[1]
+            self.assertIn(b'>game3</a>', checkout, "Not recomputed on read")
+        finally:
+            app.config['RECOMMENDATION_REFRESH_ON_READ'] = False
+
+        app.test_cli_runner().invoke(args=['recommend'])
+        app.config['RECOMMENDATION_PEER_LIMIT'] = 0
+        try:
+            self.app.post('/batch', json={"add": [3]})
+            result = app.test_cli_runner().invoke(args=['recommend'])
+            self.assertIn('1 users', result.output, "Peer limit ignored")
+        finally:
+            app.config['RECOMMENDATION_PEER_LIMIT'] = 100
+
+    def test_user_cache(self):
+        """
+        Test the cache of logged in users.
+
+        Test included:
+            Test if the user is not queried on every request.
+            Test if the cached user is updated when the user changes.
+        """
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.login("asdfasdf", "eSM&A@6}")
+        self.app.get('/feed/games')
+        self.count_queries(self.app.get, '/feed/games')
+        self.assertFalse([statement for statement in self.statements
+                          if 'FROM user ' in statement],
+                         "User queried again")
+
+        # Changing the user removes them from the cache
+        response = self.app.get('/admin/')
+        self.assertEqual(response.status_code, 403, "Admin page allowed")
+        user = User.query.get(1)
+        user.admin = True
+        db.session.commit()
+        response = self.app.get('/admin/')
+        self.assertEqual(response.status_code, 200, "Cached user not updated")
+
     def change_password(self, old_password, password, confirm):
         """
         Simulates an entry by the user at the setting page
@@ -368,6 +1381,58 @@ class Test(unittest.TestCase):
                                        confirm=confirm),
                              follow_redirects=True)
 
+    def test_admin_lists(self):
+        """
+        Test the admin lists on many games.
+
+        Test included:
+            Test if the page size is bounded.
+            Test if the count is cached between pages.
+            Test if the relationships of a page are loaded together.
+            Test if the edit forms do not list every game.
+            Test if the lists are only shown to admin users.
+        """
+        developer = Developer(name="developer")
+        db.session.add(developer)
+        db.session.commit()
+        db.session.execute(Game.__table__.insert(), [
+            {'title': 'game%d' % i, 'release_date': date(2020, 1, 1)}
+            for i in range(250)])
+        db.session.execute(game_developer.insert(), [
+            {'game_id': game_id, 'developer_id': 1}
+            for game_id in range(1, 251)])
+        db.session.commit()
+
+        for url in ['/admin/user/', '/admin/game/', '/admin/game/new/',
+                    '/admin/uploadimages/']:
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 302,
+                             "Admin list open to anonymous users")
+        self.register("asdf@mail.com", "asdfasdf", "eSM&A@6}", "eSM&A@6}")
+        self.login("asdfasdf", "eSM&A@6}")
+        response = self.app.get('/admin/game/')
+        self.assertEqual(response.status_code, 403,
+                         "Admin list open to other users")
+        user = User.query.get(1)
+        user.admin = True
+        db.session.commit()
+
+        response = self.app.get('/admin/game/?page_size=100000')
+        self.assertEqual(response.data.count(b'name="rowid"'),
+                         app.config['ADMIN_MAX_PAGE_SIZE'],
+                         "Page size not bounded")
+        response, queries = self.count_queries(self.app.get,
+                                               '/admin/game/?page=1')
+        self.assertFalse(any('count(' in statement.lower()
+                             for statement in self.statements),
+                         "Count not cached")
+        self.assertLessEqual(queries, 6, "Relationships loaded per game")
+        self.assertIn(b'developer', response.data, "Relationship not listed")
+
+        response = self.app.get('/admin/developer/edit/?id=1')
+        self.assertEqual(response.status_code, 200, "Form not shown")
+        self.assertNotIn(b'game0<', response.data, "Every game listed")
+
     def test_change_password(self):
         """
         Test the change password functionality.